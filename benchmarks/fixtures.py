@@ -0,0 +1,126 @@
+"""
+Synthetic fixtures for the benchmarks, generated from a fixed seed so every run uses the same data.
+"""
+
+import random
+
+from leek.cogs import rage
+from leek.natives import NativeIndex
+
+NAMESPACES = ["APP", "AUDIO", "BRAIN", "CAM", "CLOCK", "CUTSCENE", "DATAFILE", "DECORATOR", "ENTITY", "EVENT",
+              "FILES", "FIRE", "GRAPHICS", "HUD", "INTERIOR", "ITEMSET", "LOADINGSCREEN", "MISC", "MOBILE", "MONEY",
+              "NETSHOPPING", "NETWORK", "OBJECT", "PAD", "PATHFIND", "PED", "PHYSICS", "PLAYER", "RECORDING", "SCRIPT",
+              "SHAPETEST", "SOCIALCLUB", "STATS", "STREAMING", "SYSTEM", "TASK", "VEHICLE", "WATER", "WEAPON", "ZONE"]
+VERBS = ["GET", "SET", "IS", "DOES", "CREATE", "DELETE", "REQUEST", "HAS", "CLEAR", "START", "STOP", "ADD", "REMOVE",
+         "FORCE", "DISABLE", "ENABLE", "TASK", "NETWORK", "_GET", "_SET"]
+NOUNS = ["PLAYER", "PED", "VEHICLE", "ENTITY", "OBJECT", "CAM", "BLIP", "WEAPON", "PICKUP", "ROPE", "INTERIOR",
+         "SCRIPT", "MODEL", "ANIM", "DICT", "TEXTURE", "HUD", "RADIO", "TRAIN", "BOAT", "HELI", "PLANE", "DOOR",
+         "ALARM", "HORN", "WHEEL", "TYRE", "DRIVER", "PASSENGER", "COORDS", "HEADING", "HEALTH", "ARMOUR", "MONEY",
+         "STAT", "DECAL", "PARTICLE", "FX", "SOUND", "SPEECH", "GROUP", "TEAM", "GANG", "COP", "WANTED", "LEVEL"]
+MODIFIERS = ["", "", "", "_IS_ACTIVE", "_EXISTS", "_INDEX", "_COUNT", "_IN_AREA", "_FROM_SERVER", "_THIS_FRAME",
+             "_FLAG", "_STATE", "_VISIBLE", "_COLLISION", "_AS_MISSION_ENTITY", "_NO_LONGER_NEEDED", "_2", "_3"]
+TYPES = ["int", "float", "BOOL", "Ped", "Vehicle", "Entity", "Hash", "const char*", "Any*", "Vector3", "Player",
+         "Object", "Cam", "Blip"]
+PARAMS = ["ped", "vehicle", "entity", "player", "x", "y", "z", "heading", "toggle", "p0", "p1", "p2", "hash",
+          "modelHash", "duration", "flags", "radius", "speed", "index", "name"]
+WORDS = ["returns", "the", "entity", "handle", "of", "a", "ped", "if", "vehicle", "is", "valid", "used", "by",
+         "scripts", "to", "check", "whether", "player", "exists", "in", "world", "and", "can", "be", "controlled",
+         "network", "session", "this", "native", "only", "works", "when", "model", "has", "been", "loaded"]
+LOG_NOISE = [
+    "[DEBUG] Instantiating script Menu.Main in script domain 'ScriptHookVDotNet'...",
+    "[INFO] Loading scripts from C:\\Games\\GTAV\\scripts\\Menu.dll ...",
+    "[INFO] Found 3 script(s) in Menu.dll resolved to API version 3.6.0.",
+    "[DEBUG] Started script Menu.Main.",
+    "[DEBUG] Loading API from C:\\Games\\GTAV\\ScriptHookVDotNet3.dll ...",
+    "[INFO] Initializing NativeMemory members...",
+]
+LOG_PROBLEMS = [
+    "[WARNING] Resolving API version 0.0.0 referenced in Legacy{0}.dll.",
+    "[ERROR] Failed to instantiate script Mod{0}.Main because constructor threw an exception: "
+    "System.IO.FileNotFoundException: Could not load file or assembly 'LemonUI.SHVDN3, Version=2.1.0.0,",
+    "[ERROR] Failed to instantiate script Mod{0}.Main because constructor threw an exception: "
+    "System.NullReferenceException: Object reference not set to an instance of an object.",
+    "[ERROR] Failed to load assembly Mod{0}.dll: System.IO.FileNotFoundException: Could not load file or assembly "
+    "'NAudio, Version=1.10.0.0,",
+    "[ERROR] Failed to instantiate script Mod{0}.Main because no public default constructor was found.",
+    "[ERROR] The exception was thrown while executing the script Mod{0}.Main.",
+    "[WARNING] Failed to load config: System.IO.FileNotFoundException: Could not find file 'Mod{0}.ini'.",
+    "[ERROR] Caught fatal unhandled exception:",
+    "[ERROR] Aborted script Mod{0}.Main.",
+    "[WARNING] Found 2 script(s) resolved to the deprecated API version 2.x (ScriptHookVDotNet2.dll).",
+    "[WARNING] Mod{0}.OldScript",
+]
+LOG_SIZES = {"small": 200, "medium": 5_000, "huge": 200_000, "giant": 1_000_000}
+NATIVE_COUNTS = {"gtav": 6_000, "rdr3": 7_000, "fivem": 1_200}
+
+
+def shvdn_log(lines: int, seed: int = 0) -> list[str]:
+    """
+    Generates the lines of a ScriptHookVDotNet log file, with about one problem every 20 lines.
+    :param lines: The number of lines to generate.
+    :param seed: The seed of the random generator.
+    :return: The lines of the log.
+    """
+    rng = random.Random(seed)
+    result = []
+
+    for index in range(lines):
+        timestamp = f"[{index // 3600 % 24:02}:{index // 60 % 60:02}:{index % 60:02}]"
+
+        problem = rng.random() < 0.05
+        message = rng.choice(LOG_PROBLEMS).format(rng.randrange(50)) if problem else rng.choice(LOG_NOISE)
+
+        result.append(f"{timestamp} {message}")
+
+    return result
+
+
+def _native_name(rng: random.Random, used: set[str]) -> str:
+    name = f"{rng.choice(VERBS)}_{rng.choice(NOUNS)}_{rng.choice(NOUNS)}{rng.choice(MODIFIERS)}"
+
+    while name in used:
+        name = f"{name}_{rng.randrange(10)}"
+
+    used.add(name)
+    return name
+
+
+def natives_dataset(count: int, seed: int = 0) -> dict[str, dict[str, dict]]:
+    """
+    Generates a dataset of natives in the format of the NativeDB JSON files.
+    :param count: The number of natives to generate.
+    :param seed: The seed of the random generator.
+    :return: The natives grouped by namespace and hash.
+    """
+    rng = random.Random(seed)
+    used: set[str] = set()
+    dataset: dict[str, dict[str, dict]] = {namespace: {} for namespace in NAMESPACES}
+
+    for _ in range(count):
+        n_hash = f"0x{rng.getrandbits(64):016X}"
+        name = _native_name(rng, used) if rng.random() < 0.9 else n_hash
+        params = [{"type": rng.choice(TYPES), "name": rng.choice(PARAMS)} for _ in range(rng.randrange(7))]
+
+        for param in params:
+            if rng.random() < 0.2:
+                param["description"] = " ".join(rng.choices(WORDS, k=rng.randrange(3, 10)))
+
+        dataset[rng.choice(NAMESPACES)][n_hash] = {
+            "name": name,
+            "jhash": f"0x{rng.getrandbits(32):08X}",
+            "comment": " ".join(rng.choices(WORDS, k=rng.randrange(0, 60))),
+            "params": params,
+            "return_type": rng.choice(TYPES),
+            "build": str(rng.choice([323, 372, 757, 1180, 2189, 2699, 3095]))
+        }
+
+    return dataset
+
+
+def load_natives(datasets: dict[str, dict[str, dict[str, dict]]]) -> None:
+    """
+    Loads the natives into the Rage cog in the same way as when the bot connects to Discord.
+    :param datasets: The datasets of every game.
+    """
+    for game, json in datasets.items():
+        rage.NATIVES.replace(game, NativeIndex.from_json(json))
@@ -0,0 +1,111 @@
+"""
+The measurement and reporting tools shared by the benchmarks.
+"""
+
+import json
+import platform
+import sys
+import timeit
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+
+@dataclass(frozen=True)
+class Result:
+    """
+    The result of a single benchmark.
+    """
+    name: str
+    ops_per_sec: float
+    peak_memory: int
+    items: int = 1
+
+    @property
+    def microseconds(self) -> float:
+        """
+        The time of a single operation in microseconds.
+        """
+        return 1_000_000 / self.ops_per_sec
+
+    @property
+    def items_per_sec(self) -> float:
+        """
+        The throughput of the benchmark, like the lines per second when a log is parsed.
+        """
+        return self.ops_per_sec * self.items
+
+
+def measure(name: str, function: Callable[[], object], repeat: int = 5, items: int = 1) -> Result:
+    """
+    Measures the operations per second and the peak memory allocated by a function.
+    :param name: The name of the benchmark.
+    :param function: The operation to measure.
+    :param repeat: The number of measurements, the fastest one is used.
+    :param items: The number of items processed by every operation, like the lines of a log.
+    :return: The result of the benchmark.
+    """
+    function()
+
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number))
+    return Result(name, number / best, peak, items)
+
+
+def load_baseline(path: Path) -> dict[str, Result]:
+    """
+    Loads the results of a previous run.
+    :param path: The JSON file with the results.
+    :return: The results by name, or an empty dict if the file does not exists.
+    """
+    try:
+        with path.open(encoding="utf-8") as file:
+            data = json.load(file)
+    except FileNotFoundError:
+        return {}
+
+    return {item["name"]: Result(**item) for item in data["results"]}
+
+
+def save_results(path: Path, results: list[Result]) -> None:
+    """
+    Saves the results, so they can be used as the baseline of the next run.
+    :param path: The JSON file where the results will be written.
+    :param results: The results to save.
+    """
+    data = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": [asdict(x) for x in results]
+    }
+
+    with path.open("w", encoding="utf-8") as file:
+        json.dump(data, file, indent=4)
+
+
+def format_results(results: list[Result], baseline: dict[str, Result]) -> str:
+    """
+    Formats the results as a table, with the change against the baseline.
+    :param results: The results to format.
+    :param baseline: The results of the previous run.
+    :return: The table.
+    """
+    width = max(len(x.name) for x in results)
+    lines = [f"{'benchmark':<{width}} {'ops/sec':>14} {'us/op':>12} {'items/sec':>14} {'peak KiB':>10} "
+             f"{'vs baseline':>12}"]
+
+    for result in results:
+        previous = baseline.get(result.name)
+        change = "" if previous is None else f"{result.ops_per_sec / previous.ops_per_sec:.2f}x"
+        throughput = f"{result.items_per_sec:,.0f}" if result.items > 1 else ""
+        lines.append(f"{result.name:<{width}} {result.ops_per_sec:>14,.1f} {result.microseconds:>12,.2f} "
+                     f"{throughput:>14} {result.peak_memory / 1024:>10,.1f} {change:>12}")
+
+    return "\n".join(lines)
@@ -0,0 +1,108 @@
+"""
+Micro-benchmark of the localization lookups.
+
+Compares the per-call cost of the old ``inspect.stack()`` based lookup against the ``l()`` wrapper and a module bound
+``Localizer``. Run it with ``python benchmarks/localization.py``.
+"""
+
+import argparse
+import inspect
+import json
+import tempfile
+import timeit
+from collections.abc import Callable
+from pathlib import Path
+
+from leek.localization import Localizer, l
+
+STRINGS = {
+    "en-US": {"KEY": "Mod {0} crashed during initialization, report it to the mod developer"},
+    "es-ES": {"KEY": "El mod {0} se cerro durante la inicializacion, reportalo al desarrollador"},
+}
+LEGACY_PATHS: dict[Path, dict[str, dict[str, str]]] = {}
+
+
+def _legacy_localize(key: str, locale: str, *formatting_params: object) -> str:
+    # the lookup as it was before the localizers, walking the full stack on every call
+    stack = inspect.stack()
+    path = Path(stack[2].filename)
+
+    langs = LEGACY_PATHS.setdefault(path, {})
+
+    for lang in (locale, "en-US"):
+        if lang not in langs:
+            with path.with_suffix(f".{lang}.json").open(encoding="utf-8") as file:
+                langs[lang] = json.load(file)
+
+    localized = langs.get(locale, {}).get(key, None) or langs.get("en-US", {}).get(key, key)
+    return localized if key == localized else localized.format(*formatting_params)
+
+
+def _legacy_l(key: str, lang: str, *formatting_params: object) -> str:
+    return _legacy_localize(key, lang, *formatting_params)
+
+
+def _create_fixture(directory: Path) -> Path:
+    module = directory / "fixture.py"
+
+    for locale, strings in STRINGS.items():
+        with module.with_suffix(f".{locale}.json").open("w", encoding="utf-8") as file:
+            json.dump(strings, file)
+
+    return module
+
+
+def _compile_call(module: Path, function: Callable[..., str]) -> Callable[[], str]:
+    # compile the call as if it came from the fixture module, so the caller lookups resolve its json files
+    namespace = {"function": function}
+    source = "def call():\n    return function('KEY', 'es-ES', 'ExampleMod')\n"
+    exec(compile(source, str(module), "exec"), namespace)  # noqa: S102
+    return namespace["call"]
+
+
+def _at_depth(depth: int, function: Callable[[], str]) -> Callable[[], str]:
+    # inspect.stack() scales with the depth of the stack, so emulate the frames of the event loop and pycord
+    if depth <= 0:
+        return function
+
+    inner = _at_depth(depth - 1, function)
+
+    def frame() -> str:
+        return inner()
+
+    return frame
+
+
+def _measure(function: Callable[[], str], number: int) -> float:
+    function()
+    return min(timeit.repeat(function, number=number, repeat=5)) / number * 1_000_000
+
+
+def main() -> None:
+    """
+    Runs the benchmark and prints the cost per call.
+    """
+    parser = argparse.ArgumentParser(description="Benchmarks the localization lookups")
+    parser.add_argument("--number", type=int, default=20_000, help="the number of calls per measurement")
+    parser.add_argument("--depth", type=int, default=25, help="the number of frames above the caller")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp:
+        module = _create_fixture(Path(temp))
+        localizer = Localizer(module)
+
+        results = {
+            "inspect.stack() (before)": _measure(_at_depth(args.depth, _compile_call(module, _legacy_l)),
+                                                 max(args.number // 100, 1)),
+            "l() wrapper": _measure(_at_depth(args.depth, _compile_call(module, l)), args.number),
+            "Localizer.l()": _measure(_at_depth(args.depth, _compile_call(module, localizer.l)), args.number),
+        }
+
+    baseline = results["inspect.stack() (before)"]
+
+    for name, cost in results.items():
+        print(f"{name:<28} {cost:>10.3f} us/call {baseline / cost:>10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
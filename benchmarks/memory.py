@@ -0,0 +1,72 @@
+"""
+Memory report of the natives, comparing the records used by Leek with the previous layout of a dictionary per native.
+
+By default the synthetic datasets of the three games are used, run it with ``python benchmarks/memory.py``. The real
+NativeDB files can be used instead with ``--json gtav natives.json``.
+"""
+
+import argparse
+import gc
+import json
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+
+import fixtures
+
+from leek.natives import Native, format_lua_name
+
+
+def _dict_layout(body: bytes) -> list[dict]:
+    # the decoded JSON with the namespace, hash and lua name copied in, like the natives were stored before
+    natives = []
+
+    for namespace, group in json.loads(body).items():
+        for n_hash, native in group.items():
+            native["namespace"] = namespace
+            native["hash"] = n_hash
+            native["lua"] = format_lua_name(native["name"])
+            natives.append(native)
+
+    return natives
+
+
+def _record_layout(body: bytes) -> list[Native]:
+    return [Native.from_json(namespace, n_hash, native) for namespace, group in json.loads(body).items()
+            for n_hash, native in group.items()]
+
+
+def _retained(build: Callable[[bytes], list], body: bytes) -> tuple[int, int]:
+    gc.collect()
+    tracemalloc.start()
+    natives = build(body)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(natives), size
+
+
+def main() -> None:
+    """
+    Prints the memory used by the natives of every game in both layouts.
+    """
+    parser = argparse.ArgumentParser(description="Compares the memory used by the layouts of the natives")
+    parser.add_argument("--json", nargs=2, action="append", metavar=("GAME", "PATH"),
+                        help="use a NativeDB file instead of the synthetic dataset of a game")
+    args = parser.parse_args()
+
+    if args.json:
+        bodies = {game: Path(path).read_bytes() for game, path in args.json}
+    else:
+        bodies = {game: json.dumps(fixtures.natives_dataset(count, seed)).encode()
+                  for seed, (game, count) in enumerate(fixtures.NATIVE_COUNTS.items())}
+
+    print(f"{'game':<8} {'natives':>8} {'dicts KiB':>12} {'records KiB':>12} {'saved':>8}")
+
+    for game, body in bodies.items():
+        count, before = _retained(_dict_layout, body)
+        _, after = _retained(_record_layout, body)
+        print(f"{game:<8} {count:>8,} {before / 1024:>12,.1f} {after / 1024:>12,.1f} {1 - after / before:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
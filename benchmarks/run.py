@@ -0,0 +1,169 @@
+"""
+Offline benchmarks of the hot paths of Leek.
+
+Every benchmark uses synthetic fixtures, so no connection to Discord, the database or the internet is required. Run
+them with ``python benchmarks/run.py``. The results are compared against the baseline of a previous run when it
+exists, and ``--save`` replaces the baseline with the results of the current run.
+"""
+
+import argparse
+import fnmatch
+import json
+import tempfile
+from collections.abc import Callable, Coroutine
+from pathlib import Path
+from types import SimpleNamespace
+
+import fixtures
+from harness import Result, format_results, load_baseline, measure, save_results
+
+from leek.cogs import diagnoser, rage
+from leek.localization import l, la
+from leek.natives import format_lua_name, open_shared, parse_natives, write_shared
+
+DEFAULT_BASELINE = Path(__file__).with_name("baseline.json")
+# the number of items processed by the benchmarks that report their throughput
+ITEMS: dict[str, int] = {}
+
+
+def _run_coroutine(coroutine: Coroutine) -> object:
+    # the autocomplete functions don't await anything, so they can be driven without an event loop
+    try:
+        coroutine.send(None)
+    except StopIteration as e:
+        return e.value
+    raise RuntimeError("The coroutine was suspended")  # noqa: TRY003
+
+
+def _from_module(path: str, source: str) -> Callable[[], object]:
+    # compile the call as if it came from the module, so l() and la() resolve the localization files of it
+    namespace = {"l": l, "la": la}
+    exec(compile(f"def call():\n    return {source}\n", path, "exec"), namespace)  # noqa: S102
+    return namespace["call"]
+
+
+def _stream_log(body: bytes) -> dict:
+    diagnosis = diagnoser.LogDiagnosis(diagnoser.MAX_BYTES)
+
+    for start in range(0, len(body), diagnoser.CHUNK_SIZE):
+        diagnosis.feed(body[start:start + diagnoser.CHUNK_SIZE])
+
+    return diagnosis.finish()
+
+
+def _diagnoser_benchmarks() -> dict[str, Callable[[], object]]:
+    benchmarks = {}
+
+    for size, lines in fixtures.LOG_SIZES.items():
+        log = fixtures.shvdn_log(lines)
+        benchmarks[f"diagnoser.get_problems[{size}]"] = lambda log=log: diagnoser.get_problems("en-US", log)
+        ITEMS[f"diagnoser.get_problems[{size}]"] = lines
+
+    # the same warning over and over, like a mod that fails to load its configuration every tick
+    repeated = [f"[00:00:00] {fixtures.LOG_PROBLEMS[6].format(1)}"] * 10_000
+    benchmarks["diagnoser.get_problems[repeated]"] = lambda: diagnoser.get_problems("en-US", repeated)
+    ITEMS["diagnoser.get_problems[repeated]"] = len(repeated)
+
+    # the huge log downloaded in chunks, like the diagnose command does
+    body = "\n".join(fixtures.shvdn_log(fixtures.LOG_SIZES["huge"])).encode()
+    benchmarks["diagnoser.LogDiagnosis[huge]"] = lambda: _stream_log(body)
+    ITEMS["diagnoser.LogDiagnosis[huge]"] = fixtures.LOG_SIZES["huge"]
+
+    findings = diagnoser.find_problems(fixtures.shvdn_log(fixtures.LOG_SIZES["huge"]))
+    benchmarks["diagnoser.localize_problems[huge]"] = lambda: diagnoser.localize_problems("es-ES", findings)
+
+    details = [line.split("] ", 2)[2] for line in fixtures.shvdn_log(fixtures.LOG_SIZES["medium"])
+               if any(x in line for x in diagnoser.LEVEL_MARKERS)]
+    benchmarks["diagnoser.match_rule"] = lambda: [diagnoser.match_rule(x) for x in details]
+    ITEMS["diagnoser.match_rule"] = len(details)
+
+    return benchmarks
+
+
+def _rage_benchmarks() -> dict[str, Callable[[], object]]:
+    datasets = {game: fixtures.natives_dataset(count, seed)
+                for seed, (game, count) in enumerate(fixtures.NATIVE_COUNTS.items())}
+    bodies = [json.dumps(x).encode() for x in datasets.values()]
+    fixtures.load_natives(datasets)
+
+    natives = list(rage.NATIVES.get("gtav"))
+    first = natives[0]
+    last = natives[-1]
+    longest = max(natives, key=lambda x: len(x.params))
+
+    shared_path = Path(tempfile.mkdtemp()) / "natives.bin"
+    write_shared(shared_path, rage.NATIVES.indexes)
+    shared = open_shared(shared_path)["gtav"]
+
+    def autocomplete(query: str) -> Callable[[], object]:
+        ctx = SimpleNamespace(value=query, options={"game": "gtav"})
+        return lambda: _run_coroutine(rage.get_natives(ctx))
+
+    return {
+        "natives.parse_natives[all]": lambda: [parse_natives(x) for x in bodies],
+        "rage.find_native[first]": lambda: rage.find_native(first.name, "gtav"),
+        "rage.find_native[last]": lambda: rage.find_native(last.name, "gtav"),
+        "rage.find_native[hash]": lambda: rage.find_native(last.hash, "gtav"),
+        "rage.find_native[missing]": lambda: rage.find_native("NOT_A_NATIVE", "gtav"),
+        "natives.write_shared[all]": lambda: write_shared(shared_path, rage.NATIVES.indexes),
+        "natives.shared.find[last]": lambda: shared.find(last.name),
+        "natives.shared.find[missing]": lambda: shared.find("NOT_A_NATIVE"),
+        "natives.shared.open[all]": lambda: open_shared(shared_path),
+        "natives.shared.search[get_pla]": lambda: shared.search("get_pla"),
+        "natives.shared.search[zz]": lambda: shared.search("zz"),
+        "natives.shared.search_text[player vehicle]": lambda: shared.search_text("player vehicle"),
+        "rage.get_natives[g]": autocomplete("g"),
+        "rage.get_natives[get_pla]": autocomplete("get_pla"),
+        "rage.get_natives[set_vehicle_door]": autocomplete("set_vehicle_door"),
+        "rage.get_natives[0x]": autocomplete("0x"),
+        "natives.search_text[player vehicle]": lambda: rage.NATIVES.get("gtav").search_text("player vehicle"),
+        "natives.search_text[door]": lambda: rage.NATIVES.get("gtav").search_text("door"),
+        "rage.format_params": lambda: rage.format_params(longest.params),
+        "rage.render_native": lambda: rage.render_native(longest),
+        "rage.EMBEDS.get[hit]": lambda: rage.EMBEDS.get("gtav", longest),
+        "rage.format_lua_name": lambda: format_lua_name(last.name),
+    }
+
+
+def _localization_benchmarks() -> dict[str, Callable[[], object]]:
+    return {
+        "localization.l": _from_module(rage.__file__, "l('COMMAND_NATIVE_DESC', 'es-ES')"),
+        "localization.l[format]": _from_module(diagnoser.__file__, "l('MESSAGE_DIAGNOSE_FOUND', 'en-US', 2, 3)"),
+        "localization.la": _from_module(rage.__file__, "la('COMMAND_NATIVE_NAME')"),
+    }
+
+
+def main() -> None:
+    """
+    Runs the benchmarks and prints the results.
+    """
+    parser = argparse.ArgumentParser(description="Runs the offline benchmarks of Leek")
+    parser.add_argument("-k", "--filter", default="*", help="only run the benchmarks that match this glob pattern")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="the results to compare against")
+    parser.add_argument("--save", action="store_true", help="save the results as the new baseline")
+    parser.add_argument("--repeat", type=int, default=5, help="the number of measurements per benchmark")
+    args = parser.parse_args()
+
+    benchmarks = {**_diagnoser_benchmarks(), **_rage_benchmarks(), **_localization_benchmarks()}
+    results: list[Result] = []
+
+    for name, function in benchmarks.items():
+        if not fnmatch.fnmatch(name, args.filter):
+            continue
+
+        results.append(measure(name, function, args.repeat, ITEMS.get(name, 1)))
+        print(f"Finished {name}", flush=True)
+
+    if not results:
+        print(f"No benchmarks match {args.filter}")
+        return
+
+    print(format_results(results, load_baseline(args.baseline)))
+
+    if args.save:
+        save_results(args.baseline, results)
+        print(f"Saved the results to {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
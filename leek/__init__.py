@@ -1,5 +1,6 @@
 __version__ = "0.1.0"
 
-from .bot import LeekBot
+from .bot import LeekBot, LeekContext
+from .database import PoolStatistics
 from .exception import *
-from .localization import d, l, la
+from .localization import Localizer, d, get_localizer, l, la
@@ -2,17 +2,25 @@
 Starts the Leek bot and the desired cogs.
 """
 
+import argparse
+import asyncio
 import importlib
 import logging
 import os
 import sys
+import time
 import warnings
+from pathlib import Path
 from typing import Optional, Union
 
-from discord import Cog, Intents
+from discord import Cog, Intents, MemberCacheFlags
 from dotenv import load_dotenv
 
 from .bot import LeekBot
+from .cluster import HEALTH_INTERVAL, Cluster, WorkerInfo, fetch_shard_count
+from .localization import get_load_time
+from .startup import StartupReport
+from .tracing import Tracer
 
 LOGGER = logging.getLogger("leek")
 
@@ -35,7 +43,23 @@ def _get_int_safe(key: str, default: Optional[int] = None) -> Optional[int]:
         return None
 
 
-def _get_sql_connection() -> Optional[dict[str, Union[str, int, None]]]:
+def _get_float_safe(key: str, default: Optional[float] = None) -> Optional[float]:
+    """
+    Gets an environment variable safely as a float.
+    :param key: The environment variable to get.
+    :param default: The default value to use, if is not present.
+    :return: The variable as a float, or None if is not valid.
+    """
+    try:
+        return float(os.environ.get(key, default))
+    except TypeError:
+        return None
+    except ValueError:
+        LOGGER.exception("Environment variable %s is not a valid number!", key)
+        return None
+
+
+def _get_sql_connection() -> Optional[dict[str, Union[str, int, float, None]]]:
     """
     Gets the SQL Connection details from the environment variables.
     :return: The SQL Connection details as a dictionary.
@@ -47,34 +71,98 @@ def _get_sql_connection() -> Optional[dict[str, Union[str, int, None]]]:
         "password": os.environ.get("SQL_PASSWORD", None),
         "db": os.environ.get("SQL_DB", "leek")
     }
-    return None if any(x is None for x in config.values()) else config
 
+    if any(x is None for x in config.values()):
+        return None
 
-def main() -> None:
+    pool = {
+        "minsize": _get_int_safe("SQL_POOL_MIN", 1),
+        "maxsize": _get_int_safe("SQL_POOL_MAX", 10),
+        "pool_recycle": _get_float_safe("SQL_POOL_RECYCLE", 3600.0)
+    }
+    # invalid pool values use the defaults of the bot instead of disabling the database entirely
+    config.update({key: value for key, value in pool.items() if value is not None})
+    return config
+
+
+def _get_http_options() -> dict[str, Union[str, int, float]]:
     """
-    Starts the bot.
+    Gets the HTTP session options from the environment variables.
+    :return: The options that were set and are valid.
     """
-    logging.basicConfig(level=logging.INFO)
+    options = {
+        "limit": _get_int_safe("HTTP_LIMIT"),
+        "limit_per_host": _get_int_safe("HTTP_LIMIT_PER_HOST"),
+        "ttl_dns_cache": _get_int_safe("HTTP_DNS_TTL"),
+        "keepalive_timeout": _get_float_safe("HTTP_KEEPALIVE"),
+        "timeout": _get_float_safe("HTTP_TIMEOUT"),
+        "connect_timeout": _get_float_safe("HTTP_CONNECT_TIMEOUT"),
+        "read_timeout": _get_float_safe("HTTP_READ_TIMEOUT"),
+        "cache_directory": os.environ.get("HTTP_CACHE_DIR", None),
+        "cache_size": _get_int_safe("HTTP_CACHE_SIZE")
+    }
+    return {key: value for key, value in options.items() if value is not None}
 
-    load_dotenv()
 
-    if "DISCORD_TOKEN" not in os.environ:
-        LOGGER.error("Discord Token is not set")
-        sys.exit(2)
+def _get_metrics_address(worker: Optional[WorkerInfo]) -> Optional[tuple[str, int]]:
+    """
+    Gets the address of the metrics server from the environment variables.
+    :param worker: The worker of the cluster, whose metrics are served on the port after the previous worker.
+    :return: The host and port, or None if the metrics are disabled.
+    """
+    port = _get_int_safe("METRICS_PORT")
 
-    debug_guilds = [int(x) for x in os.environ.get("DISCORD_GUILDS", "").split(",") if x]
+    if port is None:
+        return None
 
-    if debug_guilds:
-        LOGGER.info("Found Guilds in debug mode: %s", debug_guilds)
+    return os.environ.get("METRICS_HOST", "127.0.0.1"), port + (0 if worker is None else worker.index)
 
-    bot = LeekBot(debug=os.environ.get("DISCORD_DEBUG", "0") != "0",
-                  pool_info=_get_sql_connection(),
-                  intents=Intents.all(),
-                  debug_guilds=debug_guilds)
 
-    cogs_to_load = os.environ.get("DISCORD_COGS", "").split(",")
+def _get_ping_interval() -> Optional[float]:
+    """
+    Gets the seconds between the pings of the database from the environment variables.
+    :return: The seconds between the pings, or None if the pings are disabled.
+    """
+    interval = _get_float_safe("SQL_PING_INTERVAL", 60.0)
+
+    # zero and negative values would ping the database without waiting, so they disable the pings instead
+    if interval is None or interval <= 0:
+        return None
+
+    return interval
+
+
+def _get_tracer(worker: Optional[WorkerInfo]) -> Optional[Tracer]:
+    """
+    Gets the tracer configured in the environment variables.
+    :param worker: The worker of the cluster, whose traces are written to a separate file.
+    :return: The tracer, or None if tracing is disabled.
+    """
+    if os.environ.get("LEEK_TRACE", "0") == "0":
+        return None
 
-    for cog_name in cogs_to_load:
+    path = Path(os.environ.get("LEEK_TRACE_FILE", "traces.jsonl"))
+
+    if worker is not None:
+        path = path.with_suffix(f".{worker.index}{path.suffix}")
+    sample_rate = _get_float_safe("LEEK_TRACE_SAMPLE", 1.0)
+
+    if sample_rate is None:
+        sample_rate = 1.0
+
+    LOGGER.info("Tracing %s%% of the interactions to %s", sample_rate * 100, path)
+    return Tracer(path, sample_rate)
+
+
+def _import_cogs(names: list[str]) -> list[tuple[str, type[Cog]]]:
+    """
+    Imports the classes of the cogs, without creating them.
+    :param names: The names of the cogs, in the module:class format.
+    :return: The names and classes of the cogs that were imported successfully.
+    """
+    cogs = []
+
+    for cog_name in names:
         name = cog_name.strip()
 
         if not name:
@@ -102,6 +190,77 @@ def main() -> None:
             LOGGER.error("Class '%s' does not inherits from a Cog", name)
             continue
 
+        cogs.append((name, cog))
+
+    return cogs
+
+
+def _get_intents(cogs: list[tuple[str, type[Cog]]]) -> tuple[Intents, MemberCacheFlags]:
+    """
+    Gets the gateway intents and member cache flags required by the cogs.
+    :param cogs: The names and classes of the cogs that will be loaded.
+    :return: The union of the intents and the member cache flags of the cogs.
+    """
+    # guilds are always required to resolve the guilds and channels of the commands
+    intents = Intents(guilds=True)
+    member_cache = MemberCacheFlags.none()
+
+    for name, cog in cogs:
+        required = getattr(cog, "required_intents", None)
+
+        if required is None:
+            LOGGER.warning("Cog %s does not declare the intents that requires, using the default intents", name)
+            required = Intents.default()
+
+        intents |= required
+        member_cache |= getattr(cog, "required_member_cache", MemberCacheFlags.none())
+
+    return intents, member_cache
+
+
+def _create_bot(report: Optional[StartupReport], worker: Optional[WorkerInfo]) -> LeekBot:
+    """
+    Creates the bot and adds the cogs to it.
+    :param report: The report where the startup times will be added, or None to not report them.
+    :param worker: The worker of the cluster that will run the bot, or None if the bot is not running in a cluster.
+    :return: The bot.
+    """
+    debug_guilds = [int(x) for x in os.environ.get("DISCORD_GUILDS", "").split(",") if x]
+
+    if debug_guilds:
+        LOGGER.info("Found Guilds in debug mode: %s", debug_guilds)
+
+    localization_time = get_load_time()
+    start = time.perf_counter()
+    # the cogs are imported before creating the bot, so only the modules of the selected cogs are loaded
+    cogs = _import_cogs(os.environ.get("DISCORD_COGS", "").split(","))
+    import_time = time.perf_counter() - start
+
+    intents, member_cache = _get_intents(cogs)
+    LOGGER.info("Using intents %s and member cache flags %s", intents.value, member_cache.value)
+
+    shards = {} if worker is None else {"shard_ids": list(worker.shard_ids), "shard_count": worker.shard_count}
+
+    start = time.perf_counter()
+    bot = LeekBot(debug=os.environ.get("DISCORD_DEBUG", "0") != "0",
+                  pool_info=_get_sql_connection(),
+                  pool_timeout=_get_float_safe("SQL_POOL_TIMEOUT", 10.0),
+                  pool_ping_interval=_get_ping_interval(),
+                  http_options=_get_http_options(),
+                  metrics_address=_get_metrics_address(worker),
+                  tracer=_get_tracer(worker),
+                  startup_report=report,
+                  worker=worker,
+                  intents=intents,
+                  member_cache_flags=member_cache,
+                  chunk_guilds_at_startup=False,
+                  debug_guilds=debug_guilds,
+                  **shards)
+    bot_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+
+    for name, cog in cogs:
         LOGGER.info("Adding cog %s", name)
 
         try:
@@ -112,8 +271,85 @@ def main() -> None:
         finally:
             LOGGER.info("Successfully added cog %s", name)
 
+    cog_time = time.perf_counter() - start
+
+    if report is not None:
+        # the localization files are loaded while importing and creating the cogs, so is reported separately
+        localization_time = get_load_time() - localization_time
+        report.add("cog imports", import_time)
+        report.add("bot construction", bot_time)
+        report.add("cog construction", cog_time)
+        report.add("localization load (included above)", localization_time)
+
     warnings.filterwarnings(os.environ.get("SQL_WARNINGS", "ignore"), module="aiomysql")
 
+    return bot
+
+
+def _run_worker(worker: WorkerInfo) -> None:
+    """
+    Starts the bot of a worker process of the cluster.
+    :param worker: The worker information.
+    """
+    logging.basicConfig(level=logging.INFO, format=f"[worker {worker.index}] %(levelname)s:%(name)s:%(message)s")
+
+    load_dotenv()
+
+    bot = _create_bot(None, worker)
+    bot.run(os.environ["DISCORD_TOKEN"])
+
+
+def _run_cluster(workers: int) -> None:
+    """
+    Starts the bot in multiple worker processes, with the shards split between them.
+    :param workers: The number of worker processes.
+    """
+    shard_count = _get_int_safe("DISCORD_SHARDS")
+
+    if shard_count is None:
+        shard_count = asyncio.run(fetch_shard_count(os.environ["DISCORD_TOKEN"]))
+        LOGGER.info("Using %s shards recommended by Discord", shard_count)
+
+    if workers > shard_count:
+        LOGGER.warning("There are more workers (%s) than shards (%s), only %s workers will be started", workers,
+                       shard_count, shard_count)
+
+    # the workers import this module again, as the functions of __main__ can't be pickled
+    cluster = Cluster(f"leek.__main__:{_run_worker.__name__}", shard_count, workers,
+                      _get_float_safe("CLUSTER_HEALTH_INTERVAL", HEALTH_INTERVAL) or HEALTH_INTERVAL)
+    cluster.run()
+
+
+def main() -> None:
+    """
+    Starts the bot.
+    """
+    parser = argparse.ArgumentParser(prog="leek", description="Starts the Leek bot.")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="print the time taken by every phase of the startup once the bot is ready")
+    parser.add_argument("--cluster", type=int, metavar="N",
+                        help="split the shards of the bot across N worker processes")
+    args = parser.parse_args()
+
+    report = StartupReport() if args.startup_report else None
+
+    logging.basicConfig(level=logging.INFO)
+
+    load_dotenv()
+
+    if "DISCORD_TOKEN" not in os.environ:
+        LOGGER.error("Discord Token is not set")
+        sys.exit(2)
+
+    if args.cluster is not None:
+        if args.cluster < 1:
+            parser.error("the number of workers must be at least 1")
+        if report is not None:
+            LOGGER.warning("The startup report is not available in cluster mode")
+        _run_cluster(args.cluster)
+        return
+
+    bot = _create_bot(report, None)
     bot.run(os.environ["DISCORD_TOKEN"])
 
 
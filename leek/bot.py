@@ -4,24 +4,57 @@ The core class for the Leek bot.
 
 from __future__ import annotations
 
+import asyncio
+import contextlib
 import logging
+import math
+import time
 import traceback
 from pathlib import Path
-from typing import TYPE_CHECKING, Optional
-
-import aiohttp
-import aiomysql
-from aiomysql import Connection, Pool
-from discord import ApplicationContext, AutoShardedBot, DiscordException, Embed, HTTPException, NotFound, SlashCommand
+from typing import TYPE_CHECKING, Any, Optional, Union
+
+from discord import (
+    ApplicationCommand,
+    ApplicationContext,
+    AutoShardedBot,
+    DiscordException,
+    Embed,
+    HTTPException,
+    Interaction,
+    NotFound,
+    SlashCommand,
+)
 
 import leek
 
+from .cache import CachedRequest, CacheStatistics, HttpCache
+from .cluster import report_health
+from .database import ConnectionPool, PooledConnection, PoolStatistics, QueryHook, Transaction
+from .exception import DatabaseUnavailableError
 from .localization import d, l, la
+from .metrics import (
+    Metrics,
+    MetricsServer,
+    format_cache_statistics,
+    format_http_statistics,
+    format_metric,
+    format_pool_statistics,
+)
+from .session import HostStatistics, HttpStatistics, create_session, make_timeout
+from .tracing import Tracer, span
 
 if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    import aiohttp
     from aiohttp.client import _RequestContextManager
+    from discord import WebhookMessage
+
+    from .cluster import WorkerInfo
+    from .startup import StartupReport
 
 LOGGER = logging.getLogger("leek")
+DEFAULT_CACHE_SIZE = 64 * 1024 * 1024
 
 
 def _is_running_on_docker() -> bool:
@@ -29,16 +62,47 @@ def _is_running_on_docker() -> bool:
     return mountinfo.is_file() and mountinfo.read_text().find("/docker/containers/") > -1
 
 
+class LeekContext(ApplicationContext):
+    """
+    The context of the application commands, with the responses added to the trace of the command.
+    """
+    async def respond(self, *args, **kwargs) -> Union[Interaction, WebhookMessage]:
+        """
+        Responds to the interaction, or sends a followup if it was already responded.
+        """
+        with span("discord.respond"):
+            return await super().respond(*args, **kwargs)
+
+    async def defer(self, *args, **kwargs) -> None:
+        """
+        Defers the response of the interaction.
+        """
+        with span("discord.defer"):
+            await self.interaction.response.defer(*args, **kwargs)
+
+
 class LeekBot(AutoShardedBot):
     """
     The core class for the Leek bot.
     """
-    def __init__(self, *args, debug: bool = False, pool_info: Optional[dict] = None, **kwargs):
+    def __init__(self, *args, debug: bool = False, pool_info: Optional[dict] = None,  # noqa: PLR0913
+                 pool_timeout: Optional[float] = None, pool_ping_interval: Optional[float] = None,
+                 http_options: Optional[dict] = None,
+                 metrics_address: Optional[tuple[str, int]] = None, tracer: Optional[Tracer] = None,
+                 startup_report: Optional[StartupReport] = None, worker: Optional[WorkerInfo] = None, **kwargs):
         """
         Creates a new instance of the Leek bot.
         :param args: The positional arguments that an AutoShardedBot take.
         :param debug: Whether the bot will run with debug mode enabled.
-        :param pool_info: The database pool information.
+        :param pool_info: The database connection and pool information (minsize, maxsize and pool_recycle).
+        :param pool_timeout: The maximum time in seconds to wait for a database connection, or None to wait forever.
+        :param pool_ping_interval: The seconds between every ping to the database, or None to not ping it.
+        :param http_options: The connector, timeout and cache options of the HTTP session.
+        :param metrics_address: The host and port where the metrics will be served, or None to not serve them.
+        :param tracer: The tracer used to record the commands and autocompletes, or None to disable tracing.
+        :param startup_report: The report where the time of the database pool and gateway connection are added and
+        printed once the bot is ready, or None to not report them.
+        :param worker: The worker of the cluster that runs this bot, or None if the bot is not running in a cluster.
         :param kwargs: The keyword arguments that an AutoShardedBot take.
         """
         if debug:
@@ -47,16 +111,36 @@ class LeekBot(AutoShardedBot):
         if pool_info is None:
             LOGGER.warning("DB Connection not present, some Cogs might not work")
 
-        if pool_info is not None:
-            pool_info["minsize"] = 0
-            pool_info["maxsize"] = 0
-            pool_info["pool_recycle"] = 60.0
-
         self.__docker = _is_running_on_docker()
         self.__session: Optional[aiohttp.ClientSession] = None
+        self.__http_options: Optional[dict] = http_options
+        self.__http_statistics: HttpStatistics = HttpStatistics()
+        self.__http_cache: Optional[HttpCache] = None
+
+        if http_options and http_options.get("cache_directory"):
+            self.__http_cache = HttpCache(Path(http_options["cache_directory"]),
+                                          http_options.get("cache_size", DEFAULT_CACHE_SIZE))
+
+        self.__metrics: Metrics = Metrics()
+        self.__metrics.add_collector(self.__collect_metrics)
+        self.__metrics_server: Optional[MetricsServer] = None
+        self.__tracer: Optional[Tracer] = tracer
+        self.__startup_report: Optional[StartupReport] = startup_report
+        self.__started_at: float = time.perf_counter()
+        self.__worker: Optional[WorkerInfo] = worker
+        self.__health_task: Optional[asyncio.Task] = None
+
+        if metrics_address is not None:
+            self.__metrics_server = MetricsServer(self.__metrics, *metrics_address)
+
         self.__debug: bool = debug
         self.__pool_info: Optional[dict] = pool_info
-        self.__pool: Optional[Pool] = None
+        self.__pool_timeout: Optional[float] = pool_timeout
+        self.__pool: Optional[ConnectionPool] = None
+        self.__pool_ping_interval: Optional[float] = pool_ping_interval
+        self.__ping_task: Optional[asyncio.Task] = None
+        self.__database_up: Optional[bool] = None
+        self.__query_hooks: list[QueryHook] = []
         super().__init__(*args, **kwargs)
 
         command = SlashCommand(self.__about,
@@ -68,9 +152,21 @@ class LeekBot(AutoShardedBot):
 
     async def __ensure_sesion(self) -> None:
         if self.__session is None:
-            self.__session = aiohttp.ClientSession(headers={
-                "User-Agent": "Leek/0.0.1"
-            })
+            self.__session = create_session(self.__http_options, self.__http_statistics)
+
+    def __open(self, method: str, *args, timeout: Union[aiohttp.ClientTimeout, float, None] = None,
+               **kwargs) -> _RequestContextManager:
+        # the timeout can be passed in seconds or as a ClientTimeout, and replaces the default timeout of the session
+        timeout = make_timeout(timeout)
+
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+
+        return self.__session.request(method, *args, **kwargs)
+
+    async def __request(self, method: str, *args, **kwargs) -> _RequestContextManager:
+        await self.__ensure_sesion()
+        return self.__open(method, *args, **kwargs)
 
     @property
     def is_in_docker(self) -> bool:
@@ -79,6 +175,64 @@ class LeekBot(AutoShardedBot):
         """
         return self.__docker
 
+    @property
+    def http_statistics(self) -> dict[str, HostStatistics]:
+        """
+        The number of requests, errors and the time that they took, grouped by host.
+        """
+        return self.__http_statistics.snapshot()
+
+    @property
+    def http_cache_statistics(self) -> Optional[CacheStatistics]:
+        """
+        The current usage of the HTTP cache, if enabled.
+        """
+        return None if self.__http_cache is None else self.__http_cache.statistics
+
+    @property
+    def metrics(self) -> Metrics:
+        """
+        The metrics of the bot. Cogs can add their own with Metrics.add_collector().
+        """
+        return self.__metrics
+
+    def __collect_metrics(self) -> str:
+        latencies = [((str(shard),), latency) for shard, latency in self.latencies]
+        parts = [format_metric("leek_gateway_latency_seconds", "gauge", "Heartbeat latency of the gateway shards.",
+                               ("shard",), latencies),
+                 format_http_statistics(self.__http_statistics.snapshot())]
+
+        if self.__pool is not None:
+            parts.append(format_pool_statistics(self.__pool.statistics))
+        if self.__pool is not None and self.__database_up is not None:
+            parts.append(format_metric("leek_db_up", "gauge", "Whether the database responded to the last ping.", (),
+                                       [((), float(self.__database_up))]))
+        if self.__http_cache is not None:
+            parts.append(format_cache_statistics(self.__http_cache.statistics))
+
+        return "".join(parts)
+
+    async def start_metrics_server(self) -> None:
+        """
+        Starts serving the metrics, if an address was specified. The bot does not need to be connected to Discord.
+        """
+        if self.__metrics_server is not None:
+            await self.__metrics_server.start()
+
+    @property
+    def worker(self) -> Optional[WorkerInfo]:
+        """
+        The worker of the cluster that runs this bot, or None if the bot is not running in a cluster.
+        """
+        return self.__worker
+
+    @property
+    def is_primary_worker(self) -> bool:
+        """
+        If this bot should run the tasks that must run only once, like the periodic tasks of the cogs.
+        """
+        return self.__worker is None or self.__worker.is_primary
+
     @property
     def debug(self) -> bool:
         """
@@ -94,7 +248,16 @@ class LeekBot(AutoShardedBot):
         return self.__pool is not None
 
     @property
-    def connection(self) -> Optional[Connection]:
+    def pool_statistics(self) -> Optional[PoolStatistics]:
+        """
+        The current usage of the database pool, if available.
+        """
+        if not self.is_pool_available:
+            return None
+        return self.__pool.statistics
+
+    @property
+    def connection(self) -> Optional[PooledConnection]:
         """
         Gathers a database connection from the pool, if available.
         """
@@ -102,54 +265,220 @@ class LeekBot(AutoShardedBot):
             return None
         return self.__pool.acquire()
 
-    async def get(self, *args, **kwargs) -> _RequestContextManager:
+    @property
+    def pool(self) -> ConnectionPool:
+        """
+        The database pool.
+        :raises DatabaseUnavailableError: If the database pool is not available.
+        """
+        if self.__pool is None:
+            raise DatabaseUnavailableError
+        return self.__pool
+
+    def add_query_hook(self, hook: QueryHook) -> None:
+        """
+        Adds a function that is called after every query with the query and the seconds that it took.
+        :param hook: The function to call.
+        """
+        self.__query_hooks.append(hook)
+
+        if self.__pool is not None:
+            self.__pool.add_query_hook(hook)
+
+    def transaction(self) -> Transaction:
+        """
+        Gets a context manager that runs the queries in a single transaction, committed when exiting.
+        :raises DatabaseUnavailableError: If the database pool is not available.
+        """
+        return self.pool.transaction()
+
+    async def fetch_one(self, query: str, args: Any = None) -> Optional[tuple]:  # noqa: ANN401
+        """
+        Executes a read query and gets the first row.
+        :param query: The query to execute.
+        :param args: The parameters of the query.
+        :return: The first row, or None if there are no rows.
+        :raises DatabaseUnavailableError: If the database pool is not available.
+        """
+        return await self.pool.fetch_one(query, args)
+
+    async def fetch_all(self, query: str, args: Any = None) -> Sequence[tuple]:  # noqa: ANN401
+        """
+        Executes a read query and gets all of the rows.
+        :param query: The query to execute.
+        :param args: The parameters of the query.
+        :return: The rows returned by the query.
+        :raises DatabaseUnavailableError: If the database pool is not available.
+        """
+        return await self.pool.fetch_all(query, args)
+
+    async def execute(self, query: str, args: Any = None) -> int:  # noqa: ANN401
+        """
+        Executes a single statement.
+        :param query: The query to execute.
+        :param args: The parameters of the query.
+        :return: The number of affected rows.
+        :raises DatabaseUnavailableError: If the database pool is not available.
+        """
+        return await self.pool.execute(query, args)
+
+    async def execute_many(self, query: str, args: Sequence[Any]) -> int:
+        """
+        Executes a statement once for every set of parameters in a single transaction.
+        :param query: The query to execute.
+        :param args: The sets of parameters.
+        :return: The number of affected rows.
+        :raises DatabaseUnavailableError: If the database pool is not available.
+        """
+        return await self.pool.execute_many(query, args)
+
+    async def ping_database(self) -> bool:
+        """
+        Checks whether the database is reachable.
+        :return: True if the database responded, False if it didn't or the pool is not available.
+        """
+        if not self.is_pool_available:
+            return False
+        return await self.__pool.ping()
+
+    @property
+    def database_up(self) -> Optional[bool]:
+        """
+        Whether the database responded to the last periodic ping, or None if it was not pinged yet.
+        """
+        return self.__database_up
+
+    async def __watch_database(self) -> None:
+        while True:
+            self.__database_up = await self.ping_database()
+            await asyncio.sleep(self.__pool_ping_interval)
+
+    async def get(self, url: str, *, cache: bool = False, **kwargs) -> Union[_RequestContextManager, CachedRequest]:
         """
         Makes a GET request.
+        :param url: The URL to request.
+        :param cache: Whether to store the body in the HTTP cache and revalidate it on the next requests. The body
+                      is read completely before returning the response. Ignored if the cache is not enabled.
         """
-        await self.__ensure_sesion()
-        return self.__session.get(*args, **kwargs)
+        if cache and self.__http_cache is not None:
+            await self.__ensure_sesion()
+            return CachedRequest(self.__open, self.__http_cache, url, **kwargs)
+
+        return await self.__request("GET", url, **kwargs)
 
     async def post(self, *args, **kwargs) -> _RequestContextManager:
         """
         Makes a POST request.
         """
-        await self.__ensure_sesion()
-        return self.__session.post(*args, **kwargs)
+        return await self.__request("POST", *args, **kwargs)
 
     async def put(self, *args, **kwargs) -> _RequestContextManager:
         """
         Makes a PUT request.
         """
-        await self.__ensure_sesion()
-        return self.__session.put(*args, **kwargs)
+        return await self.__request("PUT", *args, **kwargs)
 
     async def delete(self, *args, **kwargs) -> _RequestContextManager:
         """
         Makes a DELETE request.
         """
-        await self.__ensure_sesion()
-        return self.__session.delete(*args, **kwargs)
+        return await self.__request("DELETE", *args, **kwargs)
 
     async def head(self, *args, **kwargs) -> _RequestContextManager:
         """
         Makes a HEAD request.
         """
-        await self.__ensure_sesion()
-        return self.__session.head(*args, **kwargs)
+        return await self.__request("HEAD", *args, **kwargs)
 
     async def options(self, *args, **kwargs) -> _RequestContextManager:
         """
         Makes a OPTIONS request.
         """
-        await self.__ensure_sesion()
-        return self.__session.options(*args, **kwargs)
+        return await self.__request("OPTIONS", *args, **kwargs)
 
     async def patch(self, *args, **kwargs) -> _RequestContextManager:
         """
         Makes a PATCH request.
         """
-        await self.__ensure_sesion()
-        return self.__session.patch(*args, **kwargs)
+        return await self.__request("PATCH", *args, **kwargs)
+
+    async def start(self, token: str, *, reconnect: bool = True) -> None:
+        """
+        Starts serving the metrics and connects to Discord.
+        :param token: The authentication token of the bot.
+        :param reconnect: Whether to reconnect after a failure or a logout.
+        """
+        await self.start_metrics_server()
+        self.__started_at = time.perf_counter()
+
+        if self.__worker is not None and self.__worker.health is not None:
+            self.__health_task = asyncio.create_task(self.__report_health())
+
+        await super().start(token, reconnect=reconnect)
+
+    async def __report_health(self) -> None:
+        def latency() -> float:
+            latencies = [x for _, x in self.latencies if not math.isnan(x)]  # nan until the shard gets a heartbeat
+            return sum(latencies) / len(latencies) if latencies else float("nan")
+
+        await report_health(self.__worker, self.is_ready, lambda: len(self.guilds), latency, lambda: self.__database_up)
+
+    def __trace(self, name: str, command: ApplicationCommand) -> contextlib.AbstractContextManager:
+        if self.__tracer is None:
+            return contextlib.nullcontext()
+        return self.__tracer.trace(name, command=command.qualified_name)
+
+    async def get_application_context(self, interaction: Interaction,
+                                      cls: type[ApplicationContext] = LeekContext) -> ApplicationContext:
+        """
+        Gets the context of an application command, using LeekContext by default.
+        :param interaction: The interaction of the command.
+        :param cls: The class of the context.
+        :return: The context of the command.
+        """
+        return await super().get_application_context(interaction, cls=cls)
+
+    async def invoke_application_command(self, ctx: ApplicationContext) -> None:
+        """
+        Invokes an application command, recording the time that it took and tracing it if enabled.
+        :param ctx: The context of the command.
+        """
+        start = time.perf_counter()
+
+        try:
+            with self.__trace("command", ctx.command):
+                await super().invoke_application_command(ctx)
+        finally:
+            self.__metrics.commands.observe(time.perf_counter() - start, ctx.command.qualified_name)
+
+    async def on_application_command_auto_complete(self, interaction: Interaction,
+                                                   command: ApplicationCommand) -> None:
+        """
+        Runs the autocomplete callback of a command, recording the time that it took and tracing it if enabled.
+        :param interaction: The autocomplete interaction.
+        :param command: The command being autocompleted.
+        """
+        # same as the pycord implementation, with the callback timed
+        async def callback() -> None:
+            start = time.perf_counter()
+
+            try:
+                with self.__trace("autocomplete", command):
+                    ctx = await self.get_autocomplete_context(interaction)
+                    interaction.command = command
+                    await command.invoke_autocomplete_callback(ctx)
+            finally:
+                self.__metrics.autocomplete.observe(time.perf_counter() - start, command.qualified_name)
+
+        autocomplete_task = self.loop.create_task(callback())
+
+        try:
+            await self.wait_for("application_command_auto_complete", check=lambda _, c: c == command, timeout=3)
+        except asyncio.TimeoutError:
+            return
+        else:
+            if not autocomplete_task.done():
+                autocomplete_task.cancel()
 
     async def on_connect(self) -> None:
         """
@@ -157,8 +486,47 @@ class LeekBot(AutoShardedBot):
         """
         await super().on_connect()
 
-        if self.__pool_info is not None:
-            self.__pool = await aiomysql.create_pool(**self.__pool_info)
+        # on_connect is also triggered after every reconnect, so the pool is only created once
+        if self.__pool_info is not None and self.__pool is None:
+            start = time.perf_counter()
+            self.__pool = await ConnectionPool.create(self.__pool_info, self.__pool_timeout)
+
+            if self.__startup_report is not None:
+                self.__startup_report.add("database pool", time.perf_counter() - start)
+
+            for hook in self.__query_hooks:
+                self.__pool.add_query_hook(hook)
+
+            if self.__pool_ping_interval is not None and self.__pool_ping_interval > 0:
+                self.__ping_task = asyncio.create_task(self.__watch_database())
+
+    async def close(self) -> None:
+        """
+        Closes the connection to Discord, the metrics server, the database pool and the HTTP session.
+        """
+        await super().close()
+
+        if self.__health_task is not None:
+            self.__health_task.cancel()
+            self.__health_task = None
+
+        if self.__ping_task is not None:
+            self.__ping_task.cancel()
+            self.__ping_task = None
+
+        if self.__metrics_server is not None:
+            await self.__metrics_server.stop()
+
+        if self.__pool is not None:
+            await self.__pool.close()
+            self.__pool = None
+
+        if self.__session is not None:
+            await self.__session.close()
+            self.__session = None
+
+        if self.__tracer is not None:
+            self.__tracer.close()
 
     async def on_ready(self) -> None:
         """
@@ -166,12 +534,19 @@ class LeekBot(AutoShardedBot):
         """
         LOGGER.info("Bot is Ready to start working!")
 
+        if self.__startup_report is not None:
+            self.__startup_report.add("gateway ready", time.perf_counter() - self.__started_at)
+            self.__startup_report.print_once()
+            self.__startup_report = None
+
     async def on_application_command_error(self, ctx: ApplicationContext, exception: DiscordException) -> None:
         """
         Handles the exceptions generated by application commands.
         :param ctx: The context of the command.
         :param exception: The exception that was raised.
         """
+        self.__metrics.command_errors.inc(ctx.command.qualified_name)
+
         if self.debug:
             info = traceback.format_exception(type(exception), exception, exception.__traceback__)
             text = "\n".join(info)
@@ -0,0 +1,356 @@
+"""
+The on-disk cache of HTTP responses used by the Leek bot.
+
+Cached responses are revalidated with ``If-None-Match`` and ``If-Modified-Since``, so an unchanged resource only costs
+a ``304 Not Modified`` response instead of the full body.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Optional
+
+import aiohttp
+
+from .tracing import span
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+    from types import TracebackType
+
+    from aiohttp.client import _RequestContextManager
+    from multidict import CIMultiDictProxy
+    from yarl import URL
+
+LOGGER = logging.getLogger("leek")
+INDEX_NAME = "index.json"
+
+
+@dataclass(frozen=True)
+class CacheStatistics:
+    """
+    A snapshot of the usage of the HTTP cache.
+    """
+    entries: int
+    size: int
+    max_size: int
+    hits: int
+    misses: int
+
+
+class CachedResponse:
+    """
+    A response with the body already read, either from the network or from the cache.
+    """
+    def __init__(self, response: aiohttp.ClientResponse, status: int, body: bytes, from_cache: bool):
+        """
+        Creates a new response.
+        :param response: The response that was received from the network.
+        :param status: The status code of the response.
+        :param body: The body of the response.
+        :param from_cache: Whether the body was served from the cache.
+        """
+        self.__response: aiohttp.ClientResponse = response
+        self.__body: bytes = body
+        self.status: int = status
+        self.from_cache: bool = from_cache
+
+    @property
+    def ok(self) -> bool:
+        """
+        Whether the status code is lower than 400.
+        """
+        return self.status < 400
+
+    @property
+    def url(self) -> URL:
+        """
+        The URL of the response.
+        """
+        return self.__response.url
+
+    @property
+    def headers(self) -> CIMultiDictProxy[str]:
+        """
+        The headers of the response received from the network.
+        """
+        return self.__response.headers
+
+    def raise_for_status(self) -> None:
+        """
+        Raises an exception if the status code is 400 or higher.
+        """
+        if not self.ok:
+            raise aiohttp.ClientResponseError(self.__response.request_info,
+                                              self.__response.history,
+                                              status=self.status,
+                                              message=self.__response.reason or "",
+                                              headers=self.__response.headers)
+
+    async def read(self) -> bytes:
+        """
+        Gets the body of the response.
+        """
+        return self.__body
+
+    async def text(self, encoding: Optional[str] = None) -> str:
+        """
+        Gets the body of the response as text.
+        :param encoding: The encoding of the body, taken from the response (or UTF-8) if not specified.
+        """
+        return self.__body.decode(encoding or self.__response.charset or "utf-8")
+
+    async def json(self, *, loads: Callable[[str], Any] = json.loads,
+                   content_type: Optional[str] = "application/json") -> Any:  # noqa: ANN401, ARG002
+        """
+        Gets the body of the response parsed as JSON. The content type is not checked.
+        """
+        return loads(self.__body.decode(self.__response.charset or "utf-8"))
+
+
+class HttpCache:
+    """
+    A size bounded store of HTTP response bodies and their validators, evicting the least recently used entries.
+    """
+    def __init__(self, directory: Path, max_size: int):
+        """
+        Creates a new cache.
+        :param directory: The directory where the bodies and the index are stored.
+        :param max_size: The maximum size in bytes of all of the stored bodies.
+        """
+        self.__directory: Path = directory
+        self.__max_size: int = max_size
+        self.__index: Optional[dict[str, dict[str, Any]]] = None
+        self.__lock: asyncio.Lock = asyncio.Lock()
+        self.__hits: int = 0
+        self.__misses: int = 0
+
+    @property
+    def statistics(self) -> CacheStatistics:
+        """
+        The current usage of the cache.
+        """
+        index = self.__index or {}
+        return CacheStatistics(entries=len(index),
+                               size=sum(x["size"] for x in index.values()),
+                               max_size=self.__max_size,
+                               hits=self.__hits,
+                               misses=self.__misses)
+
+    def record(self, hit: bool) -> None:
+        """
+        Counts a request made through the cache.
+        :param hit: Whether the body was served from the cache.
+        """
+        if hit:
+            self.__hits += 1
+        else:
+            self.__misses += 1
+
+    @staticmethod
+    def __key(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def __load_index(self) -> dict[str, dict[str, Any]]:
+        self.__directory.mkdir(parents=True, exist_ok=True)
+
+        try:
+            with (self.__directory / INDEX_NAME).open(encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError:
+            LOGGER.exception("HTTP cache index is corrupted, starting with an empty cache")
+            return {}
+
+    def __save_index(self, index: dict[str, dict[str, Any]]) -> None:
+        path = self.__directory / INDEX_NAME
+        temp = path.with_suffix(".tmp")
+
+        with temp.open("w", encoding="utf-8") as file:
+            json.dump(index, file)
+
+        temp.replace(path)
+
+    async def __ensure_index(self) -> dict[str, dict[str, Any]]:
+        if self.__index is None:
+            self.__index = await asyncio.to_thread(self.__load_index)
+        return self.__index
+
+    async def validators(self, url: str) -> dict[str, str]:
+        """
+        Gets the conditional request headers for a cached URL.
+        :param url: The URL to request.
+        :return: The headers to send, empty if the URL is not cached.
+        """
+        entry = (await self.__ensure_index()).get(self.__key(url))
+
+        if entry is None:
+            return {}
+
+        headers = {}
+
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+        return headers
+
+    async def load(self, url: str) -> Optional[bytes]:
+        """
+        Loads the body of a cached URL and marks it as recently used.
+        :param url: The URL that was requested.
+        :return: The body, or None if it is no longer available.
+        """
+        key = self.__key(url)
+
+        try:
+            body = await asyncio.to_thread((self.__directory / key).read_bytes)
+        except FileNotFoundError:
+            LOGGER.warning("Body of %s is missing from the HTTP cache", url)
+            await self.remove(url)
+            return None
+
+        # the last use is saved to disk with the next change of the index, it only matters for the eviction order
+        entry = (await self.__ensure_index()).get(key)
+
+        if entry is not None:
+            entry["used"] = time.time()
+
+        return body
+
+    async def store(self, url: str, body: bytes, etag: Optional[str], last_modified: Optional[str]) -> None:
+        """
+        Stores the body of a URL, evicting the least recently used entries if the cache is full.
+        :param url: The URL that was requested.
+        :param body: The body of the response.
+        :param etag: The ETag header of the response.
+        :param last_modified: The Last-Modified header of the response.
+        """
+        if len(body) > self.__max_size:
+            LOGGER.info("Not caching %s, the body (%s bytes) is bigger than the cache", url, len(body))
+            return
+
+        key = self.__key(url)
+
+        async with self.__lock:
+            index = await self.__ensure_index()
+            index[key] = {
+                "url": url,
+                "etag": etag,
+                "last_modified": last_modified,
+                "size": len(body),
+                "used": time.time()
+            }
+
+            size = sum(x["size"] for x in index.values())
+            evicted = []
+
+            for old_key, entry in sorted(index.items(), key=lambda x: x[1]["used"]):
+                if size <= self.__max_size:
+                    break
+                if old_key == key:
+                    continue
+                size -= entry["size"]
+                evicted.append(old_key)
+
+            for old_key in evicted:
+                LOGGER.info("Evicting %s from the HTTP cache", index.pop(old_key)["url"])
+
+            def write() -> None:
+                (self.__directory / key).write_bytes(body)
+
+                for old_key in evicted:
+                    (self.__directory / old_key).unlink(missing_ok=True)
+
+                self.__save_index(index)
+
+            await asyncio.to_thread(write)
+
+    async def remove(self, url: str) -> None:
+        """
+        Removes a URL from the cache.
+        :param url: The URL to remove.
+        """
+        key = self.__key(url)
+
+        async with self.__lock:
+            index = await self.__ensure_index()
+
+            if index.pop(key, None) is not None:
+                await asyncio.to_thread(self.__save_index, dict(index))
+
+
+class CachedRequest:
+    """
+    Context manager that makes a conditional GET request, serving the body from the cache if it was not modified.
+    """
+    def __init__(self, request: Callable[..., _RequestContextManager], cache: HttpCache, url: str, **kwargs):
+        """
+        Creates a new cached request.
+        :param request: The function that makes the request, with the same signature as ClientSession.request.
+        :param cache: The cache to use.
+        :param url: The URL to request.
+        :param kwargs: The additional arguments of the request.
+        """
+        self.__request: Callable[..., _RequestContextManager] = request
+        self.__cache: HttpCache = cache
+        self.__url: str = url
+        self.__kwargs: dict = kwargs
+
+    async def __fetch(self, conditional: bool) -> Optional[CachedResponse]:
+        headers = dict(self.__kwargs.get("headers") or {})
+
+        if conditional:
+            headers.update(await self.__cache.validators(self.__url))
+
+        kwargs = {**self.__kwargs, "headers": headers}
+
+        async with self.__request("GET", self.__url, **kwargs) as response:
+            if response.status == 304:
+                body = await self.__cache.load(self.__url)
+                return None if body is None else CachedResponse(response, 200, body, True)
+
+            body = await response.read()
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+
+            if response.status == 200 and (etag or last_modified):
+                await self.__cache.store(self.__url, body, etag, last_modified)
+
+            return CachedResponse(response, response.status, body, False)
+
+    async def __aenter__(self) -> CachedResponse:
+        """
+        Makes the request.
+        """
+        response = None
+
+        try:
+            with span("http.cached") as current:
+                response = await self.__fetch(True)
+
+                # the cache lost the body after sending the validators, so request it again without them
+                if response is None:
+                    response = await self.__fetch(False)
+
+                if current is not None:
+                    current.attributes["from_cache"] = response.from_cache
+        finally:
+            # every request that was not served from the disk is a miss, even if it failed or was not cacheable
+            self.__cache.record(response is not None and response.from_cache)
+
+        return response
+
+    async def __aexit__(self, exc_type: Optional[type[BaseException]], exc: Optional[BaseException],
+                        tb: Optional[TracebackType]) -> None:
+        """
+        Does nothing, the connection was already released after reading the body.
+        """
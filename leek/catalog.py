@@ -0,0 +1,160 @@
+"""
+The compiler for the precompiled localization catalogs of the Leek bot.
+
+A catalog contains every ``<module>.<locale>.json`` file of a package, with the US English labels already merged into
+the other locales. This module only uses the standard library, so it can also be used during the package build.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Optional
+
+LOGGER = logging.getLogger("leek")
+CATALOG_NAME = "localization.catalog.json"
+CATALOG_VERSION = 2
+DEFAULT_LOCALE = "en-US"
+LOCALES = [
+    "id",
+    "da",
+    "de",
+    "en-GB",
+    "en-US",
+    "es-ES",
+    "fr",
+    "hr",
+    "it",
+    "hu",
+    "nl",
+    "no",
+    "pl",
+    "pt-BR",
+    "ro",
+    "fi",
+    "sv-SE",
+    "vi",
+    "tr",
+    "cs",
+    "el",
+    "bg",
+    "ru",
+    "ul",
+    "hi",
+    "th",
+    "zh-CN",
+    "ja",
+    "zh-TW",
+    "ko"
+]
+
+
+def find_localization_files(directory: Path) -> dict[str, dict[str, Path]]:
+    """
+    Finds the localization files of the modules in a directory.
+    :param directory: The directory of the package.
+    :return: A dictionary with the module names as keys and the paths of the files for each locale as values.
+    """
+    found: dict[str, dict[str, Path]] = {}
+
+    for path in directory.glob("*.json"):
+        module, _, locale = path.name.removesuffix(".json").partition(".")
+
+        if locale in LOCALES:
+            found.setdefault(module, {})[locale] = path
+
+    return found
+
+
+def hash_source(content: bytes) -> str:
+    """
+    Hashes the contents of a localization file, to check if the file changed after compiling the catalog.
+    :param content: The contents of the file.
+    :return: The SHA-256 hash of the contents, in hexadecimal.
+    """
+    return hashlib.sha256(content).hexdigest()
+
+
+def compile_catalog(directory: Path) -> Optional[Path]:
+    """
+    Compiles the localization files of a package into a single catalog.
+    :param directory: The directory of the package.
+    :return: The path of the catalog, or None if the package does not has localization files.
+    """
+    files = find_localization_files(directory)
+
+    if not files:
+        return None
+
+    modules = {}
+    sources = {}
+
+    for module, paths in sorted(files.items()):
+        loaded: dict[str, dict[str, str]] = {}
+
+        for locale in LOCALES:
+            if locale not in paths:
+                continue
+
+            content = paths[locale].read_bytes()
+            sources[paths[locale].name] = hash_source(content)
+            loaded[locale] = json.loads(content)
+
+        default = loaded.get(DEFAULT_LOCALE, {})
+        # empty labels fall back to US English, just like the lookups from the json files do
+        strings = {locale: {**default, **{k: v for k, v in labels.items() if v}} for locale, labels in loaded.items()}
+        every: dict[str, dict[str, str]] = {}
+
+        for locale, labels in loaded.items():
+            for key, value in labels.items():
+                every.setdefault(key, {})[locale] = value
+
+        modules[module] = {
+            "strings": strings,
+            "all": every
+        }
+
+    catalog = {
+        "version": CATALOG_VERSION,
+        # the modification times are not kept when installing a wheel, so the contents are compared instead
+        "sources": dict(sorted(sources.items())),
+        "modules": modules
+    }
+
+    catalog_path = directory / CATALOG_NAME
+
+    with catalog_path.open("w", encoding="utf-8") as file:
+        json.dump(catalog, file, ensure_ascii=False, separators=(",", ":"))
+
+    return catalog_path
+
+
+def compile_catalogs(root: Path) -> list[Path]:
+    """
+    Compiles the catalogs of a package and all of the subpackages.
+    :param root: The directory of the root package.
+    :return: The paths of the catalogs that were written.
+    """
+    directories = [root, *sorted(x.parent for x in root.rglob("__init__.py") if x.parent != root)]
+    return [x for x in (compile_catalog(directory) for directory in directories) if x is not None]
+
+
+def main() -> None:
+    """
+    Compiles the localization catalogs from the command line.
+    """
+    parser = argparse.ArgumentParser(description="Compiles the localization catalogs of the Leek packages")
+    parser.add_argument("packages", nargs="*", type=Path, default=[Path(__file__).parent],
+                        help="the root package directories to compile")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    for package in args.packages:
+        for path in compile_catalogs(package):
+            LOGGER.info("Compiled %s", path)
+
+
+if __name__ == "__main__":
+    main()
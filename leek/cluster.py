@@ -0,0 +1,287 @@
+"""
+The launcher that splits the shards of the Leek bot across multiple worker processes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import importlib
+import logging
+import multiprocessing
+import queue
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+import aiohttp
+
+if TYPE_CHECKING:
+    from multiprocessing.context import SpawnProcess
+
+LOGGER = logging.getLogger("leek.cluster")
+GATEWAY_URL = "https://discord.com/api/v10/gateway/bot"
+HEALTH_INTERVAL = 15.0
+RESTART_DELAY_MAX = 60.0
+
+
+@dataclass(frozen=True)
+class WorkerInfo:
+    """
+    The information of a worker process of the cluster.
+    """
+    index: int
+    count: int
+    shard_ids: tuple[int, ...]
+    shard_count: int
+    health: Any = None
+    health_interval: float = HEALTH_INTERVAL
+
+    @property
+    def is_primary(self) -> bool:
+        """
+        If this is the worker that runs the tasks that should only run once per cluster.
+        """
+        return self.index == 0
+
+
+@dataclass(frozen=True)
+class WorkerHealth:
+    """
+    The health of a worker process, sent periodically to the launcher.
+    """
+    index: int
+    pid: int
+    ready: bool
+    guilds: int
+    latency: float
+    database: Optional[bool] = None
+
+
+def split_shards(shard_count: int, workers: int) -> list[tuple[int, ...]]:
+    """
+    Splits the shards in contiguous ranges, one per worker.
+    :param shard_count: The total number of shards.
+    :param workers: The number of workers.
+    :return: The shard ids of every worker.
+    """
+    size, extra = divmod(shard_count, workers)
+    ranges = []
+    start = 0
+
+    for index in range(workers):
+        end = start + size + (1 if index < extra else 0)
+        ranges.append(tuple(range(start, end)))
+        start = end
+
+    return ranges
+
+
+async def fetch_shard_count(token: str) -> int:
+    """
+    Fetches the number of shards recommended by Discord.
+    :param token: The authentication token of the bot.
+    :return: The number of shards.
+    """
+    headers = {"Authorization": f"Bot {token}"}
+
+    async with aiohttp.ClientSession(headers=headers) as session, session.get(GATEWAY_URL) as response:
+        response.raise_for_status()
+        data = await response.json()
+
+    return data["shards"]
+
+
+def _run_target(target: str, info: WorkerInfo) -> None:
+    """
+    Imports and runs the function of a worker process.
+    :param target: The function that runs the bot, in the module:function format.
+    :param info: The information of the worker.
+    """
+    module, name = target.split(":")
+    getattr(importlib.import_module(module), name)(info)
+
+
+class Worker:
+    """
+    A worker process supervised by the cluster.
+    """
+    def __init__(self, info: WorkerInfo):
+        """
+        Creates a new worker, without starting it.
+        :param info: The information of the worker.
+        """
+        self.info: WorkerInfo = info
+        self.process: Optional[SpawnProcess] = None
+        self.health: Optional[WorkerHealth] = None
+        self.reported_at: float = 0
+        self.restarts: int = 0
+        self.started_at: float = 0
+        self.next_start: float = 0
+
+
+class Cluster:
+    """
+    Starts the workers of the bot and restarts them when they exit or stop reporting their health.
+    """
+    def __init__(self, target: str, shard_count: int, workers: int,
+                 health_interval: float = HEALTH_INTERVAL):
+        """
+        Creates a new cluster.
+        :param target: The function that runs the bot of a worker with the worker information as the only parameter,
+        in the module:function format.
+        :param shard_count: The total number of shards.
+        :param workers: The number of worker processes, it can't be higher than the number of shards.
+        :param health_interval: The seconds between every health report of the workers.
+        """
+        # spawn is used so the workers don't inherit the state of the launcher, like the event loops
+        self.__context = multiprocessing.get_context("spawn")
+        self.__health = self.__context.Queue()
+        self.__target: str = target
+        self.__health_interval: float = health_interval
+        ranges = split_shards(shard_count, min(workers, shard_count))
+        self.__workers: list[Worker] = [
+            Worker(WorkerInfo(index, len(ranges), shard_ids, shard_count, self.__health, health_interval))
+            for index, shard_ids in enumerate(ranges)
+        ]
+
+    @property
+    def workers(self) -> list[Worker]:
+        """
+        The workers of the cluster.
+        """
+        return self.__workers
+
+    def __start(self, worker: Worker) -> None:
+        worker.process = self.__context.Process(target=_run_target, args=(self.__target, worker.info),
+                                                name=f"leek-worker-{worker.info.index}")
+        worker.process.start()
+        worker.health = None
+        worker.started_at = time.monotonic()
+        LOGGER.info("Started worker %s (pid %s) with shards %s", worker.info.index, worker.process.pid,
+                    list(worker.info.shard_ids))
+
+    def __schedule_restart(self, worker: Worker, reason: str) -> None:
+        delay = min(2 ** worker.restarts, RESTART_DELAY_MAX)
+        worker.restarts += 1
+        worker.process = None
+        worker.next_start = time.monotonic() + delay
+        LOGGER.warning("Worker %s %s, restarting in %s seconds", worker.info.index, reason, delay)
+
+    def __receive_health(self) -> None:
+        while True:
+            try:
+                health: WorkerHealth = self.__health.get_nowait()
+            except queue.Empty:
+                return
+
+            worker = self.__workers[health.index]
+
+            if worker.process is None or worker.process.pid != health.pid:
+                continue
+
+            if health.ready:
+                worker.restarts = 0
+
+            worker.health = health
+            worker.reported_at = time.monotonic()
+
+    def __supervise(self) -> None:
+        now = time.monotonic()
+        # the workers that don't report for a while are considered blocked
+        stale = self.__health_interval * 4
+
+        for worker in self.__workers:
+            if worker.process is None:
+                if now >= worker.next_start:
+                    self.__start(worker)
+                continue
+
+            if not worker.process.is_alive():
+                self.__schedule_restart(worker, f"exited with code {worker.process.exitcode}")
+                continue
+
+            last = worker.started_at if worker.health is None else worker.reported_at
+
+            if now - last > stale:
+                worker.process.terminate()
+                worker.process.join(10)
+
+                if worker.process.is_alive():
+                    worker.process.kill()
+
+                self.__schedule_restart(worker, f"did not report for {now - last:.0f} seconds")
+
+    def health(self) -> dict[str, Any]:
+        """
+        Gets the aggregated health of the workers.
+        :return: The number of workers, workers ready, guilds, average latency, restarts and workers that couldn't
+        reach the database.
+        """
+        reports = [w.health for w in self.__workers if w.process is not None and w.health is not None]
+        ready = [h for h in reports if h.ready]
+
+        return {
+            "workers": len(self.__workers),
+            "running": sum(1 for w in self.__workers if w.process is not None),
+            "ready": len(ready),
+            "guilds": sum(h.guilds for h in reports),
+            "latency": sum(h.latency for h in ready) / len(ready) if ready else float("nan"),
+            "restarts": sum(w.restarts for w in self.__workers),
+            "database_errors": sum(1 for h in reports if h.database is False)
+        }
+
+    def __stop(self) -> None:
+        for worker in self.__workers:
+            if worker.process is not None and worker.process.is_alive():
+                worker.process.terminate()
+
+        for worker in self.__workers:
+            if worker.process is not None:
+                worker.process.join(30)
+
+    def run(self) -> None:
+        """
+        Starts the workers and supervises them until the launcher is interrupted.
+        """
+        next_report = time.monotonic() + self.__health_interval
+
+        try:
+            while True:
+                self.__receive_health()
+                self.__supervise()
+
+                if time.monotonic() >= next_report:
+                    next_report += self.__health_interval
+                    health = self.health()
+                    LOGGER.info("Cluster health: %s/%s workers ready, %s running, %s guilds, %.0f ms latency, "
+                                "%s restarts, %s without database", health["ready"], health["workers"],
+                                health["running"], health["guilds"], health["latency"] * 1000, health["restarts"],
+                                health["database_errors"])
+
+                time.sleep(1)
+        except KeyboardInterrupt:
+            LOGGER.info("Stopping the cluster")
+        finally:
+            self.__stop()
+
+
+async def report_health(info: WorkerInfo, is_ready: Callable[[], bool], guilds: Callable[[], int],
+                        latency: Callable[[], float], database: Callable[[], Optional[bool]]) -> None:
+    """
+    Sends the health of a worker to the launcher periodically.
+    :param info: The information of the worker.
+    :param is_ready: Function that returns whether the bot is ready.
+    :param guilds: Function that returns the number of guilds of the worker.
+    :param latency: Function that returns the average latency of the shards of the worker.
+    :param database: Function that returns whether the database responded to the last ping, or None if unknown.
+    """
+    pid = multiprocessing.current_process().pid
+
+    while True:
+        health = WorkerHealth(info.index, pid, is_ready(), guilds(), latency(), database())
+
+        with contextlib.suppress(queue.Full):
+            info.health.put_nowait(health)
+
+        await asyncio.sleep(info.health_interval)
@@ -1,10 +1,31 @@
 """
-Extension to report pings to Hyperping.
+The cogs included with Leek.
+
+The cogs are imported the first time that they are accessed, so only the ones that are used are loaded.
 """
 
-from .diagnoser import Diagnoser
-from .hyperping import Hyperping
-from .modcomments import ModComments
-from .moderation import Moderation
-from .rage import Rage
-from .tags import Tags
+import importlib
+
+COGS = {
+    "Diagnoser": "diagnoser",
+    "Hyperping": "hyperping",
+    "ModComments": "modcomments",
+    "Moderation": "moderation",
+    "Rage": "rage",
+    "Tags": "tags"
+}
+
+__all__ = list(COGS)
+
+
+def __getattr__(name: str) -> type:
+    module = COGS.get(name)
+
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")  # noqa: TRY003
+
+    return getattr(importlib.import_module(f".{module}", __name__), name)
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(COGS))
@@ -2,11 +2,21 @@
 Tool used to diagnose the SHVDN Log Files.
 """
 
+import asyncio
+import codecs
+import contextlib
+import multiprocessing
+import os
 import re
+from collections.abc import AsyncIterator, Iterable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional, Union
 
-from discord import ApplicationContext, Cog, Embed, Message, message_command
+from discord import ApplicationContext, Cog, Embed, Intents, MemberCacheFlags, Message, message_command
 
-from leek import LeekBot, d, l
+from leek import LeekBot, d, get_localizer, l
+from leek.tracing import span
 
 RE_SHVDN = re.compile("\\[[0-9]{2}:[0-9]{2}:[0-9]{2}] \\[(WARNING|ERROR)] (.*)")
 RE_LEGACY_ZERO = re.compile("Resolving API version 0.0.0 referenced in (.+\\.dll).")
@@ -36,27 +46,97 @@ FATAL_EXCEPTIONS = [
     "Caught unhandled exception:"
 ]
 ABORTED_SCRIPT = "Aborted script "
+LEVEL_MARKERS = ("] [WARNING] ", "] [ERROR] ")
+LOCALIZER = get_localizer(__file__)
+MAX_BYTES = int(os.environ.get("DIAGNOSER_MAX_BYTES", str(32 * 1024 * 1024)))
+CHUNK_SIZE = 64 * 1024
+POOL_KIND = os.environ.get("DIAGNOSER_POOL", "thread").lower()
+POOL_WORKERS = int(os.environ.get("DIAGNOSER_WORKERS", "2"))
+POOL_JOBS = int(os.environ.get("DIAGNOSER_JOBS", "4"))
+POOL_TIMEOUT = float(os.environ.get("DIAGNOSER_TIMEOUT", "60"))
 
+LineKey = tuple[str, str, bool]
 
-def get_problems(locale: str, lines: list[str]) -> tuple[dict[str, int], dict[str, int]]:  # noqa: C901
+
+def compile_rules(rules: dict[Union[re.Pattern, str], str]) -> tuple[re.Pattern, dict[str, tuple[str, int, int]]]:
     """
-    Gets the problems in the lines of a file.
+    Combines the rules into a single regular expression, so a line is checked against all of them at once.
+    :param rules: The regular expressions or prefixes and their labels, in order of priority.
+    :return: The combined regular expression, and the label and the range of values in Match.groups() of every rule.
     """
-    warnings: dict[str, int] = {}
-    errors: dict[str, int] = {}
+    parts = []
+    labels = {}
+    group = 1
+
+    for number, (rule, label) in enumerate(rules.items()):
+        pattern = rule.pattern if isinstance(rule, re.Pattern) else re.escape(rule)
+        groups = rule.groups if isinstance(rule, re.Pattern) else 0
+        name = f"rule{number}"
+
+        # the alternatives are tried in order, so the priority of the rules is kept
+        parts.append(f"(?P<{name}>{pattern})")
+        # the groups of the rule are after its named group, and Match.groups() does not include the whole match
+        labels[name] = (label, group, group + groups)
+        group += groups + 1
+
+    return re.compile("|".join(parts)), labels
+
+
+RE_RULES, RULE_LABELS = compile_rules(MATCHES)
+
+
+def match_rule(details: str) -> Optional[tuple[str, tuple[str, ...]]]:
+    """
+    Finds the first rule that matches the details of a log entry.
+    :param details: The message of the log entry, without the time and level.
+    :return: The label of the rule and the captured values, or None if no rule matched.
+    """
+    match = RE_RULES.match(details)
+
+    if match is None:
+        return None
 
-    def add_message(level: str, message: str) -> None:
-        if level == "WARNING":
-            msg = "🟡 " + message
-            warnings[msg] = warnings.get(msg, 0) + 1
-        elif level == "ERROR":
-            msg = "🔴 " + message
-            errors[msg] = errors.get(msg, 0) + 1
+    # the named group of the rule is the outermost one, so is the last group that was closed
+    label, start, end = RULE_LABELS[match.lastgroup]
+    return label, match.groups()[start:end]
 
-    is_processing_ver_two_warning = False
+
+@dataclass(frozen=True)
+class Finding:
+    """
+    A problem found in a log file, before it is localized.
+    """
+    level: str
+    label: str
+    values: tuple[str, ...] = ()
+
+    def localize(self, locale: str) -> str:
+        """
+        Formats the finding in a specific locale.
+        :param locale: The locale to use.
+        :return: The message of the finding, with the icon of the level.
+        """
+        icon = "🔴" if self.level == "ERROR" else "🟡"
+        return f"{icon} {LOCALIZER.l(self.label, locale, *self.values)}"
+
+
+def scan_lines(lines: Iterable[str], is_processing_ver_two_warning: bool = False) -> tuple[dict[LineKey, int], bool]:
+    """
+    Counts the warning and error lines of a file, or part of a file.
+    :param lines: The lines to check.
+    :param is_processing_ver_two_warning: If the line before these was part of the list of mods using SHVDN2.
+    :return: The number of times that every line was found, and if the last line was part of the list of mods using
+    SHVDN2.
+    """
+    lines_found: dict[LineKey, int] = {}
+
+    def add_line(level: str, details: str, is_ver_two: bool = False) -> None:
+        key = (level, details, is_ver_two)
+        lines_found[key] = lines_found.get(key, 0) + 1
 
     for line in lines:
-        match = RE_SHVDN.search(line)
+        # most of the lines are debug and info messages, and checking for the level is faster than the regex
+        match = RE_SHVDN.search(line) if LEVEL_MARKERS[0] in line or LEVEL_MARKERS[1] in line else None
 
         # deprecation warnings tend to be followed by "[DEBUG] Instantiating script"
         # this should cleanly not trigger any matches and set the variable to false
@@ -68,7 +148,7 @@ def get_problems(locale: str, lines: list[str]) -> tuple[dict[str, int], dict[st
         level, details = match.groups()
 
         if is_processing_ver_two_warning:
-            add_message("WARNING", l("MESSAGE_DIAGNOSE_MATCH_LEGACY_TWO", locale, details))
+            add_line("WARNING", details, True)
             continue
 
         if VER_TWO_WARNING in details:
@@ -78,47 +158,273 @@ def get_problems(locale: str, lines: list[str]) -> tuple[dict[str, int], dict[st
         if level not in ["WARNING", "ERROR"] or details in FATAL_EXCEPTIONS or details.startswith(ABORTED_SCRIPT):
             continue
 
-        matched = False
+        add_line(level, details)
+
+    return lines_found, is_processing_ver_two_warning
+
 
-        for match, label in MATCHES.items():
-            if isinstance(match, re.Pattern):
-                matches = match.match(details)
+def match_lines(lines_found: dict[LineKey, int]) -> dict[Finding, int]:
+    """
+    Matches the warning and error lines of a file against the rules.
+    :param lines_found: The number of times that every line was found.
+    :return: The number of times that every problem was found, in the order that they were found.
+    """
+    findings: dict[Finding, int] = {}
 
-                if matches is None:
-                    continue
+    for (level, details, is_ver_two), count in lines_found.items():
+        if is_ver_two:
+            finding = Finding(level, "MESSAGE_DIAGNOSE_MATCH_LEGACY_TWO", (details,))
+        else:
+            rule = match_rule(details)
+            finding = Finding(level, "MESSAGE_DIAGNOSE_MATCH_UNKNOWN", (details,)) if rule is None else \
+                Finding(level, *rule)
 
-                message = l(label, locale, *matches.groups())
-            elif isinstance(match, str):
-                if not details.startswith(match):
-                    continue
+        findings[finding] = findings.get(finding, 0) + count
 
-                message = l(label, locale)
-            else:
-                continue
+    return findings
+
+
+def find_problems(lines: Iterable[str]) -> dict[Finding, int]:
+    """
+    Finds the problems in the lines of a file.
+    :param lines: The lines of the file.
+    :return: The number of times that every problem was found, in the order that they were found.
+    """
+    # the same lines tend to be repeated many times, so they are counted first and matched against the rules later
+    lines_found, _ = scan_lines(lines)
+    return match_lines(lines_found)
+
+
+class LogDiagnosis:
+    """
+    Finds the problems of a log file while is being downloaded, without keeping the whole file in memory.
+    """
+    def __init__(self, max_bytes: int = 0):
+        """
+        Creates a new diagnosis.
+        :param max_bytes: The maximum number of bytes to check, zero to check the whole file.
+        """
+        self.__max_bytes: int = max_bytes
+        self.__decoder: codecs.IncrementalDecoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.__pending: str = ""
+        self.__lines_found: dict[LineKey, int] = {}
+        self.__is_processing_ver_two_warning: bool = False
+        self.bytes_read: int = 0
+        self.lines_read: int = 0
+        self.truncated: bool = False
+
+    @property
+    def lines_found(self) -> dict[LineKey, int]:
+        """
+        The number of times that every warning and error line was found so far.
+        """
+        return self.__lines_found
+
+    @property
+    def is_processing_ver_two_warning(self) -> bool:
+        """
+        If the last line checked was part of the list of mods using SHVDN2.
+        """
+        return self.__is_processing_ver_two_warning
+
+    @property
+    def is_exhausted(self) -> bool:
+        """
+        If data past the byte limit was received and no more data can be checked.
+        """
+        return self.truncated
+
+    def split(self, data: bytes, final: bool = False) -> list[str]:
+        """
+        Decodes the next chunk of the file. The last line of the chunk is kept until the next chunk arrives.
+        :param data: The contents of the chunk, trimmed if the byte limit is reached.
+        :param final: If this is the end of the file, and the last line is complete.
+        :return: The complete lines of the chunk.
+        """
+        # the file is only truncated if there is data after the limit, so a limit that falls at the end of a chunk
+        # reads the next one before stopping
+        if self.__max_bytes and self.bytes_read + len(data) > self.__max_bytes:
+            self.truncated = True
+            data = data[:self.__max_bytes - self.bytes_read]
+
+        self.bytes_read += len(data)
+        text = self.__pending + self.__decoder.decode(data, final=final)
+        # a line is only complete when the line break arrives, otherwise a \r\n split in two would be two breaks
+        end = len(text) if final else text.rfind("\n") + 1
+        self.__pending = text[end:]
+        lines = text[:end].splitlines()
+        self.lines_read += len(lines)
+        return lines
+
+    def merge(self, lines_found: dict[LineKey, int], is_processing_ver_two_warning: bool) -> None:
+        """
+        Adds the lines found in a chunk of the file, as returned by scan_lines.
+        :param lines_found: The number of times that every line was found in the chunk.
+        :param is_processing_ver_two_warning: If the last line of the chunk was part of the list of mods using SHVDN2.
+        """
+        self.__is_processing_ver_two_warning = is_processing_ver_two_warning
+
+        for key, count in lines_found.items():
+            self.__lines_found[key] = self.__lines_found.get(key, 0) + count
+
+    def feed(self, data: bytes) -> bool:
+        """
+        Checks the next chunk of the file.
+        :param data: The contents of the chunk.
+        :return: True if more data can be checked, False if the file is bigger than the byte limit.
+        """
+        self.merge(*scan_lines(self.split(data), self.__is_processing_ver_two_warning))
+        return not self.is_exhausted
+
+    def finish(self) -> dict[Finding, int]:
+        """
+        Checks the last line of the file and matches the lines against the rules.
+        :return: The number of times that every problem was found, in the order that they were found.
+        """
+        self.merge(*scan_lines(self.split(b"", True), self.__is_processing_ver_two_warning))
+        return match_lines(self.__lines_found)
+
+
+class DiagnosisPool:
+    """
+    The threads or processes where the log files are checked, so big files don't block the event loop.
+    """
+    def __init__(self, kind: str = "thread", workers: int = 2, jobs: int = 4, timeout: float = 60):
+        """
+        Creates a new pool.
+        :param kind: The type of pool, thread or process.
+        :param workers: The number of threads or processes.
+        :param jobs: The maximum number of log files checked at the same time, the rest wait for their turn.
+        :param timeout: The maximum seconds that a log file can take to be downloaded and checked, zero to disable it.
+        """
+        if kind == "thread":
+            self.__executor: Executor = ThreadPoolExecutor(workers, thread_name_prefix="leek-diagnoser")
+        elif kind == "process":
+            # spawn is used so the processes don't inherit the state of the bot, like the event loop
+            self.__executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+        else:
+            raise ValueError(f"Unrecognized pool: {kind}")  # noqa: TRY003
+
+        self.__jobs: asyncio.Semaphore = asyncio.Semaphore(jobs)
+        self.timeout: float = timeout
+
+    @property
+    def is_saturated(self) -> bool:
+        """
+        If the maximum number of log files are being checked, and a new one would need to wait.
+        """
+        return self.__jobs.locked()
+
+    @contextlib.asynccontextmanager
+    async def job(self) -> AsyncIterator[None]:
+        """
+        Waits for a free job, and cancels the code inside of it when the timeout is reached.
+        """
+        async with self.__jobs, asyncio.timeout(self.timeout or None):
+            yield
+
+    async def __scan(self, diagnosis: LogDiagnosis, lines: list[str]) -> None:
+        if lines:
+            loop = asyncio.get_running_loop()
+            diagnosis.merge(*await loop.run_in_executor(self.__executor, scan_lines, lines,
+                                                        diagnosis.is_processing_ver_two_warning))
+
+    async def feed(self, diagnosis: LogDiagnosis, data: bytes) -> bool:
+        """
+        Checks the next chunk of a file in the pool. Chunks are small, so a job that timed out stops quickly.
+        :param diagnosis: The diagnosis of the file.
+        :param data: The contents of the chunk.
+        :return: True if more data can be checked, False if the file is bigger than the byte limit.
+        """
+        await self.__scan(diagnosis, diagnosis.split(data))
+        return not diagnosis.is_exhausted
+
+    async def finish(self, diagnosis: LogDiagnosis) -> dict[Finding, int]:
+        """
+        Checks the last line of a file and matches the lines against the rules in the pool.
+        :param diagnosis: The diagnosis of the file.
+        :return: The number of times that every problem was found, in the order that they were found.
+        """
+        await self.__scan(diagnosis, diagnosis.split(b"", True))
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.__executor, match_lines, diagnosis.lines_found)
+
+    def shutdown(self) -> None:
+        """
+        Stops the threads or processes of the pool, without waiting for the pending chunks.
+        """
+        self.__executor.shutdown(wait=False, cancel_futures=True)
 
-            add_message(level, message)
 
-            matched = True
-            break
+def localize_problems(locale: str, findings: dict[Finding, int]) -> tuple[dict[str, int], dict[str, int]]:
+    """
+    Localizes the problems found in a file. Every distinct problem is only localized once.
+    :param locale: The locale to use.
+    :param findings: The problems and the number of times that they were found.
+    :return: The number of times that every warning and error message was found.
+    """
+    warnings: dict[str, int] = {}
+    errors: dict[str, int] = {}
 
-        if not matched:
-            add_message(level, l("MESSAGE_DIAGNOSE_MATCH_UNKNOWN", locale, details))
+    for finding, count in findings.items():
+        messages = errors if finding.level == "ERROR" else warnings
+        message = finding.localize(locale)
+        # different rules can have the same message, so they are counted together
+        messages[message] = messages.get(message, 0) + count
 
     return warnings, errors
 
 
+def get_problems(locale: str, lines: Iterable[str]) -> tuple[dict[str, int], dict[str, int]]:
+    """
+    Gets the problems in the lines of a file.
+    """
+    return localize_problems(locale, find_problems(lines))
+
+
 class Diagnoser(Cog):
     """
     A Cog used to diagnose log files of ScriptHookVDotNet.
     """
+    required_intents = Intents.none()
+    required_member_cache = MemberCacheFlags.none()
+
     def __init__(self, bot: LeekBot):
         """
         Creates a new diagnoser.
         """
         self.bot = bot
+        self.__pool: DiagnosisPool = DiagnosisPool(POOL_KIND, POOL_WORKERS, POOL_JOBS, POOL_TIMEOUT)
+
+    def cog_unload(self) -> None:
+        """
+        Stops the pool when the cog is unloaded.
+        """
+        self.__pool.shutdown()
+
+    async def __download(self, url: str, diagnosis: LogDiagnosis) -> Optional[int]:
+        """
+        Checks a log file while is being downloaded, without downloading the rest after the byte limit is reached.
+        :param url: The URL of the log file.
+        :param diagnosis: The diagnosis where the contents of the file are checked.
+        :return: The status code of the response if the download failed, None otherwise.
+        """
+        async with await self.bot.get(url) as response:
+            if not response.ok:
+                return response.status
+
+            with span("diagnose.parse") as current:
+                async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                    if not await self.__pool.feed(diagnosis, chunk):
+                        break
+
+                if current is not None:
+                    current.attributes.update(bytes=diagnosis.bytes_read, lines=diagnosis.lines_read)
+
+        return None
 
     @message_command(name=d("MESSAGE_DIAGNOSE_NAME"))
-    async def diagnose(self, ctx: ApplicationContext, message: Message) -> None:
+    async def diagnose(self, ctx: ApplicationContext, message: Message) -> None:  # noqa: C901, PLR0912
         """
         Tries to make a partial diagnostic of a SHVDN Log File.
         """
@@ -134,21 +440,34 @@ class Diagnoser(Cog):
 
         await ctx.defer()
 
-        async with await self.bot.get(attachment.url) as response:
-            if not response.ok:
-                await ctx.respond(l("MESSAGE_DIAGNOSE_FAILED", ctx.locale, response.status))
-                return
+        if self.__pool.is_saturated:
+            await ctx.respond(l("MESSAGE_DIAGNOSE_QUEUED", ctx.locale))
 
-            content = await response.text()
-            lines = content.splitlines()
+        diagnosis = LogDiagnosis(MAX_BYTES)
 
-        warnings, errors = get_problems(ctx.locale, lines)
+        try:
+            async with self.__pool.job():
+                status = await self.__download(attachment.url, diagnosis)
+                findings = await self.__pool.finish(diagnosis)
+        except TimeoutError:
+            await ctx.respond(l("MESSAGE_DIAGNOSE_TIMEOUT", ctx.locale, f"{self.__pool.timeout:g}"))
+            return
+
+        if status is not None:
+            await ctx.respond(l("MESSAGE_DIAGNOSE_FAILED", ctx.locale, status))
+            return
+
+        warnings, errors = localize_problems(ctx.locale, findings)
         embed = Embed()
 
+        if diagnosis.truncated:
+            embed.set_footer(text=l("MESSAGE_DIAGNOSE_TRUNCATED", ctx.locale, diagnosis.bytes_read // (1024 * 1024)))
+
         if len(warnings) == 0 and len(errors) == 0:
             embed.colour = 0x6fff00
             embed.title = l("MESSAGE_DIAGNOSE_NOTHING", ctx.locale)
             await ctx.respond(embed=embed)
+            return
 
         embed.colour = 0xff1100 if errors else 0xffe100
         embed.title = l("MESSAGE_DIAGNOSE_FOUND", ctx.locale, len(errors), len(warnings))
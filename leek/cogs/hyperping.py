@@ -5,6 +5,7 @@ Extension to report pings to Hyperping.
 import logging
 import os
 
+from discord import Intents, MemberCacheFlags
 from discord.ext import tasks
 from discord.ext.commands import Cog
 
@@ -17,6 +18,9 @@ class Hyperping(Cog):
     """
     Cog used to report pings to Hyperping.
     """
+    required_intents = Intents.none()
+    required_member_cache = MemberCacheFlags.none()
+
     def __init__(self, bot: LeekBot):
         """
         Creates a new Cog.
@@ -27,7 +31,9 @@ class Hyperping(Cog):
         if self.url is None:
             LOGGER.error("No Hyperping URL specified, no Pings will be sent!")
 
-        self.ping.start()
+        # in a cluster, the pings are only sent by the primary worker
+        if bot.is_primary_worker:
+            self.ping.start()
 
     async def send_ping(self) -> bool:
         """
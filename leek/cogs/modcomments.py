@@ -8,13 +8,11 @@ from typing import TYPE_CHECKING, Optional
 
 import discord
 from discord.ext import tasks
-from playwright.async_api import Browser, ElementHandle, Page, Playwright, async_playwright
-from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 
-from leek import DatabaseRequiredError, LeekBot, d, l, la
+from leek import DatabaseRequiredError, LeekBot, MissingFeatureError, d, l, la
 
 if TYPE_CHECKING:
-    from aiomysql import Cursor
+    from playwright.async_api import Browser, ElementHandle, Page, Playwright
 
 LOGGER = logging.getLogger("leek_modcomments")
 
@@ -42,9 +40,11 @@ SQL_FETCH_ONE = "SELECT channel FROM mods WHERE type = %s AND slug = %s AND guil
 SQL_FETCH_GUILD = "SELECT id, type, slug, channel FROM mods WHERE guild = %s"
 SQL_INSERT = "INSERT INTO mods (type, slug, guild, channel) VALUES (%s, %s, %s, %s)"
 SQL_DELETE = "DELETE FROM mods WHERE id = %s AND guild = %s"
+SQL_UPDATE = "UPDATE mods SET last = %s WHERE id = %s"
 
 
-async def _send_message_to(channel: discord.TextChannel, element: ElementHandle, title: str, url: str) -> None:
+async def _send_message_to(channel: discord.abc.Messageable, locale: str, element: "ElementHandle", title: str,
+                           url: str) -> None:
     text = await (await element.query_selector(XPATH_COMMENT_TEXT)).inner_text()
     author = (await (await element.query_selector(XPATH_COMMENT_AUTHOR)).get_attribute("href")).split("/")[-1]
     comment_id = await element.get_attribute("data-comment-id")
@@ -52,7 +52,7 @@ async def _send_message_to(channel: discord.TextChannel, element: ElementHandle,
 
     embed = discord.Embed(color=COLOR, description=text,
                           author=discord.EmbedAuthor(
-                              l("TASK_CHECK_NEW", channel.guild.preferred_locale, title, author),
+                              l("TASK_CHECK_NEW", locale, title, author),
                               f"{url}#comment-{comment_id}"))
     embed.set_thumbnail(url=image_url.replace(" ", "%20"))
     embed.set_footer(text="5mods", icon_url="https://images.gta5-mods.com/icons/favicon.png")
@@ -65,21 +65,45 @@ class ModComments(discord.Cog):
     Comment parser and redirector for 5mods.
     """
 
+    # the channels are taken from the guilds cache, which is always enabled, but in a cluster the guilds of the other
+    # workers are not cached, so they are fetched once and the comments are sent without the channel object
+    required_intents = discord.Intents.none()
+    required_member_cache = discord.MemberCacheFlags.none()
+
     def __init__(self, bot: LeekBot):
         """
         Creates a new Cog.
         """
-        self.pw: Optional[Playwright] = None
-        self.browser: Optional[Browser] = None
-        self.page: Optional[Page] = None
+        self.pw: Optional["Playwright"] = None
+        self.browser: Optional["Browser"] = None
+        self.page: Optional["Page"] = None
 
         self.bot: LeekBot = bot
+        self.__destinations: dict[int, tuple[discord.abc.Messageable, str]] = {}
+
+    async def __get_destination(self, guild_id: int, channel_id: int) -> Optional[tuple[discord.abc.Messageable, str]]:
+        guild = self.bot.get_guild(guild_id)
+
+        if guild is not None:
+            channel = guild.get_channel(channel_id)
+            return None if channel is None else (channel, guild.preferred_locale)
+
+        destination = self.__destinations.get(channel_id)
+
+        if destination is None:
+            # the guild is served by another worker of the cluster, or the bot is no longer part of it
+            try:
+                guild = await self.bot.fetch_guild(guild_id)
+            except (discord.NotFound, discord.Forbidden):
+                return None
+
+            destination = (self.bot.get_partial_messageable(channel_id), guild.preferred_locale)
+            self.__destinations[channel_id] = destination
+
+        return destination
 
     async def _update(self, entry_id: int, latest: int) -> None:
-        async with self.bot.connection as connection, await connection.cursor() as cursor:
-            cursor: Cursor
-            await cursor.execute("UPDATE mods SET last = %s WHERE id = %s", (latest, entry_id))
-            await connection.commit()
+        await self.bot.execute(SQL_UPDATE, (latest, entry_id))
 
     async def cog_before_invoke(self, ctx: discord.ApplicationContext) -> None:  # noqa: ARG002
         """
@@ -89,15 +113,13 @@ class ModComments(discord.Cog):
             raise DatabaseRequiredError(self)
 
     @tasks.loop(minutes=int(os.environ.get("MODCOMMENTS_DELAY", "1")))
-    async def check_for_comments(self) -> None:  # noqa: C901
+    async def check_for_comments(self) -> None:  # noqa: C901, PLR0912
         """
         Task that checks for new comments in a specific schedule.
         """
-        async with self.bot.connection as connection, await connection.cursor() as cursor:
-            cursor: Cursor
-            await cursor.execute(SQL_FETCH_ALL)
-            checks = await cursor.fetchall()
-            await connection.commit()
+        from playwright.async_api import TimeoutError as PlaywrightTimeoutError  # noqa: PLC0415
+
+        checks = await self.bot.fetch_all(SQL_FETCH_ALL)
 
         LOGGER.info("Started processing of %s entries", len(checks))
 
@@ -105,12 +127,14 @@ class ModComments(discord.Cog):
             identifier, mod_type, mod_slug, guild_id, channel_id, last_comment = entry
 
             url = f"https://www.gta5-mods.com/{mod_type}/{mod_slug}"
-            channel: discord.TextChannel = self.bot.get_channel(channel_id)
+            destination = await self.__get_destination(guild_id, channel_id)
 
-            if channel is None:
+            if destination is None:
                 LOGGER.warning("Unable to find channel %s for %s/%s", channel_id, mod_type, mod_slug)
                 continue
 
+            channel, locale = destination
+
             LOGGER.info("Loading %s", url)
 
             try:
@@ -135,27 +159,33 @@ class ModComments(discord.Cog):
             if not elements:
                 continue
 
-            if last_comment == 0:
-                element = elements[-1]
-                comment_id = int(await element.get_attribute("data-comment-id"))
-                await _send_message_to(channel, element, mod_name, url)
-                await self._update(identifier, comment_id)
-                LOGGER.info("Sending first comment %s for %s/%s to %s", comment_id, mod_type, mod_slug, channel_id)
-                continue
-
-            send = False
+            send = last_comment == 0
+            latest = last_comment
 
-            for element in elements:
-                comment_id = int(await element.get_attribute("data-comment-id"))
-
-                if last_comment == comment_id:
-                    send = True
-                    continue
-
-                if send:
-                    await _send_message_to(channel, element, mod_name, url)
-                    await self._update(identifier, comment_id)
-                    LOGGER.info("Sending new comment %s for %s/%s to %s", comment_id, mod_type, mod_slug, channel_id)
+            try:
+                if last_comment == 0:
+                    # only the latest comment is sent the first time
+                    elements = elements[-1:]
+
+                for element in elements:
+                    comment_id = int(await element.get_attribute("data-comment-id"))
+
+                    if last_comment == comment_id:
+                        send = True
+                        continue
+
+                    if send:
+                        await _send_message_to(channel, locale, element, mod_name, url)
+                        latest = comment_id
+                        LOGGER.info("Sending comment %s for %s/%s to %s", comment_id, mod_type, mod_slug, channel_id)
+            except (discord.NotFound, discord.Forbidden):
+                # the channels of other workers are not checked before sending the comments
+                LOGGER.warning("Unable to send comments of %s/%s to channel %s", mod_type, mod_slug, channel_id)
+                self.__destinations.pop(channel_id, None)
+            finally:
+                # only the last comment sent matters, so save it once per mod instead of once per comment
+                if latest != last_comment:
+                    await self._update(identifier, latest)
 
             LOGGER.info("Finished processing %s/%s at %s", mod_type, mod_slug, channel_id)
 
@@ -164,9 +194,19 @@ class ModComments(discord.Cog):
         """
         Function triggered when the bot is ready.
         """
+        # in a cluster, the comments are only checked by the primary worker
+        if not self.bot.is_primary_worker or self.check_for_comments.is_running():
+            return
+
         desired_driver = os.environ.get("MODCOMMENTS_DRIVER", "firefox").lower()
         headless = bool(int(os.environ.get("MODCOMMENTS_HEADLESS", "1")))
 
+        # playwright is only imported when the cog is used, as it takes a while to load
+        try:
+            from playwright.async_api import async_playwright  # noqa: PLC0415
+        except ImportError as e:
+            raise MissingFeatureError("Playwright is required to check the mod comments") from e  # noqa: TRY003
+
         LOGGER.info("Initializing Playwright with %s (headless: %s)", desired_driver, headless)
 
         self.pw = await async_playwright().start()
@@ -182,11 +222,7 @@ class ModComments(discord.Cog):
         await self.page.goto("https://www.gta5-mods.com")
 
         if self.bot.is_pool_available:
-            async with self.bot.connection as connection, await connection.cursor() as cursor:
-                cursor: Cursor
-                await cursor.execute(SQL_CREATE)
-                await connection.commit()
-
+            await self.bot.execute(SQL_CREATE)
             self.check_for_comments.start()
 
     @discord.slash_command(name_localizations=la("COMMAND_ADDMOD_NAME"),
@@ -210,20 +246,16 @@ class ModComments(discord.Cog):
 
         mod_type, mod_id = match.groups()
 
-        async with self.bot.connection as connection, await connection.cursor() as cursor:
-            cursor: Cursor
-            await cursor.execute(SQL_FETCH_ONE, (mod_type, mod_id, ctx.guild.id))
-            found = await cursor.fetchone()
+        async with self.bot.transaction() as transaction:
+            found = await transaction.fetch_one(SQL_FETCH_ONE, (mod_type, mod_id, ctx.guild.id))
 
-            if found:
-                await ctx.respond(l("COMMAND_ADDMOD_EXISTS", ctx.locale, found[0]))
-                return
+            if not found:
+                await transaction.execute(SQL_INSERT, (mod_type, mod_id, ctx.guild.id, ctx.channel.id))
+                last = transaction.last_row_id
 
-        async with self.bot.connection as connection, await connection.cursor() as cursor:
-            cursor: Cursor
-            await cursor.execute(SQL_INSERT, (mod_type, mod_id, ctx.guild.id, ctx.channel.id))
-            await connection.commit()
-            last = cursor.lastrowid
+        if found:
+            await ctx.respond(l("COMMAND_ADDMOD_EXISTS", ctx.locale, found[0]))
+            return
 
         await ctx.respond(l("COMMAND_ADDMOD_DONE", ctx.locale, mod_type, mod_id, last))
 
@@ -235,10 +267,7 @@ class ModComments(discord.Cog):
         """
         Command that lists the registered mods.
         """
-        async with self.bot.connection as connection, await connection.cursor() as cursor:
-            cursor: Cursor
-            await cursor.execute(SQL_FETCH_GUILD, ctx.guild.id)
-            checks = await cursor.fetchall()
+        checks = await self.bot.fetch_all(SQL_FETCH_GUILD, ctx.guild.id)
 
         if not checks:
             await ctx.respond(l("COMMAND_LISTMODS_NONE", ctx.locale))
@@ -262,12 +291,9 @@ class ModComments(discord.Cog):
         """
         Deletes a registered mod.
         """
-        async with self.bot.connection as connection, await connection.cursor() as cursor:
-            cursor: Cursor
-            await cursor.execute(SQL_DELETE, (mod_id, ctx.guild.id))
-            await connection.commit()
-
-            if connection.affected_rows() > 0:
-                await ctx.respond(l("COMMAND_DELETEMOD_DONE", ctx.locale))
-            else:
-                await ctx.respond(l("COMMAND_DELETEMOD_INVALID", ctx.locale))
+        rows = await self.bot.execute(SQL_DELETE, (mod_id, ctx.guild.id))
+
+        if rows > 0:
+            await ctx.respond(l("COMMAND_DELETEMOD_DONE", ctx.locale))
+        else:
+            await ctx.respond(l("COMMAND_DELETEMOD_INVALID", ctx.locale))
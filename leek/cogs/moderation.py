@@ -11,6 +11,8 @@ from discord import (
     Cog,
     Forbidden,
     HTTPException,
+    Intents,
+    MemberCacheFlags,
     Message,
     NotFound,
     Permissions,
@@ -30,6 +32,10 @@ class Moderation(Cog):
     """
     Set of tools for the Moderation of Discord servers.
     """
+    # the members are only requested when a command needs them, so they are never cached
+    required_intents = Intents(members=True)
+    required_member_cache = MemberCacheFlags.none()
+
     def __init__(self, bot: LeekBot):
         """
         Creates a new moderation cog.
@@ -112,8 +118,10 @@ class Moderation(Cog):
 
         count = 0
         errors = 0
+        # the members are not cached, so they are requested to the gateway every time
+        members = await ctx.guild.chunk(cache=False)
 
-        for member in ctx.guild.members:
+        for member in members:
             try:
                 if member.top_role.name == "@everyone":
                     await member.add_roles(role)
@@ -2,13 +2,36 @@
 Tools for helping with the modding of RAGE Games.
 """
 
+import asyncio
+import hashlib
 import logging
-import string
+import math
+import os
+import random
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Optional
 
 import discord
 from aiohttp import ClientResponseError
-
-from leek import LeekBot, d, la
+from discord.ext import tasks
+
+from leek import InvalidSnapshotError, LeekBot, d, l, la
+from leek.metrics import format_metric
+from leek.natives import (
+    Native,
+    NativeDatabase,
+    NativeIndex,
+    NativeParam,
+    diff_natives,
+    load_snapshot,
+    open_shared,
+    parse_natives,
+    save_snapshot,
+    write_shared,
+)
 
 LOGGER = logging.getLogger("leek_modding")
 NATIVE_LINKS = {
@@ -16,18 +39,17 @@ NATIVE_LINKS = {
     "rdr3": "https://raw.githubusercontent.com/alloc8or/rdr3-nativedb-data/master/natives.json",
     "fivem": "https://runtime.fivem.net/doc/natives_cfx.json"
 }
-NATIVES = {}
-CACHE = []
-
-
-def format_lua_name(name: str) -> str:
-    """
-    Formats the name of a native to it's Lua compatible name.
-    """
-    return string.capwords(name.lower().replace("0x", "N_0x").replace("_", " ")).replace(" ", "")
+NATIVES = NativeDatabase()
+DEFAULT_GAME = "gtav"
+GAME_OPTION = d("COMMAND_NATIVE_GAME_NAME")
+SEARCH_PAGE_SIZE = 10
+SEARCH_SUMMARY_LENGTH = 100
+SAMPLE_QUERY = "get the position of the player vehicle"
+REFRESH_INTERVAL = float(os.environ.get("RAGE_REFRESH_INTERVAL", "21600"))
+REFRESH_JITTER = float(os.environ.get("RAGE_REFRESH_JITTER", "600"))
 
 
-def format_params(params: dict) -> str:
+def format_params(params: tuple[NativeParam, ...]) -> str:
     """
     Formats the parameters as a string.
     """
@@ -37,100 +59,355 @@ def format_params(params: dict) -> str:
     formatted = "\n    "
 
     for param in params:
-        p_type = param["type"]
-        p_name = param["name"]
-        description = param.get("description", None)
-
-        formatted += "`{0}: {1}`".format(p_name, p_type)
+        formatted += "`{0}: {1}`".format(param.name, param.type)
 
-        if description:
-            formatted += " {0}\n".format(description)
+        if param.description:
+            formatted += " {0}\n".format(param.description)
         else:
             formatted += "\n"
 
     return formatted
 
 
-def find_native(name: str, game: str) -> dict | None:
+def render_native(native: Native) -> dict:
+    """
+    Renders the embed of a native.
+    :param native: The native to render.
+    :return: The embed as a dictionary, that can be loaded with discord.Embed.from_dict().
+    """
+    params = format_params(native.params)
+
+    embed = discord.Embed()
+    embed.title = native.name
+    embed.description = "**Hash**: {0}\n**Lua Name**: {1}\n**Parameters**: {2}".format(native.hash,
+                                                                                       native.lua,
+                                                                                       params)
+
+    backup = embed.description
+
+    if native.comment:
+        embed.description += "\n**Description**: {0}".format(native.comment)
+
+        if len(embed) > 2000:
+            embed.description = backup
+
+    return embed.to_dict()
+
+
+class EmbedCache:
     """
-    Finds a native by its partial name.
+    A bounded cache of the rendered embeds of the natives, that discards the least recently used ones.
     """
-    natives = NATIVES.get(game)
+    def __init__(self, max_size: int):
+        """
+        Creates a new cache.
+        :param max_size: The maximum number of embeds, zero disables the cache.
+        """
+        self.__max_size: int = max_size
+        self.__embeds: OrderedDict[tuple[str, str], dict] = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
 
-    if natives is None:
-        return None
+    def __len__(self) -> int:
+        """
+        The number of embeds in the cache.
+        """
+        return len(self.__embeds)
+
+    @property
+    def max_size(self) -> int:
+        """
+        The maximum number of embeds in the cache.
+        """
+        return self.__max_size
+
+    def get(self, game: str, native: Native) -> discord.Embed:
+        """
+        Gets the embed of a native, rendering it if is not in the cache.
+        :param game: The game of the native.
+        :param native: The native.
+        :return: A new embed, that can be modified.
+        """
+        key = (game, native.hash)
+        payload = self.__embeds.get(key)
+
+        if payload is None:
+            self.misses += 1
+            payload = render_native(native)
+
+            if self.__max_size > 0:
+                self.__embeds[key] = payload
+
+                if len(self.__embeds) > self.__max_size:
+                    self.__embeds.popitem(last=False)
+                    self.evictions += 1
+        else:
+            self.hits += 1
+            self.__embeds.move_to_end(key)
+
+        return discord.Embed.from_dict(payload)
+
+    def invalidate(self, games: Iterable[str]) -> None:
+        """
+        Removes the embeds of the natives of some games, after their natives are replaced.
+        :param games: The games to remove.
+        """
+        games = set(games)
+
+        for key in [x for x in self.__embeds if x[0] in games]:
+            del self.__embeds[key]
+
+    def render_metrics(self) -> str:
+        """
+        Formats the usage of the cache in the Prometheus text format.
+        """
+        return "".join([
+            format_metric("leek_native_embed_cache_hits_total", "counter", "Native embeds served from the cache.", (),
+                          [((), self.hits)]),
+            format_metric("leek_native_embed_cache_misses_total", "counter", "Native embeds rendered on request.", (),
+                          [((), self.misses)]),
+            format_metric("leek_native_embed_cache_evictions_total", "counter",
+                          "Native embeds discarded because the cache was full.", (), [((), self.evictions)]),
+            format_metric("leek_native_embed_cache_entries", "gauge", "Native embeds stored in the cache.", (),
+                          [((), len(self.__embeds))]),
+        ])
+
+
+EMBEDS = EmbedCache(int(os.environ.get("RAGE_EMBED_CACHE", "512")))
+
+
+def format_result(native: Native) -> str:
+    """
+    Formats a native as a line of the search results, with the start of the comment.
+    """
+    summary = " ".join((native.comment or "").split())
 
-    return next((x for x in natives if name in (x["hash"], x["name"])), None)
+    if len(summary) > SEARCH_SUMMARY_LENGTH:
+        summary = summary[:SEARCH_SUMMARY_LENGTH - 3] + "..."
+
+    line = "**{0}** `{1}` ({2})".format(native.name, native.hash, native.namespace)
+    return "{0}\n{1}".format(line, summary) if summary else line
+
+
+def log_text_index(game: str, index: NativeIndex) -> None:
+    """
+    Logs the build time of the full text index of a game, and the time taken by a sample query.
+    """
+    start = time.perf_counter()
+    index.search_text(SAMPLE_QUERY)
+    LOGGER.info("Indexed %s words of %s natives in %.2f seconds, sample query took %.2f ms",
+                index.text_index.terms, game, index.text_index.build_time, (time.perf_counter() - start) * 1000)
+
+
+def find_native(name: str, game: str) -> Optional[Native]:
+    """
+    Finds a native by its hash, name or Lua name.
+    """
+    return NATIVES.find(name, game)
 
 
 async def get_natives(ctx: discord.AutocompleteContext) -> list[str]:
     """
-    Gets the native that match the partial lookup.
+    Gets the best natives of the selected game that match the partial lookup.
     """
-    query = ctx.value.upper()
-    return [x for x in CACHE if query in x]
+    index = NATIVES.get(ctx.options.get(GAME_OPTION) or DEFAULT_GAME)
+
+    if index is None:
+        return []
+
+    return index.search(ctx.value or "")
 
 
 async def get_games(ctx: discord.AutocompleteContext) -> list[str]:  # noqa: ARG001
     """
     Gets the list of available games.
     """
-    return list(NATIVES.keys())
+    return NATIVES.games
 
 
 class Rage(discord.Cog):
     """
     Tools for Rockstar Advanced Game Engine modders.
     """
+    required_intents = discord.Intents.none()
+    required_member_cache = discord.MemberCacheFlags.none()
+
     def __init__(self, bot: LeekBot):
         """
         Creates a new RAGE Cog.
         """
         self.bot: LeekBot = bot
+        self.__snapshot: Optional[Path] = None
+        self.__shared: Optional[Path] = None
+        self.__shared_mtime: int = 0
+        self.__digests: dict[str, str] = {}
+
+        bot.metrics.add_collector(EMBEDS.render_metrics)
+
+        if os.environ.get("RAGE_SHARED"):
+            # the shared file is kept on disk, so it also works as the snapshot
+            self.__shared = Path(os.environ["RAGE_SHARED"])
+            self.__update_natives(self.__load_shared())
+        elif os.environ.get("RAGE_SNAPSHOT"):
+            self.__snapshot = Path(os.environ["RAGE_SNAPSHOT"])
+            self.__load_snapshot()
+
+    @staticmethod
+    def __update_natives(indexes: Optional[dict]) -> None:
+        if indexes:
+            NATIVES.update(indexes)
+            EMBEDS.invalidate(indexes)
+
+    def __load_snapshot(self) -> None:
+        start = time.perf_counter()
+
+        try:
+            indexes = load_snapshot(self.__snapshot)
+        except InvalidSnapshotError as e:
+            LOGGER.warning("Ignoring the native snapshot: %s", e)
+            return
+
+        if not indexes:
+            LOGGER.info("There is no native snapshot at %s yet", self.__snapshot)
+            return
+
+        self.__update_natives(indexes)
+        LOGGER.info("Loaded the natives of %s from the snapshot in %.2f seconds", ", ".join(indexes),
+                    time.perf_counter() - start)
+
+    def __load_shared(self) -> Optional[dict]:
+        # this runs in a thread, so the indexes are returned to be set from the event loop
+        try:
+            mtime = self.__shared.stat().st_mtime_ns
+        except FileNotFoundError:
+            LOGGER.info("There is no shared native file at %s yet", self.__shared)
+            return None
+
+        if mtime == self.__shared_mtime:
+            return None
+
+        start = time.perf_counter()
+
+        try:
+            indexes = open_shared(self.__shared)
+        except (InvalidSnapshotError, OSError) as e:
+            LOGGER.warning("Ignoring the shared native file: %s", e)
+            return None
+
+        self.__shared_mtime = mtime
+        LOGGER.info("Mapped the natives of %s from %s in %.2f seconds", ", ".join(indexes), self.__shared,
+                    time.perf_counter() - start)
+
+        for game, index in indexes.items():
+            log_text_index(game, index)
+
+        return indexes
+
+    async def __save_natives(self) -> None:
+        if self.__shared is not None:
+            await asyncio.to_thread(write_shared, self.__shared, NATIVES.indexes)
+            # the natives in memory are replaced with the mapped ones, so they use the same memory as other processes
+            self.__update_natives(await asyncio.to_thread(self.__load_shared))
+            LOGGER.info("Saved the shared native file to %s", self.__shared)
+        elif self.__snapshot is not None:
+            await asyncio.to_thread(save_snapshot, self.__snapshot, NATIVES.indexes)
+            LOGGER.info("Saved the native snapshot to %s", self.__snapshot)
+
+    async def __refresh_natives(self, game: str, url: str) -> bool:
+        start = time.perf_counter()
+
+        try:
+            async with await self.bot.get(url, cache=True) as resp:
+                resp.raise_for_status()
+                body = await resp.read()
+        except ClientResponseError as e:
+            LOGGER.exception("Can't request %s: Code %s", url, e.status)
+            return False
+        except Exception:
+            LOGGER.exception("Unable to get %s natives from %s", game, url)
+            return False
+
+        downloaded = time.perf_counter()
+        digest = hashlib.sha256(body).hexdigest()
+        current = NATIVES.get(game)
+
+        if digest == self.__digests.get(game) or (current is not None and current.digest == digest):
+            LOGGER.info("The natives of %s did not change, downloaded in %.2f seconds", game, downloaded - start)
+            return False
+
+        try:
+            # decoding, indexing and comparing takes a while, so is done in a thread to not block the heartbeats
+            index = await asyncio.to_thread(parse_natives, body)
+            parsed = time.perf_counter()
+            diff = await asyncio.to_thread(diff_natives, current or (), index)
+        except Exception:
+            LOGGER.exception("Unable to parse %s natives from %s", game, url)
+            return False
+
+        # the file can change without changes to the natives (like the fields that are not used), so is not parsed again
+        self.__digests[game] = digest
+
+        if current is not None and not diff:
+            LOGGER.info("The natives of %s did not change, checked in %.2f seconds (download: %.2f, parse: %.2f)",
+                        game, time.perf_counter() - start, downloaded - start, parsed - downloaded)
+            return False
+
+        self.__update_natives({game: index})
+        LOGGER.info("Loaded %s natives of %s in %.2f seconds (download: %.2f, parse: %.2f, diff: %.2f), "
+                    "%s added, %s removed and %s changed", len(index), game, time.perf_counter() - start,
+                    downloaded - start, parsed - downloaded, time.perf_counter() - parsed, len(diff.added),
+                    len(diff.removed), len(diff.changed))
+        log_text_index(game, index)
+        return True
 
     @discord.Cog.listener()
     async def on_connect(self) -> None:
         """
-        Downloads the list of natives when connecting to Discord.
+        Starts refreshing the natives when connecting to Discord for the first time.
         """
-        for game, url in NATIVE_LINKS.items():
-            try:
-                async with await self.bot.get(url) as resp:
-                    resp.raise_for_status()
-                    json: dict[str, dict[str, dict[str, str]]] = await resp.json(content_type=None)
-                    ready = []
-
-                    CACHE.clear()
-
-                    for namespace, natives in json.items():
-                        for n_hash, n_data in natives.items():
-                            name = n_data["name"]
-                            native = {
-                                "namespace": namespace,
-                                "hash": n_hash,
-                                "lua": format_lua_name(name),
-                                **n_data
-                            }
-
-                            if name not in CACHE:
-                                CACHE.append(name)
-                            if n_hash not in CACHE:
-                                CACHE.append(n_hash)
-
-                            if n_hash in NATIVES:
-                                LOGGER.warning("Found Duplicated Native: %s/%s", n_hash, name)
-
-                            ready.append(native)
-
-                    NATIVES[game] = ready
+        # when the natives are shared, only the primary worker downloads them and the rest map the file it writes
+        if self.__shared is not None and not self.bot.is_primary_worker:
+            if not self.check_shared.is_running():
+                self.check_shared.start()
+            return
 
-                CACHE.sort(reverse=True)
-            except ClientResponseError as e:
-                LOGGER.exception("Can't request %s: Code %s", url, e.status)
-            except BaseException:
-                LOGGER.exception("Unable to get %s natives from %s", game, url)
+        # on_connect is triggered by every shard and every reconnection, but the natives follow their own schedule
+        if not self.refresh.is_running():
+            self.refresh.start()
 
-        LOGGER.info("Finished fetching the natives")
+    @tasks.loop(seconds=REFRESH_INTERVAL)
+    async def refresh(self) -> None:
+        """
+        Downloads the natives of every game and replaces the ones that changed.
+        """
+        start = time.perf_counter()
+        changed = []
+
+        try:
+            changed = await asyncio.gather(*(self.__refresh_natives(game, url) for game, url in NATIVE_LINKS.items()))
+
+            if any(changed):
+                await self.__save_natives()
+        except Exception:
+            # an uncaught error would end the loop for good, so it is logged and the refresh keeps its schedule
+            LOGGER.exception("Unable to save the natives to %s", self.__shared or self.__snapshot)
+        finally:
+            if REFRESH_INTERVAL <= 0:
+                self.refresh.stop()
+            else:
+                # the jitter prevents the workers of different hosts from downloading the natives at the same time
+                self.refresh.change_interval(seconds=REFRESH_INTERVAL + random.uniform(0, REFRESH_JITTER))  # noqa: S311
+
+        LOGGER.info("Finished refreshing the natives in %.2f seconds, %s games changed", time.perf_counter() - start,
+                    sum(changed))
+
+    @tasks.loop(minutes=int(os.environ.get("RAGE_SHARED_DELAY", "1")))
+    async def check_shared(self) -> None:
+        """
+        Maps the shared native file again when the primary worker replaces it.
+        """
+        self.__update_natives(await asyncio.to_thread(self.__load_shared))
 
     @discord.slash_command(name_localizations=la("COMMAND_NATIVE_NAME"),
                            description=d("COMMAND_NATIVE_DESC"),
@@ -147,7 +424,7 @@ class Rage(discord.Cog):
                     description=d("COMMAND_NATIVE_GAME_DESC"),
                     description_localizations=la("COMMAND_NATIVE_GAME_DESC"),
                     autocomplete=get_games,
-                    default="gtav")
+                    default=DEFAULT_GAME)
     async def native(self, ctx: discord.ApplicationContext, name: str, game: str) -> None:
         """
         Searches for the documentation of a native.
@@ -158,21 +435,55 @@ class Rage(discord.Cog):
             await ctx.respond("The native was not found!", ephemeral=True)
             return
 
-        params = format_params(found["params"])
+        await ctx.respond(embed=EMBEDS.get(game, found))
 
-        embed = discord.Embed()
-        embed.title = found["name"]
-        embed.description = "**Hash**: {0}\n**Lua Name**: {1}\n**Parameters**: {2}".format(found["hash"],
-                                                                                           found["lua"],
-                                                                                           params)
+    @discord.slash_command(name_localizations=la("COMMAND_NATIVESEARCH_NAME"),
+                           description=d("COMMAND_NATIVESEARCH_DESC"),
+                           description_localizations=la("COMMAND_NATIVESEARCH_DESC"))
+    @discord.option(type=discord.SlashCommandOptionType.string,
+                    name=d("COMMAND_NATIVESEARCH_QUERY_NAME"),
+                    name_localizations=la("COMMAND_NATIVESEARCH_QUERY_NAME"),
+                    description=d("COMMAND_NATIVESEARCH_QUERY_DESC"),
+                    description_localizations=la("COMMAND_NATIVESEARCH_QUERY_DESC"))
+    @discord.option(type=discord.SlashCommandOptionType.string,
+                    name=d("COMMAND_NATIVE_GAME_NAME"),
+                    name_localizations=la("COMMAND_NATIVE_GAME_NAME"),
+                    description=d("COMMAND_NATIVE_GAME_DESC"),
+                    description_localizations=la("COMMAND_NATIVE_GAME_DESC"),
+                    autocomplete=get_games,
+                    default=DEFAULT_GAME)
+    @discord.option(type=discord.SlashCommandOptionType.integer,
+                    name=d("COMMAND_NATIVESEARCH_PAGE_NAME"),
+                    name_localizations=la("COMMAND_NATIVESEARCH_PAGE_NAME"),
+                    description=d("COMMAND_NATIVESEARCH_PAGE_DESC"),
+                    description_localizations=la("COMMAND_NATIVESEARCH_PAGE_DESC"),
+                    min_value=1,
+                    default=1)
+    async def nativesearch(self, ctx: discord.ApplicationContext, query: str, game: str, page: int) -> None:
+        """
+        Searches the natives by the words in their documentation.
+        """
+        index = NATIVES.get(game)
 
-        backup = embed.description
-        comment = found.get("comment", None) or found.get("description")
+        if index is None:
+            await ctx.respond(l("NATIVESEARCH_NO_GAME", ctx.locale, game), ephemeral=True)
+            return
 
-        if comment:
-            embed.description += "\n**Description**: {0}".format(comment)
+        start = time.perf_counter()
+        total, found = index.search_text(query, (page - 1) * SEARCH_PAGE_SIZE, SEARCH_PAGE_SIZE)
+        LOGGER.debug("Searched %r in the natives of %s in %.2f ms", query, game, (time.perf_counter() - start) * 1000)
 
-            if len(embed) > 2000:
-                embed.description = backup
+        pages = math.ceil(total / SEARCH_PAGE_SIZE)
 
+        if not total:
+            await ctx.respond(l("NATIVESEARCH_EMPTY", ctx.locale, query), ephemeral=True)
+            return
+        if not found:
+            await ctx.respond(l("NATIVESEARCH_NO_PAGE", ctx.locale, page, pages), ephemeral=True)
+            return
+
+        embed = discord.Embed()
+        embed.title = l("NATIVESEARCH_TITLE", ctx.locale, query)
+        embed.description = "\n".join(format_result(x) for x in found)
+        embed.set_footer(text=l("NATIVESEARCH_FOOTER", ctx.locale, page, pages, total))
         await ctx.respond(embed=embed)
@@ -2,16 +2,11 @@
 Extension used to create and manage tags.
 """
 
-from typing import TYPE_CHECKING
-
 import discord
 from pymysql import IntegrityError
 
 from leek import DatabaseRequiredError, LeekBot, d, l, la
 
-if TYPE_CHECKING:
-    from aiomysql import Cursor
-
 PERMISSIONS = discord.Permissions(manage_messages=True)
 CREATE = "CREATE TABLE IF NOT EXISTS tags_%s (id INT NOT NULL auto_increment, name TEXT NOT NULL UNIQUE, " \
          "content TEXT NOT NULL, primary key (id))"
@@ -19,6 +14,18 @@ FETCH_ALL = "SELECT (name) FROM tags_%s"
 FETCH_SINGLE = "SELECT (content) FROM tags_%s WHERE name=%s"
 ADD = "INSERT INTO tags_%s (name, content) VALUES (%s, %s)"
 DELETE = "DELETE FROM tags_%s WHERE name=%s"
+CREATED: set[int] = set()
+
+
+async def ensure_table(bot: LeekBot, guild_id: int) -> None:
+    """
+    Creates the tags table of a guild, if it wasn't created already by this process.
+    """
+    if guild_id in CREATED:
+        return
+
+    await bot.execute(CREATE, [guild_id])
+    CREATED.add(guild_id)
 
 
 async def get_tag_names(ctx: discord.AutocompleteContext) -> list[str]:
@@ -33,20 +40,18 @@ async def get_tag_names(ctx: discord.AutocompleteContext) -> list[str]:
     if not bot.is_pool_available:
         return []
 
-    async with bot.connection as connection:
-        cursor: Cursor = await connection.cursor()
-        await cursor.execute(CREATE, [ctx.interaction.guild.id])
-        await cursor.execute(FETCH_ALL, [ctx.interaction.guild.id])
-        await connection.commit()
-        tags = await cursor.fetchall()
-        await cursor.close()
-        return [x[0] for x in tags]
+    await ensure_table(bot, ctx.interaction.guild.id)
+    tags = await bot.fetch_all(FETCH_ALL, [ctx.interaction.guild.id])
+    return [x[0] for x in tags]
 
 
 class Tags(discord.Cog):
     """
     Cog used to create and manage Tags.
     """
+    required_intents = discord.Intents.none()
+    required_member_cache = discord.MemberCacheFlags.none()
+
     def __init__(self, bot: LeekBot):
         """
         Creates a new Tags Cog.
@@ -73,13 +78,8 @@ class Tags(discord.Cog):
         """
         Gets a specific tag.
         """
-        async with self.bot.connection as connection:
-            cursor: Cursor = await connection.cursor()
-            await cursor.execute(CREATE, [ctx.interaction.guild.id])
-            await cursor.execute(FETCH_SINGLE, [ctx.interaction.guild.id, name])
-            await connection.commit()
-            tag = await cursor.fetchone()
-            await cursor.close()
+        await ensure_table(self.bot, ctx.interaction.guild.id)
+        tag = await self.bot.fetch_one(FETCH_SINGLE, [ctx.interaction.guild.id, name])
 
         if tag is None:
             await ctx.respond(l("NOT_FOUND", ctx.locale, name), ephemeral=True)
@@ -104,16 +104,14 @@ class Tags(discord.Cog):
         """
         Creates a new tag.
         """
+        await ensure_table(self.bot, ctx.interaction.guild.id)
+
         try:
-            async with self.bot.connection as connection:
-                cursor: Cursor = await connection.cursor()
-                await cursor.execute(CREATE, [ctx.interaction.guild.id])
-                await cursor.execute(ADD, [ctx.interaction.guild.id, name, content])
-                await connection.commit()
-                await cursor.close()
-                await ctx.respond(l("ADD_OKAY", ctx.locale, name), ephemeral=True)
+            await self.bot.execute(ADD, [ctx.interaction.guild.id, name, content])
         except IntegrityError:
             await ctx.respond(l("ADD_DUPE", ctx.locale, name), ephemeral=True)
+        else:
+            await ctx.respond(l("ADD_OKAY", ctx.locale, name), ephemeral=True)
 
     @discord.slash_command(name_localizations=la("COMMAND_DELETETAG_NAME"),
                            description=d("COMMAND_DELETETAG_DESC"),
@@ -128,13 +126,8 @@ class Tags(discord.Cog):
         """
         Deletes a specific tag by it's name.
         """
-        async with self.bot.connection as connection:
-            cursor: Cursor = await connection.cursor()
-            await cursor.execute(CREATE, [ctx.interaction.guild.id])
-            await cursor.execute(DELETE, [ctx.interaction.guild.id, name])
-            await connection.commit()
-            rows = cursor.rowcount
-            await cursor.close()
+        await ensure_table(self.bot, ctx.interaction.guild.id)
+        rows = await self.bot.execute(DELETE, [ctx.interaction.guild.id, name])
 
         if rows == 0:
             await ctx.respond(l("NOT_FOUND", ctx.locale, name), ephemeral=True)
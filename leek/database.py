@@ -0,0 +1,398 @@
+"""
+The database connection pool used by the Leek bot.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Optional
+
+import aiomysql
+from pymysql import MySQLError
+
+from .exception import DatabaseTimeoutError
+from .tracing import span
+
+if TYPE_CHECKING:
+    from types import TracebackType
+
+    from aiomysql import Connection, Cursor, Pool
+
+LOGGER = logging.getLogger("leek")
+# autocommit is enabled so plain reads don't leave a transaction open (and don't need a commit to be released)
+DEFAULT_POOL_OPTIONS = {
+    "minsize": 1,
+    "maxsize": 10,
+    "pool_recycle": 3600.0,
+    "autocommit": True
+}
+QueryHook = Callable[[str, float], None]
+
+
+@dataclass(frozen=True)
+class PoolStatistics:
+    """
+    A snapshot of the usage of the database pool.
+    """
+    minsize: int
+    maxsize: int
+    size: int
+    in_use: int
+    free: int
+    waiters: int
+    acquired: int
+    timeouts: int
+    acquire_time: float
+    acquire_time_max: float
+    queries: int
+    query_time: float
+    transactions: int
+
+    @property
+    def acquire_time_average(self) -> float:
+        """
+        The average time in seconds that it took to acquire a connection.
+        """
+        return self.acquire_time / self.acquired if self.acquired else 0.0
+
+    @property
+    def saturated(self) -> bool:
+        """
+        Whether all of the connections are in use and there are tasks waiting for one.
+        """
+        return self.waiters > 0 and self.size >= self.maxsize
+
+    @property
+    def query_time_average(self) -> float:
+        """
+        The average time in seconds that the queries took to execute.
+        """
+        return self.query_time / self.queries if self.queries else 0.0
+
+
+class PooledConnection:
+    """
+    Context manager that acquires a connection from the pool and releases it when exiting.
+    """
+    def __init__(self, pool: ConnectionPool):
+        """
+        Creates a new context manager.
+        :param pool: The pool where the connection will be acquired.
+        """
+        self.__pool: ConnectionPool = pool
+        self.__connection: Optional[Connection] = None
+
+    async def __aenter__(self) -> Connection:
+        """
+        Acquires the connection.
+        """
+        self.__connection = await self.__pool.acquire_connection()
+        return self.__connection
+
+    async def __aexit__(self, exc_type: Optional[type[BaseException]], exc: Optional[BaseException],
+                        tb: Optional[TracebackType]) -> None:
+        """
+        Releases the connection.
+        """
+        connection = self.__connection
+        self.__connection = None
+
+        if connection is not None:
+            await self.__pool.release_connection(connection)
+
+
+class Transaction:
+    """
+    A set of queries executed over a single connection and committed together.
+    """
+    def __init__(self, pool: ConnectionPool):
+        """
+        Creates a new transaction.
+        :param pool: The pool where the connection will be acquired.
+        """
+        self.__pool: ConnectionPool = pool
+        self.__connection: Optional[Connection] = None
+        self.__cursor: Optional[Cursor] = None
+
+    @property
+    def last_row_id(self) -> Optional[int]:
+        """
+        The id of the last row inserted by this transaction.
+        """
+        return None if self.__cursor is None else self.__cursor.lastrowid
+
+    async def __aenter__(self) -> Transaction:
+        """
+        Acquires the connection and begins the transaction.
+        """
+        self.__connection = await self.__pool.acquire_connection()
+
+        try:
+            await self.__connection.begin()
+            self.__cursor = await self.__connection.cursor()
+        except BaseException:
+            await self.__pool.release_connection(self.__connection)
+            self.__connection = None
+            raise
+
+        return self
+
+    async def __aexit__(self, exc_type: Optional[type[BaseException]], exc: Optional[BaseException],
+                        tb: Optional[TracebackType]) -> None:
+        """
+        Commits the transaction if no exceptions were raised, or rolls it back otherwise.
+        """
+        connection = self.__connection
+        self.__connection = None
+
+        try:
+            await self.__cursor.close()
+
+            if exc_type is None:
+                await self.__pool.timed("COMMIT", connection.commit())
+            else:
+                await connection.rollback()
+        finally:
+            await self.__pool.release_connection(connection)
+
+    async def fetch_one(self, query: str, args: Any = None) -> Optional[tuple]:  # noqa: ANN401
+        """
+        Executes a query and gets the first row.
+        :param query: The query to execute.
+        :param args: The parameters of the query.
+        :return: The first row, or None if there are no rows.
+        """
+        await self.__pool.timed(query, self.__cursor.execute(query, args))
+        return await self.__cursor.fetchone()
+
+    async def fetch_all(self, query: str, args: Any = None) -> Sequence[tuple]:  # noqa: ANN401
+        """
+        Executes a query and gets all of the rows.
+        :param query: The query to execute.
+        :param args: The parameters of the query.
+        :return: The rows returned by the query.
+        """
+        await self.__pool.timed(query, self.__cursor.execute(query, args))
+        return await self.__cursor.fetchall()
+
+    async def execute(self, query: str, args: Any = None) -> int:  # noqa: ANN401
+        """
+        Executes a query.
+        :param query: The query to execute.
+        :param args: The parameters of the query.
+        :return: The number of affected rows.
+        """
+        return await self.__pool.timed(query, self.__cursor.execute(query, args))
+
+    async def execute_many(self, query: str, args: Sequence[Any]) -> int:
+        """
+        Executes a query once for every set of parameters. Inserts are sent as a single multi-row statement.
+        :param query: The query to execute.
+        :param args: The sets of parameters.
+        :return: The number of affected rows.
+        """
+        return await self.__pool.timed(query, self.__cursor.executemany(query, args))
+
+
+class ConnectionPool:
+    """
+    A bounded pool of database connections that keeps track of how it is being used.
+    """
+    def __init__(self, pool: Pool, acquire_timeout: Optional[float]):
+        """
+        Creates a new pool wrapper.
+        :param pool: The underlying aiomysql pool.
+        :param acquire_timeout: The maximum time in seconds to wait for a connection, or None to wait forever.
+        """
+        self.__pool: Pool = pool
+        self.__timeout: Optional[float] = acquire_timeout
+        self.__waiters: int = 0
+        self.__acquired: int = 0
+        self.__timeouts: int = 0
+        self.__acquire_time: float = 0.0
+        self.__acquire_time_max: float = 0.0
+        self.__queries: int = 0
+        self.__query_time: float = 0.0
+        self.__transactions: int = 0
+        self.__hooks: list[QueryHook] = []
+
+    @classmethod
+    async def create(cls, pool_info: dict, acquire_timeout: Optional[float]) -> ConnectionPool:
+        """
+        Creates a new pool and opens the minimum number of connections.
+        :param pool_info: The connection and pool information passed to aiomysql.
+        :param acquire_timeout: The maximum time in seconds to wait for a connection, or None to wait forever.
+        :return: The new pool.
+        """
+        options = {**DEFAULT_POOL_OPTIONS, **pool_info}
+        pool = await aiomysql.create_pool(**options)
+        LOGGER.info("Database pool ready with %s connections (min %s, max %s, recycle %ss)",
+                    pool.size, pool.minsize, pool.maxsize, options["pool_recycle"])
+        return cls(pool, acquire_timeout)
+
+    @property
+    def statistics(self) -> PoolStatistics:
+        """
+        The current usage of the pool.
+        """
+        return PoolStatistics(minsize=self.__pool.minsize,
+                              maxsize=self.__pool.maxsize,
+                              size=self.__pool.size,
+                              in_use=self.__pool.size - self.__pool.freesize,
+                              free=self.__pool.freesize,
+                              waiters=self.__waiters,
+                              acquired=self.__acquired,
+                              timeouts=self.__timeouts,
+                              acquire_time=self.__acquire_time,
+                              acquire_time_max=self.__acquire_time_max,
+                              queries=self.__queries,
+                              query_time=self.__query_time,
+                              transactions=self.__transactions)
+
+    def add_query_hook(self, hook: QueryHook) -> None:
+        """
+        Adds a function that is called after every query with the query and the seconds that it took.
+        :param hook: The function to call.
+        """
+        self.__hooks.append(hook)
+
+    def remove_query_hook(self, hook: QueryHook) -> None:
+        """
+        Removes a function previously added with add_query_hook().
+        :param hook: The function to remove.
+        """
+        self.__hooks.remove(hook)
+
+    async def timed(self, query: str, awaitable: Any) -> Any:  # noqa: ANN401
+        """
+        Awaits the execution of a query and records the time that it took.
+        :param query: The query being executed.
+        :param awaitable: The awaitable that executes the query.
+        :return: The result of the awaitable.
+        """
+        start = time.perf_counter()
+
+        try:
+            with span("db.query", query=query[:100]):
+                return await awaitable
+        finally:
+            elapsed = time.perf_counter() - start
+            self.__queries += 1
+            self.__query_time += elapsed
+
+            for hook in self.__hooks:
+                hook(query, elapsed)
+
+    def acquire(self) -> PooledConnection:
+        """
+        Gets a context manager that acquires a connection from the pool.
+        """
+        return PooledConnection(self)
+
+    async def acquire_connection(self) -> Connection:
+        """
+        Acquires a connection from the pool. The connection needs to be released with release_connection().
+        :return: The connection.
+        :raises DatabaseTimeoutError: If no connection was available before the timeout.
+        """
+        start = time.perf_counter()
+        self.__waiters += 1
+
+        try:
+            with span("db.acquire"):
+                async with asyncio.timeout(self.__timeout):
+                    connection = await self.__pool.acquire()
+        except TimeoutError as e:
+            self.__timeouts += 1
+            LOGGER.warning("Timed out after %ss waiting for a database connection (%s waiting)",
+                           self.__timeout, self.__waiters)
+            raise DatabaseTimeoutError(self.__timeout) from e
+        finally:
+            self.__waiters -= 1
+
+        elapsed = time.perf_counter() - start
+        self.__acquired += 1
+        self.__acquire_time += elapsed
+        self.__acquire_time_max = max(self.__acquire_time_max, elapsed)
+        return connection
+
+    async def release_connection(self, connection: Connection) -> None:
+        """
+        Returns a connection to the pool.
+        :param connection: The connection to release.
+        """
+        await self.__pool.release(connection)
+
+    def transaction(self) -> Transaction:
+        """
+        Gets a context manager that runs the queries in a single transaction.
+        """
+        self.__transactions += 1
+        return Transaction(self)
+
+    async def fetch_one(self, query: str, args: Any = None) -> Optional[tuple]:  # noqa: ANN401
+        """
+        Executes a read query and gets the first row, without committing.
+        :param query: The query to execute.
+        :param args: The parameters of the query.
+        :return: The first row, or None if there are no rows.
+        """
+        async with self.acquire() as connection, connection.cursor() as cursor:
+            await self.timed(query, cursor.execute(query, args))
+            return await cursor.fetchone()
+
+    async def fetch_all(self, query: str, args: Any = None) -> Sequence[tuple]:  # noqa: ANN401
+        """
+        Executes a read query and gets all of the rows, without committing.
+        :param query: The query to execute.
+        :param args: The parameters of the query.
+        :return: The rows returned by the query.
+        """
+        async with self.acquire() as connection, connection.cursor() as cursor:
+            await self.timed(query, cursor.execute(query, args))
+            return await cursor.fetchall()
+
+    async def execute(self, query: str, args: Any = None) -> int:  # noqa: ANN401
+        """
+        Executes a single statement, committed on its own.
+        :param query: The query to execute.
+        :param args: The parameters of the query.
+        :return: The number of affected rows.
+        """
+        async with self.acquire() as connection, connection.cursor() as cursor:
+            return await self.timed(query, cursor.execute(query, args))
+
+    async def execute_many(self, query: str, args: Sequence[Any]) -> int:
+        """
+        Executes a statement once for every set of parameters in a single transaction.
+        :param query: The query to execute.
+        :param args: The sets of parameters.
+        :return: The number of affected rows.
+        """
+        async with self.transaction() as transaction:
+            return await transaction.execute_many(query, args)
+
+    async def ping(self) -> bool:
+        """
+        Checks whether the database is reachable with a ping on one of the pooled connections.
+        :return: True if the database responded, False otherwise.
+        """
+        try:
+            async with self.acquire() as connection:
+                await connection.ping(reconnect=False)
+        except (DatabaseTimeoutError, MySQLError, OSError):
+            LOGGER.exception("Database ping failed")
+            return False
+        else:
+            return True
+
+    async def close(self) -> None:
+        """
+        Closes all of the connections of the pool.
+        """
+        self.__pool.close()
+        await self.__pool.wait_closed()
@@ -2,6 +2,8 @@
 The exceptions that are triggered from Leek.
 """
 
+from pathlib import Path
+
 from discord import Cog
 
 
@@ -27,3 +29,57 @@ class MissingFeatureError(LeekError):
     """
     An exception raised when a specific system feature or library is missing and is required.
     """
+
+
+class StaleCatalogError(LeekError):
+    """
+    An exception raised when a precompiled localization catalog does not match the localization files.
+    """
+    def __init__(self, catalog: Path, source: Path, reason: str):
+        """
+        Creates a new exception.
+        :param catalog: The path of the localization catalog.
+        :param source: The localization file that does not match the catalog.
+        :param reason: The reason why the catalog is stale.
+        """
+        super().__init__(f"Catalog {catalog} is stale: {source} {reason}")
+        self.catalog: Path = catalog
+        self.source: Path = source
+
+
+class DatabaseTimeoutError(LeekError):
+    """
+    An exception raised when a connection could not be acquired from the database pool in time.
+    """
+    def __init__(self, timeout: float):
+        """
+        Creates a new exception.
+        :param timeout: The time in seconds that was waited for the connection.
+        """
+        super().__init__(f"Unable to acquire a database connection after {timeout} seconds")
+        self.timeout: float = timeout
+
+
+class DatabaseUnavailableError(LeekError):
+    """
+    An exception raised when a query is executed but the database pool is not available.
+    """
+    def __init__(self):
+        """
+        Creates a new exception.
+        """
+        super().__init__("The database pool is not available")
+
+
+class InvalidSnapshotError(LeekError):
+    """
+    An exception raised when a native snapshot can't be loaded because is corrupted or uses a different format.
+    """
+    def __init__(self, path: Path, reason: str):
+        """
+        Creates a new exception.
+        :param path: The path of the snapshot.
+        :param reason: The reason why the snapshot is not valid.
+        """
+        super().__init__(f"Snapshot {path} is not valid: {reason}")
+        self.path: Path = path
@@ -5,112 +5,232 @@ The tools for the localization of strings in the Leek bot.
 import inspect
 import json
 import logging
+import time
 from pathlib import Path
+from typing import Optional, Union
+
+from .catalog import CATALOG_NAME, CATALOG_VERSION, DEFAULT_LOCALE, LOCALES, find_localization_files, hash_source
+from .exception import StaleCatalogError
 
 LOGGER = logging.getLogger("leek")
-LOCALES = [
-    "id",
-    "da",
-    "de",
-    "en-GB",
-    "en-US",
-    "es-ES",
-    "fr",
-    "hr",
-    "it",
-    "hu",
-    "nl",
-    "no",
-    "pl",
-    "pt-BR",
-    "ro",
-    "fi",
-    "sv-SE",
-    "vi",
-    "tr",
-    "cs",
-    "el",
-    "bg",
-    "ru",
-    "ul",
-    "hi",
-    "th",
-    "zh-CN",
-    "ja",
-    "zh-TW",
-    "ko"
-]
-PATHS: dict[Path, dict[str, dict[str, str]]] = {}
-
-
-def __localize(key: str, locale: str, *formatting_params: object) -> str:
-    """
-    Localizes a specific string.
-    :param key: The label to localize.
-    :param locale: The locale to use.
-    :param formatting_params: The parameters used to format the label.
-    :return: The localized and formatted string, or the label if it couldn't be found.
+LOCALIZERS: dict[str, "Localizer"] = {}
+CATALOGS: dict[Path, Optional[dict]] = {}
+LOAD_TIME: list[float] = [0.0]
+
+
+def get_load_time() -> float:
+    """
+    Gets the time spent loading localization catalogs and files.
+    :return: The total time in seconds.
+    """
+    return LOAD_TIME[0]
+
+
+def load_catalog(directory: Path) -> Optional[dict]:
     """
-    stack = inspect.stack()
-    frame = stack[2]
-    path = Path(frame.filename)
+    Loads the precompiled localization catalog of a package.
+    :param directory: The directory of the package.
+    :return: The catalog, or None if the package does not has one.
+    :raises StaleCatalogError: If a localization file was added, removed or modified after compiling the catalog.
+    """
+    catalog_path = directory / CATALOG_NAME
+
+    try:
+        with catalog_path.open(encoding="utf-8") as file:
+            catalog = json.load(file)
+    except FileNotFoundError:
+        return None
 
-    __ensure_lang_file(path, locale, True)
-    __ensure_lang_file(path, "en-US", True)
+    if catalog.get("version") != CATALOG_VERSION:
+        raise StaleCatalogError(catalog_path, catalog_path, f"uses format {catalog.get('version')}")
 
-    langs = PATHS[path]
-    localized = langs.get(locale, {}).get(key, None) or langs.get("en-US", {}).get(key, key)
+    sources = dict(catalog["sources"])
 
-    return localized if key == localized else localized.format(*formatting_params)
+    for paths in find_localization_files(directory).values():
+        for path in paths.values():
+            if path.name not in sources:
+                raise StaleCatalogError(catalog_path, path, "is not in the catalog")
+            if hash_source(path.read_bytes()) != sources.pop(path.name):
+                raise StaleCatalogError(catalog_path, path, "was modified after compiling the catalog")
 
+    if sources:
+        raise StaleCatalogError(catalog_path, directory / next(iter(sources)), "no longer exists")
 
-def __ensure_lang_file(path: Path, lang: str, log: bool) -> None:
+    return catalog
+
+
+def get_catalog(directory: Path) -> Optional[dict]:
     """
-    Checks whether a specific localization file has been loaded, and loads if it hasn't.
-    :param path: The directory where the localization files are located.
-    :param lang: The locale to load.
-    :param log: Whether to log the loading of this file.
+    Gets the precompiled localization catalog of a package, loading it once.
+    :param directory: The directory of the package.
+    :return: The catalog, or None if it does not exists or is stale.
     """
-    if path in PATHS and lang in PATHS[path]:
-        return
+    if directory in CATALOGS:
+        return CATALOGS[directory]
 
-    lang_path = path.with_suffix(f".{lang}.json")
+    start = time.perf_counter()
 
     try:
-        with lang_path.open(encoding="utf-8") as file:
-            lines: dict[str, str] = json.load(file)
-    except FileNotFoundError:
-        if log:
-            LOGGER.warning("Couldn't find %s for lang %s", lang_path, lang)
-        lines = {}
-    except json.JSONDecodeError:
-        LOGGER.exception("Unable to load %s", lang_path)
-        lines = {}
+        catalog = load_catalog(directory)
+    except StaleCatalogError as e:
+        LOGGER.warning("Refusing to load the localization catalog: %s", e)
+        catalog = None
+    except (json.JSONDecodeError, KeyError):
+        LOGGER.exception("Unable to load the localization catalog of %s", directory)
+        catalog = None
+    finally:
+        LOAD_TIME[0] += time.perf_counter() - start
 
-    langs = PATHS.get(path, {})
-    langs[lang] = lines
-    PATHS[path] = langs
+    CATALOGS[directory] = catalog
+    return catalog
 
 
-def la(key: str) -> dict[str, str]:
+class Localizer:
     """
-    Gets the Localization in All languages for a specific label.
-    :param key: The label to localize.
-    :return: A dictionary with all the locales as keys and the localized versions as values.
+    The localization catalog of a single module.
+
+    The strings are taken from the precompiled catalog of the package when is available and up to date. Otherwise,
+    they are loaded from the ``<module>.<locale>.json`` files next to the module the first time that a locale is
+    requested. Every lookup after that is a plain dictionary access.
     """
-    stack = inspect.stack()
-    frame = stack[1]
-    path = Path(frame.filename)
+    def __init__(self, path: Union[str, Path]):
+        """
+        Creates a new localizer.
+        :param path: The path of the module that owns the localization files, usually ``__file__``.
+        """
+        self.__path: Path = Path(path)
+        self.__langs: dict[str, dict[str, str]] = {}
+        self.__all: Optional[dict[str, dict[str, str]]] = None
+
+        catalog = get_catalog(self.__path.parent)
+        compiled = None if catalog is None else catalog["modules"].get(self.__path.stem)
+
+        if compiled is not None:
+            self.__langs = dict(compiled["strings"])
+            self.__all = compiled["all"]
+
+    @property
+    def path(self) -> Path:
+        """
+        The path of the module that owns the localization files.
+        """
+        return self.__path
+
+    def __ensure_lang_file(self, lang: str, log: bool) -> dict[str, str]:
+        """
+        Checks whether a specific localization file has been loaded, and loads if it hasn't.
+        :param lang: The locale to load.
+        :param log: Whether to log the loading of this file.
+        :return: The labels of the locale.
+        """
+        lines = self.__langs.get(lang, None)
+
+        if lines is not None:
+            return lines
+
+        if self.__all is not None:
+            # the catalog already has every locale, so the missing ones use the US English labels directly
+            lines = self.__langs.get(DEFAULT_LOCALE, {})
+            self.__langs[lang] = lines
+            return lines
+
+        lang_path = self.__path.with_suffix(f".{lang}.json")
+        start = time.perf_counter()
+
+        try:
+            with lang_path.open(encoding="utf-8") as file:
+                lines = json.load(file)
+        except FileNotFoundError:
+            if log:
+                LOGGER.warning("Couldn't find %s for lang %s", lang_path, lang)
+            lines = {}
+        except json.JSONDecodeError:
+            LOGGER.exception("Unable to load %s", lang_path)
+            lines = {}
+        finally:
+            LOAD_TIME[0] += time.perf_counter() - start
+
+        self.__langs[lang] = lines
+        return lines
+
+    def l(self, key: str, lang: str, *formatting_params: object) -> str:  # noqa: E743
+        """
+        Gets the Localization of a label in a specific locale.
+        :param key: The label to localize.
+        :param lang: The locale to use.
+        :param formatting_params: The parameters to format this label.
+        :return: The formatted label in the specified locale, or the label itself if is not present.
+        """
+        localized = self.__ensure_lang_file(lang, True).get(key, None) or \
+            self.__ensure_lang_file(DEFAULT_LOCALE, True).get(key, key)
+
+        return localized if key == localized else localized.format(*formatting_params)
+
+    def d(self, key: str, *formatting_params: object) -> str:
+        """
+        Gets the Default english localization of a specific label.
+        :param key: The label to localize.
+        :param formatting_params: The desired parameters to format this label.
+        :return: The formatted label in US English, or the label itself if is not present.
+        """
+        return self.l(key, DEFAULT_LOCALE, *formatting_params)
+
+    def la(self, key: str) -> dict[str, str]:
+        """
+        Gets the Localization in All languages for a specific label.
+        :param key: The label to localize.
+        :return: A dictionary with all the locales as keys and the localized versions as values.
+        """
+        if self.__all is not None:
+            return dict(self.__all.get(key, {}))
+
+        localized = {}
+
+        for locale in LOCALES:
+            lines = self.__ensure_lang_file(locale, False)
+
+            if key in lines:
+                localized[locale] = lines[key]
+
+        return localized
+
+
+def get_localizer(path: Union[str, Path]) -> Localizer:
+    """
+    Gets the shared localizer of a module, creating it if required.
+    :param path: The path of the module that owns the localization files.
+    :return: The localizer of the module.
+    """
+    key = str(path)
+    localizer = LOCALIZERS.get(key)
+
+    if localizer is None:
+        localizer = Localizer(key)
+        LOCALIZERS[key] = localizer
+
+    return localizer
 
-    localized = {}
 
-    for locale in LOCALES:
-        __ensure_lang_file(path, locale, False)
+def __caller_localizer() -> Localizer:
+    """
+    Gets the localizer of the module that called the public localization function.
+    :return: The localizer of the caller.
+    """
+    # only the code object of the caller is needed, so walk the frames manually instead of using inspect.stack()
+    # because it builds the records (and reads the source lines) of the whole stack
+    frame = inspect.currentframe().f_back.f_back
+    filename = frame.f_code.co_filename
+    del frame
+    return LOCALIZERS.get(filename) or get_localizer(filename)
 
-        if key in PATHS[path][locale]:
-            localized[locale] = PATHS[path][locale][key]
 
-    return localized
+def la(key: str) -> dict[str, str]:
+    """
+    Gets the Localization in All languages for a specific label.
+    :param key: The label to localize.
+    :return: A dictionary with all the locales as keys and the localized versions as values.
+    """
+    return __caller_localizer().la(key)
 
 
 def l(key: str, lang: str, *formatting_params: object) -> str:  # noqa: E743
@@ -121,7 +241,7 @@ def l(key: str, lang: str, *formatting_params: object) -> str:  # noqa: E743
     :param formatting_params: The parameters to format this label.
     :return: The formatted label in the specified locale, or the label itself if is not present.
     """
-    return __localize(key, lang, *formatting_params)
+    return __caller_localizer().l(key, lang, *formatting_params)
 
 
 def d(key: str, *formatting_params: object) -> str:
@@ -131,4 +251,4 @@ def d(key: str, *formatting_params: object) -> str:
     :param formatting_params: The desired parameters to format this label.
     :return: The formatted label in US English, or the label itself if is not present.
     """
-    return __localize(key, "en-US", *formatting_params)
+    return __caller_localizer().d(key, *formatting_params)
@@ -0,0 +1,291 @@
+"""
+The metrics of the Leek bot, served in the Prometheus text format.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+from bisect import bisect_left
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Optional
+
+from aiohttp import web
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from .cache import CacheStatistics
+    from .database import PoolStatistics
+    from .session import HostStatistics
+
+LOGGER = logging.getLogger("leek")
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+Collector = Callable[[], str]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values, strict=True))
+    return f"{{{pairs}}}" if pairs else ""
+
+
+def format_metric(name: str, kind: str, description: str, labels: tuple[str, ...],
+                  samples: Iterable[tuple[tuple, float]]) -> str:
+    """
+    Formats a metric in the Prometheus text format.
+    :param name: The name of the metric.
+    :param kind: The type of the metric, like counter or gauge.
+    :param description: The help text of the metric.
+    :param labels: The names of the labels.
+    :param samples: The label values and value of every sample.
+    :return: The formatted metric.
+    """
+    lines = [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+    lines.extend(f"{name}{_format_labels(labels, values)} {_format_value(value)}" for values, value in samples)
+    return "\n".join(lines) + "\n"
+
+
+class Counter:
+    """
+    A value that only goes up, split by a set of labels.
+    """
+    def __init__(self, name: str, description: str, labels: tuple[str, ...] = ()):
+        """
+        Creates a new counter.
+        :param name: The name of the metric.
+        :param description: The help text of the metric.
+        :param labels: The names of the labels.
+        """
+        self.name: str = name
+        self.description: str = description
+        self.labels: tuple[str, ...] = labels
+        self.__values: dict[tuple, float] = {}
+
+    def inc(self, *values: str, amount: float = 1.0) -> None:
+        """
+        Increases the counter.
+        :param values: The values of the labels.
+        :param amount: The amount to increase.
+        """
+        self.__values[values] = self.__values.get(values, 0.0) + amount
+
+    def render(self) -> str:
+        """
+        Formats the counter in the Prometheus text format.
+        """
+        return format_metric(self.name, "counter", self.description, self.labels, self.__values.items())
+
+
+class Histogram:
+    """
+    The distribution of a set of observations, split by a set of labels.
+    """
+    def __init__(self, name: str, description: str, labels: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Creates a new histogram.
+        :param name: The name of the metric.
+        :param description: The help text of the metric.
+        :param labels: The names of the labels.
+        :param buckets: The upper bounds of the buckets, in ascending order.
+        """
+        self.name: str = name
+        self.description: str = description
+        self.labels: tuple[str, ...] = labels
+        self.buckets: tuple[float, ...] = buckets
+        # every entry has the count of each bucket (plus +Inf), the sum and the number of observations
+        self.__values: dict[tuple, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *values: str) -> None:
+        """
+        Records an observation.
+        :param value: The observed value.
+        :param values: The values of the labels.
+        """
+        entry = self.__values.get(values)
+
+        if entry is None:
+            entry = ([0] * (len(self.buckets) + 1), [0.0])
+            self.__values[values] = entry
+
+        counts, total = entry
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def render(self) -> str:
+        """
+        Formats the histogram in the Prometheus text format.
+        """
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        bucket_labels = (*self.labels, "le")
+
+        for values, (counts, total) in self.__values.items():
+            cumulative = 0
+
+            for bound, count in zip((*self.buckets, "+Inf"), counts, strict=True):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(bucket_labels, (*values, bound))} {cumulative}")
+
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, values)} {_format_value(total[0])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, values)} {cumulative}")
+
+        return "\n".join(lines) + "\n"
+
+
+class Metrics:
+    """
+    The set of metrics of the bot.
+    """
+    def __init__(self):
+        """
+        Creates the metrics.
+        """
+        self.commands: Histogram = Histogram("leek_command_duration_seconds",
+                                             "Time spent running application commands.", ("command",))
+        self.command_errors: Counter = Counter("leek_command_errors_total",
+                                               "Application commands that raised an exception.", ("command",))
+        self.autocomplete: Histogram = Histogram("leek_autocomplete_duration_seconds",
+                                                 "Time spent running autocomplete callbacks.", ("command",))
+        self.__collectors: list[Collector] = []
+
+    def add_collector(self, collector: Collector) -> None:
+        """
+        Adds a function that returns additional metrics in the Prometheus text format every time that they are read.
+        :param collector: The function to add.
+        """
+        self.__collectors.append(collector)
+
+    def render(self) -> str:
+        """
+        Formats all of the metrics in the Prometheus text format.
+        """
+        parts = [self.commands.render(), self.command_errors.render(), self.autocomplete.render()]
+
+        for collector in self.__collectors:
+            try:
+                parts.append(collector())
+            except Exception:
+                # a broken collector should not take down the rest of the metrics
+                LOGGER.exception("Unable to collect metrics from %s", collector)
+
+        return "".join(parts)
+
+
+class MetricsServer:
+    """
+    A local HTTP server that serves the metrics at /metrics.
+    """
+    def __init__(self, metrics: Metrics, host: str, port: int):
+        """
+        Creates a new server.
+        :param metrics: The metrics to serve.
+        :param host: The address to listen on.
+        :param port: The port to listen on.
+        """
+        self.__metrics: Metrics = metrics
+        self.__host: str = host
+        self.__port: int = port
+        self.__runner: Optional[web.AppRunner] = None
+
+    async def __handle(self, _: web.Request) -> web.Response:
+        return web.Response(body=self.__metrics.render().encode("utf-8"), headers={"Content-Type": CONTENT_TYPE})
+
+    async def start(self) -> None:
+        """
+        Starts listening for requests.
+        """
+        if self.__runner is not None:
+            return
+
+        app = web.Application()
+        app.router.add_get("/metrics", self.__handle)
+
+        self.__runner = web.AppRunner(app, access_log=None)
+        await self.__runner.setup()
+        await web.TCPSite(self.__runner, self.__host, self.__port).start()
+
+        LOGGER.info("Serving metrics at http://%s:%s/metrics", self.__host, self.__port)
+
+    async def stop(self) -> None:
+        """
+        Stops the server.
+        """
+        if self.__runner is not None:
+            await self.__runner.cleanup()
+            self.__runner = None
+
+
+def format_pool_statistics(statistics: PoolStatistics) -> str:
+    """
+    Formats the usage of the database pool in the Prometheus text format.
+    :param statistics: The usage of the pool.
+    :return: The formatted metrics.
+    """
+    gauges = {
+        "leek_db_pool_size": ("Connections open in the database pool.", statistics.size),
+        "leek_db_pool_max_size": ("Maximum connections of the database pool.", statistics.maxsize),
+        "leek_db_pool_in_use": ("Connections of the database pool in use.", statistics.in_use),
+        "leek_db_pool_free": ("Idle connections of the database pool.", statistics.free),
+        "leek_db_pool_waiters": ("Tasks waiting for a database connection.", statistics.waiters),
+    }
+    counters = {
+        "leek_db_pool_acquired_total": ("Connections acquired from the database pool.", statistics.acquired),
+        "leek_db_pool_timeouts_total": ("Timeouts waiting for a database connection.", statistics.timeouts),
+        "leek_db_pool_acquire_seconds_total": ("Time spent waiting for database connections.",
+                                               statistics.acquire_time),
+        "leek_db_queries_total": ("Database queries executed.", statistics.queries),
+        "leek_db_query_seconds_total": ("Time spent executing database queries.", statistics.query_time),
+    }
+    return "".join([
+        *(format_metric(name, "gauge", desc, (), [((), value)]) for name, (desc, value) in gauges.items()),
+        *(format_metric(name, "counter", desc, (), [((), value)]) for name, (desc, value) in counters.items()),
+    ])
+
+
+def format_http_statistics(hosts: dict[str, HostStatistics]) -> str:
+    """
+    Formats the outbound HTTP requests in the Prometheus text format.
+    :param hosts: The statistics of every host.
+    :return: The formatted metrics.
+    """
+    metrics = {
+        "leek_http_requests_total": ("Outbound HTTP requests.", lambda x: x.requests),
+        "leek_http_errors_total": ("Outbound HTTP requests that failed to complete.", lambda x: x.errors),
+        "leek_http_error_responses_total": ("Outbound HTTP requests with a status of 400 or higher.",
+                                            lambda x: x.http_errors),
+        "leek_http_request_seconds_total": ("Time spent waiting for outbound HTTP responses.", lambda x: x.time),
+    }
+    return "".join(format_metric(name, "counter", desc, ("host",), [((host,), get(stats))
+                                                                  for host, stats in hosts.items()])
+                   for name, (desc, get) in metrics.items())
+
+
+def format_cache_statistics(statistics: CacheStatistics) -> str:
+    """
+    Formats the usage of the HTTP cache in the Prometheus text format.
+    :param statistics: The usage of the cache.
+    :return: The formatted metrics.
+    """
+    return "".join([
+        format_metric("leek_http_cache_hits_total", "counter", "Responses served from the HTTP cache.", (),
+                      [((), statistics.hits)]),
+        format_metric("leek_http_cache_misses_total", "counter", "Requests not served from the HTTP cache.", (),
+                      [((), statistics.misses)]),
+        format_metric("leek_http_cache_bytes", "gauge", "Size of the bodies stored in the HTTP cache.", (),
+                      [((), statistics.size)]),
+        format_metric("leek_http_cache_entries", "gauge", "Responses stored in the HTTP cache.", (),
+                      [((), statistics.entries)]),
+    ])
@@ -0,0 +1,10 @@
+"""
+The storage and lookup of the natives of the RAGE games.
+"""
+
+from .fulltext import NativeTextIndex, TextTables, tokenize
+from .index import NativeDatabase, NativeDiff, NativeIndex, diff_natives, parse_natives
+from .records import Native, NativeParam, format_lua_name
+from .search import NativeSearch, SearchTables
+from .shared import SHARED_VERSION, SharedNativeIndex, open_shared, write_shared
+from .snapshot import SNAPSHOT_VERSION, load_snapshot, save_snapshot
@@ -0,0 +1,145 @@
+"""
+The full text search of the documentation of the natives.
+"""
+
+import heapq
+import math
+import re
+import time
+from array import array
+from collections import Counter, defaultdict
+from collections.abc import Iterable, Mapping, Sequence
+from typing import NamedTuple, Optional
+
+from .records import Native
+
+TOKEN = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+")
+K1 = 1.2
+B = 0.75
+
+
+class TextTables(NamedTuple):
+    """
+    The tables of a full text index, so they can be stored outside of the heap (like in a memory mapped file).
+    """
+    documents: Mapping[str, Sequence[int]]
+    frequencies: Mapping[str, Sequence[int]]
+    norms: Sequence[float]
+
+
+def tokenize(text: Optional[str]) -> list[str]:
+    """
+    Splits a text into lowercase words. Names in snake_case and camelCase are split into their words.
+    :param text: The text to split.
+    :return: The words of the text.
+    """
+    return [x.lower() for x in TOKEN.findall(text)] if text else []
+
+
+def native_terms(native: Native) -> list[str]:
+    """
+    Gets the words used to find a native: the name, namespace, comment, and the names and descriptions of the params.
+    :param native: The native.
+    :return: The words of the native.
+    """
+    terms = [*tokenize(native.name), *tokenize(native.namespace), *tokenize(native.comment)]
+
+    for param in native.params:
+        terms.extend(tokenize(param.name))
+        terms.extend(tokenize(param.description))
+
+    return terms
+
+
+class NativeTextIndex:
+    """
+    Inverted index of the words of the natives, ranked with BM25.
+
+    The natives are identified by their position in the iterable used to create the index.
+    """
+    def __init__(self, natives: Iterable[Native]):
+        """
+        Creates a new index.
+        :param natives: The natives to index.
+        """
+        start = time.perf_counter()
+        documents: defaultdict[str, array] = defaultdict(lambda: array("I"))
+        frequencies: defaultdict[str, array] = defaultdict(lambda: array("H"))
+        lengths = array("I")
+
+        for number, native in enumerate(natives):
+            terms = native_terms(native)
+            lengths.append(len(terms))
+
+            for term, count in Counter(terms).items():
+                documents[term].append(number)
+                frequencies[term].append(min(count, 0xFFFF))
+
+        average = sum(lengths) / len(lengths) if lengths else 0
+        # the part of the BM25 formula that only depends on the length of the document
+        norms = array("f", (K1 * (1 - B + B * x / average) if average else K1 for x in lengths))
+
+        self.__set_tables(TextTables(dict(documents), dict(frequencies), norms))
+        self.build_time: float = time.perf_counter() - start
+
+    def __set_tables(self, tables: TextTables) -> None:
+        self.__count: int = len(tables.norms)
+        self.__documents: Mapping[str, Sequence[int]] = tables.documents
+        self.__frequencies: Mapping[str, Sequence[int]] = tables.frequencies
+        self.__norms: Sequence[float] = tables.norms
+
+    @classmethod
+    def from_tables(cls, tables: TextTables) -> "NativeTextIndex":
+        """
+        Creates an index from the tables of another index, without building them again.
+        :param tables: The tables of the index.
+        :return: The index.
+        """
+        index = cls(())
+        index.__set_tables(tables)
+        return index
+
+    @property
+    def tables(self) -> TextTables:
+        """
+        The tables of the index, with the positions of the natives and the frequencies of every word.
+        """
+        return TextTables(self.__documents, self.__frequencies, self.__norms)
+
+    def __len__(self) -> int:
+        """
+        The number of natives in the index.
+        """
+        return self.__count
+
+    @property
+    def terms(self) -> int:
+        """
+        The number of distinct words in the index.
+        """
+        return len(self.__documents)
+
+    def search(self, query: str, offset: int = 0, limit: int = 10) -> tuple[int, list[int]]:
+        """
+        Searches the natives that contain any of the words of the query.
+        :param query: The words to search, case insensitive.
+        :param offset: The number of results to skip.
+        :param limit: The maximum number of results.
+        :return: The total number of matches, and the positions of the natives ordered by relevance.
+        """
+        scores: dict[int, float] = {}
+
+        for term in set(tokenize(query)):
+            documents = self.__documents.get(term)
+
+            if documents is None:
+                continue
+
+            idf = math.log(1 + (self.__count - len(documents) + 0.5) / (len(documents) + 0.5))
+
+            for number, frequency in zip(documents, self.__frequencies[term], strict=True):
+                score = idf * frequency * (K1 + 1) / (frequency + self.__norms[number])
+                scores[number] = scores.get(number, 0.0) + score
+
+        best = heapq.nlargest(offset + limit, scores, key=lambda x: (scores[x], -x))
+        return len(scores), best[offset:]
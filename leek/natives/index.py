@@ -0,0 +1,258 @@
+"""
+The lookup indexes of the natives.
+"""
+
+import hashlib
+import json
+import logging
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from typing import Optional
+
+from .fulltext import NativeTextIndex
+from .records import Native
+from .search import DEFAULT_LIMIT, NativeSearch
+
+LOGGER = logging.getLogger("leek.natives")
+
+NativeData = dict[str, dict[str, dict]]
+
+
+class NativeIndex:
+    """
+    The natives of a single game, indexed by hash, name and Lua name.
+
+    The keys of the indexes are in uppercase, so the lookups are case insensitive.
+    """
+    def __init__(self, natives: list[Native], digest: Optional[str] = None):
+        """
+        Creates a new index.
+        :param natives: The natives to index.
+        :param digest: The SHA-256 of the file where the natives were taken from, if any.
+        """
+        self.__digest: Optional[str] = digest
+        self.__natives: tuple[Native, ...] = tuple(natives)
+        self.__by_hash: dict[str, Native] = {}
+        self.__by_name: dict[str, Native] = {}
+        self.__by_lua: dict[str, Native] = {}
+        self.__namespaces: dict[str, list[Native]] = {}
+
+        for native in self.__natives:
+            n_hash = native.hash.upper()
+
+            if n_hash in self.__by_hash:
+                LOGGER.warning("Found Duplicated Native: %s/%s", native.hash, native.name)
+                continue
+
+            self.__by_hash[n_hash] = native
+            self.__by_name.setdefault(native.name.upper(), native)
+            self.__by_lua.setdefault(native.lua.upper(), native)
+            self.__namespaces.setdefault(native.namespace, []).append(native)
+
+        self.__search: NativeSearch = NativeSearch(key for native in self.__by_hash.values()
+                                                   for key in (native.name, native.hash))
+        self.__documents: tuple[Native, ...] = tuple(self.__by_hash.values())
+        self.__text: NativeTextIndex = NativeTextIndex(self.__documents)
+
+    @classmethod
+    def from_json(cls, data: NativeData, digest: Optional[str] = None) -> "NativeIndex":
+        """
+        Creates an index from the natives in the NativeDB format.
+        :param data: The natives grouped by namespace and hash.
+        :param digest: The SHA-256 of the file where the natives were taken from, if any.
+        :return: The index of the natives.
+        """
+        return cls([Native.from_json(namespace, n_hash, native) for namespace, group in data.items()
+                    for n_hash, native in group.items()], digest)
+
+    def __len__(self) -> int:
+        """
+        The number of natives in the index.
+        """
+        return len(self.__natives)
+
+    def __iter__(self) -> Iterator[Native]:
+        """
+        Iterates over the natives, in the order that they were added.
+        """
+        return iter(self.__natives)
+
+    @property
+    def digest(self) -> Optional[str]:
+        """
+        The SHA-256 of the file where the natives were taken from, used to check if they changed.
+        """
+        return self.__digest
+
+    @property
+    def namespaces(self) -> dict[str, list[Native]]:
+        """
+        The natives grouped by namespace.
+        """
+        return self.__namespaces
+
+    @property
+    def text_index(self) -> NativeTextIndex:
+        """
+        The full text index of the natives.
+        """
+        return self.__text
+
+    def by_hash(self, n_hash: str) -> Optional[Native]:
+        """
+        Gets a native by its hash.
+        :param n_hash: The hash of the native, like 0x4F8644AF03D0E0D6.
+        :return: The native, or None if there is no native with that hash.
+        """
+        return self.__by_hash.get(n_hash.upper())
+
+    def by_name(self, name: str) -> Optional[Native]:
+        """
+        Gets a native by its name.
+        :param name: The name of the native, like GET_PLAYER_PED.
+        :return: The native, or None if there is no native with that name.
+        """
+        return self.__by_name.get(name.upper())
+
+    def by_lua(self, name: str) -> Optional[Native]:
+        """
+        Gets a native by its Lua name.
+        :param name: The Lua name of the native, like GetPlayerPed.
+        :return: The native, or None if there is no native with that name.
+        """
+        return self.__by_lua.get(name.upper())
+
+    def find(self, key: str) -> Optional[Native]:
+        """
+        Finds a native by its hash, name or Lua name.
+        :param key: The hash, name or Lua name of the native.
+        :return: The native, or None if it was not found.
+        """
+        key = key.strip().upper()
+        return self.__by_hash.get(key) or self.__by_name.get(key) or self.__by_lua.get(key)
+
+    def search(self, query: str, limit: int = DEFAULT_LIMIT) -> list[str]:
+        """
+        Searches the names and hashes of the natives that match a partial query.
+        :param query: The partial name or hash.
+        :param limit: The maximum number of results.
+        :return: The names and hashes, with the exact and prefix matches first.
+        """
+        return self.__search.search(query, limit)
+
+    def search_text(self, query: str, offset: int = 0, limit: int = 10) -> tuple[int, list[Native]]:
+        """
+        Searches the natives by the words in their documentation.
+        :param query: The words to search.
+        :param offset: The number of results to skip.
+        :param limit: The maximum number of results.
+        :return: The total number of matches, and the natives ordered by relevance.
+        """
+        total, numbers = self.__text.search(query, offset, limit)
+        return total, [self.__documents[x] for x in numbers]
+
+
+@dataclass(frozen=True)
+class NativeDiff:
+    """
+    The natives that changed between two versions of the natives of a game.
+    """
+    added: tuple[str, ...]
+    removed: tuple[str, ...]
+    changed: tuple[str, ...]
+
+    def __bool__(self) -> bool:
+        """
+        Whether any native was added, removed or changed.
+        """
+        return bool(self.added or self.removed or self.changed)
+
+
+def diff_natives(old: Iterable[Native], new: Iterable[Native]) -> NativeDiff:
+    """
+    Compares two versions of the natives of a game by their hashes. This is CPU bound, so it should run in a separate
+    thread.
+    :param old: The current natives.
+    :param new: The natives that were just downloaded.
+    :return: The hashes of the natives that were added, removed or changed.
+    """
+    before: dict[str, Native] = {}
+    after: dict[str, Native] = {}
+
+    # like in NativeIndex, the first native with a hash is the one that is used
+    for natives, by_hash in ((old, before), (new, after)):
+        for native in natives:
+            by_hash.setdefault(native.hash.upper(), native)
+
+    return NativeDiff(tuple(after.keys() - before.keys()), tuple(before.keys() - after.keys()),
+                      tuple(x for x in after.keys() & before.keys() if after[x] != before[x]))
+
+
+def parse_natives(body: bytes) -> NativeIndex:
+    """
+    Decodes and indexes the natives of a NativeDB JSON file. This is CPU bound, so it should run in a separate thread.
+    :param body: The contents of the JSON file.
+    :return: The index of the natives.
+    """
+    return NativeIndex.from_json(json.loads(body), hashlib.sha256(body).hexdigest())
+
+
+class NativeDatabase:
+    """
+    The indexes of the natives of every game.
+
+    Indexes are replaced as a whole, so the lookups always see either the previous or the new index of a game.
+    """
+    def __init__(self):
+        """
+        Creates a new empty database.
+        """
+        self.__games: dict[str, NativeIndex] = {}
+
+    @property
+    def games(self) -> list[str]:
+        """
+        The games with natives available.
+        """
+        return list(self.__games)
+
+    @property
+    def indexes(self) -> dict[str, NativeIndex]:
+        """
+        A copy of the index of every game.
+        """
+        return dict(self.__games)
+
+    def get(self, game: str) -> Optional[NativeIndex]:
+        """
+        Gets the index of a game.
+        :param game: The game.
+        :return: The index, or None if there are no natives for the game.
+        """
+        return self.__games.get(game)
+
+    def find(self, key: str, game: str) -> Optional[Native]:
+        """
+        Finds a native of a game by its hash, name or Lua name.
+        :param key: The hash, name or Lua name of the native.
+        :param game: The game of the native.
+        :return: The native, or None if it was not found.
+        """
+        index = self.__games.get(game)
+        return None if index is None else index.find(key)
+
+    def replace(self, game: str, index: NativeIndex) -> None:
+        """
+        Replaces the index of a game.
+        :param game: The game.
+        :param index: The new index, that must be fully built.
+        """
+        self.update({game: index})
+
+    def update(self, indexes: dict[str, NativeIndex]) -> None:
+        """
+        Replaces the indexes of multiple games at once.
+        :param indexes: The new indexes by game, that must be fully built.
+        """
+        # the dictionary is copied instead of modified, so code iterating the games is not affected
+        self.__games = {**self.__games, **indexes}
@@ -0,0 +1,108 @@
+"""
+The compact records of the natives and their parameters.
+"""
+
+import string
+import sys
+from typing import NamedTuple, Optional
+
+
+def format_lua_name(name: str) -> str:
+    """
+    Formats the name of a native to it's Lua compatible name.
+    """
+    return string.capwords(name.lower().replace("0x", "N_0x").replace("_", " ")).replace(" ", "")
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value else None
+
+
+class NativeParam(NamedTuple):
+    """
+    A parameter of a native.
+    """
+    type: str
+    name: str
+    description: Optional[str] = None
+
+    @classmethod
+    def create(cls, p_type: str, name: str, description: Optional[str] = None) -> "NativeParam":
+        """
+        Creates a parameter with the type and name interned, because the same ones are used by thousands of natives.
+        :param p_type: The type of the parameter, like Ped or BOOL.
+        :param name: The name of the parameter.
+        :param description: The description of the parameter, if any.
+        :return: The parameter.
+        """
+        return cls(sys.intern(p_type), sys.intern(name), description or None)
+
+    @classmethod
+    def from_json(cls, data: dict) -> "NativeParam":
+        """
+        Creates a parameter from the NativeDB format.
+        :param data: The parameter, with the type, name and optional description keys.
+        :return: The parameter.
+        """
+        return cls.create(data.get("type", ""), data.get("name", ""), data.get("description"))
+
+
+class Native:
+    """
+    A native function of a RAGE game.
+
+    Only the fields shown by the bot are kept, and the namespace and return type are interned.
+    """
+    __slots__ = ("build", "comment", "hash", "lua", "name", "namespace", "params", "return_type")
+
+    def __init__(self, namespace: str, n_hash: str, name: str, params: tuple[NativeParam, ...] = (),  # noqa: PLR0913
+                 *, return_type: Optional[str] = None, build: Optional[str] = None, comment: Optional[str] = None,
+                 lua: Optional[str] = None):
+        """
+        Creates a new native.
+        :param namespace: The namespace of the native, like PLAYER.
+        :param n_hash: The hash of the native, like 0x4F8644AF03D0E0D6.
+        :param name: The name of the native, like GET_PLAYER_PED.
+        :param params: The parameters of the native.
+        :param return_type: The type returned by the native, if any.
+        :param build: The game build where the native was added, if known.
+        :param comment: The documentation of the native, if any.
+        :param lua: The Lua name of the native, formatted from the name if not set.
+        """
+        self.namespace: str = sys.intern(namespace)
+        self.hash: str = n_hash
+        self.name: str = name
+        self.lua: str = lua or format_lua_name(name)
+        self.params: tuple[NativeParam, ...] = params
+        self.return_type: Optional[str] = _intern(return_type)
+        self.build: Optional[str] = build or None
+        self.comment: Optional[str] = comment or None
+
+    @classmethod
+    def from_json(cls, namespace: str, n_hash: str, data: dict) -> "Native":
+        """
+        Creates a native from the NativeDB format.
+        :param namespace: The namespace of the native.
+        :param n_hash: The hash of the native.
+        :param data: The native, the format of alloc8or and FiveM are supported.
+        :return: The native.
+        """
+        return cls(namespace, n_hash, data["name"], tuple(NativeParam.from_json(x) for x in data.get("params") or ()),
+                   return_type=data.get("return_type") or data.get("results"), build=data.get("build"),
+                   comment=data.get("comment") or data.get("description"))
+
+    def __repr__(self) -> str:
+        """
+        The representation of the native, with the namespace, name and hash.
+        """
+        return f"<Native {self.namespace}::{self.name} {self.hash}>"
+
+    def __eq__(self, other: object) -> bool:
+        """
+        Checks if two natives have the same fields.
+        """
+        if not isinstance(other, Native):
+            return NotImplemented
+        return all(getattr(self, x) == getattr(other, x) for x in self.__slots__)
+
+    __hash__ = None
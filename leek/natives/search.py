@@ -0,0 +1,166 @@
+"""
+The ranked search used to autocomplete the natives.
+"""
+
+import bisect
+import heapq
+from array import array
+from collections import defaultdict
+from collections.abc import Iterable, Mapping, Sequence
+from typing import NamedTuple
+
+DEFAULT_LIMIT = 25
+NGRAM = 3
+
+
+class SearchTables(NamedTuple):
+    """
+    The tables of a search index, so they can be stored outside of the heap (like in a memory mapped file).
+    """
+    keys: Sequence[str]
+    display: Sequence[str]
+    prefixes: Sequence[str]
+    prefix_ids: Sequence[int]
+    words: Sequence[str]
+    word_ids: Sequence[int]
+    ngrams: Mapping[str, Sequence[int]]
+
+
+class NativeSearch:
+    """
+    Search index of the names and hashes of the natives of a game.
+
+    Every candidate gets an id based on its rank (shorter names first, then alphabetically), so the best matches of
+    every kind are the ones with the lowest ids. The matches are returned in this order:
+
+    1. The exact match.
+    2. The candidates that start with the query, from a sorted list of the candidates.
+    3. The candidates with a word (separated by underscores) that starts with the query, from a sorted list of the
+       words and everything after them.
+    4. The candidates that contain the query, from an index of every group of three characters.
+    """
+    def __init__(self, candidates: Iterable[str]):
+        """
+        Creates a new search index.
+        :param candidates: The names and hashes that can be returned, duplicates are ignored.
+        """
+        display = {x.upper(): x for x in candidates if x}
+        keys = sorted(display, key=lambda x: (len(x), x))
+        alphabetical = sorted(range(len(keys)), key=keys.__getitem__)
+        words = sorted((key[start + 1:], i) for i, key in enumerate(keys)
+                       for start in range(len(key)) if key[start] == "_" and start + 1 < len(key))
+        ngrams: defaultdict[str, list[int]] = defaultdict(list)
+
+        for i, key in enumerate(keys):
+            for ngram in {key[x:x + NGRAM] for x in range(len(key) - NGRAM + 1)}:
+                ngrams[ngram].append(i)
+
+        self.__set_tables(SearchTables(keys, [display[x] for x in keys], [keys[i] for i in alphabetical],
+                                       array("I", alphabetical), [x[0] for x in words],
+                                       array("I", (x[1] for x in words)),
+                                       {ngram: array("I", ids) for ngram, ids in ngrams.items()}))
+
+    def __set_tables(self, tables: SearchTables) -> None:
+        self.__keys: Sequence[str] = tables.keys
+        self.__display: Sequence[str] = tables.display
+        self.__prefixes: Sequence[str] = tables.prefixes
+        self.__prefix_ids: Sequence[int] = tables.prefix_ids
+        self.__words: Sequence[str] = tables.words
+        self.__word_ids: Sequence[int] = tables.word_ids
+        self.__ngrams: Mapping[str, Sequence[int]] = tables.ngrams
+
+    @classmethod
+    def from_tables(cls, tables: SearchTables) -> "NativeSearch":
+        """
+        Creates a search index from the tables of another index, without building them again.
+        :param tables: The tables of the index.
+        :return: The search index.
+        """
+        search = cls(())
+        search.__set_tables(tables)
+        return search
+
+    @property
+    def tables(self) -> SearchTables:
+        """
+        The tables of the index. The ids are the positions in the keys, and the prefixes are sorted alphabetically.
+        """
+        return SearchTables(self.__keys, self.__display, self.__prefixes, self.__prefix_ids, self.__words,
+                            self.__word_ids, self.__ngrams)
+
+    def __len__(self) -> int:
+        """
+        The number of candidates in the index.
+        """
+        return len(self.__keys)
+
+    @staticmethod
+    def __prefix_range(items: Sequence[str], query: str) -> tuple[int, int]:
+        start = bisect.bisect_left(items, query)
+        end = bisect.bisect_left(items, query + "\uffff", start)
+        return start, end
+
+    def __substrings(self, query: str) -> Iterable[int]:
+        if len(query) < NGRAM:
+            # too short for the n-grams, but the candidates are checked in rank order so the scan stops early
+            return (i for i, key in enumerate(self.__keys) if query in key)
+
+        postings = []
+
+        for x in range(len(query) - NGRAM + 1):
+            ids = self.__ngrams.get(query[x:x + NGRAM])
+
+            if ids is None:
+                return ()
+
+            postings.append(ids)
+
+        postings.sort(key=len)
+        found = set(postings[0]).intersection(*postings[1:])
+        # the n-grams might be in a different order than in the query, so the candidates are checked again
+        return (i for i in sorted(found) if query in self.__keys[i])
+
+    def search(self, query: str, limit: int = DEFAULT_LIMIT) -> list[str]:
+        """
+        Searches the candidates that match the query.
+        :param query: The text to search, case insensitive.
+        :param limit: The maximum number of results.
+        :return: The matching names and hashes, best matches first.
+        """
+        query = query.strip().upper()
+
+        if not query:
+            return self.__display[:limit]
+
+        results: list[int] = []
+        seen: set[int] = set()
+
+        def add(ids: Iterable[int]) -> bool:
+            for i in ids:
+                if i not in seen:
+                    seen.add(i)
+                    results.append(i)
+
+                    if len(results) >= limit:
+                        return True
+
+            return False
+
+        start, end = self.__prefix_range(self.__prefixes, query)
+
+        # the exact match is the first of the candidates that start with the query
+        if start < end and self.__prefixes[start] == query and add((self.__prefix_ids[start],)):
+            return [self.__display[i] for i in results]
+
+        # the candidates that were already added are skipped, so the same number of extra candidates are taken
+        if add(heapq.nsmallest(limit + len(seen), self.__prefix_ids[start:end])):
+            return [self.__display[i] for i in results]
+
+        start, end = self.__prefix_range(self.__words, query)
+
+        # a candidate can have multiple words that start with the query
+        if add(heapq.nsmallest(limit + len(seen), set(self.__word_ids[start:end]))):
+            return [self.__display[i] for i in results]
+
+        add(self.__substrings(query))
+        return [self.__display[i] for i in results]
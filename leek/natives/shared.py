@@ -0,0 +1,455 @@
+"""
+The read-only memory mapped file of natives, shared by every bot process in the same host.
+
+The file has a header, a table of games, the sections of every game and a string pool at the end. Every string is
+stored once in the pool and referenced by its offset and length, so the records have a fixed size and a native is only
+decoded when it is requested. The search indexes are stored in the file too, so a process only keeps a few views of the
+file in its own memory::
+
+    header      magic, version, byte order, number of games and offset of the string pool
+    games       name, digest, and the offset and size of every section of the game
+    records     name, hash, lua name, namespace, comment, return type, build and the range of parameters
+    params      type, name and description
+    keys        uppercase key and record number, sorted by key, for the hashes, names and lua names
+    search_*    the tables of the autocomplete (NativeSearch), with the keys stored back to back in their own section
+    ngram_*     the n-grams of the autocomplete, sorted, with the range of their ids
+    text_*      the words of the full text index (NativeTextIndex), sorted, with the range of their postings
+    pool        the UTF-8 strings
+
+The records and keys are big endian, but the tables of the indexes use the byte order of the host, so they can be read
+without copying them. A file written in a host with a different byte order is rejected.
+"""
+
+import bisect
+import mmap
+import sys
+from array import array
+from collections.abc import Iterator, Mapping, Sequence
+from pathlib import Path
+from struct import Struct
+from typing import Optional, Union
+
+from leek.exception import InvalidSnapshotError
+
+from .fulltext import NativeTextIndex, TextTables
+from .index import NativeIndex
+from .records import Native, NativeParam
+from .search import DEFAULT_LIMIT, NativeSearch, SearchTables
+
+MAGIC = b"LEEKNMAP"
+SHARED_VERSION = 2
+HEADER = Struct(">8sHBHQ")
+SECTIONS = ("records", "params", "hashes", "names", "luas", "search_strings", "search_keys", "search_display",
+            "search_prefixes", "search_prefix_ids", "search_words", "search_word_ids", "ngram_keys", "ngram_ranges",
+            "ngram_ids", "text_keys", "text_ranges", "text_documents", "text_frequencies", "text_norms")
+GAME = Struct(">IIII" + "QQ" * len(SECTIONS))
+RECORD = Struct(">IIIIIIIIIIIIIIIH")
+PARAM = Struct(">IIIIII")
+KEY = Struct(">III")
+FIELDS = ("name", "hash", "lua", "namespace", "comment", "return_type", "build")
+ALIGNMENT = 8
+LITTLE_ENDIAN = sys.byteorder == "little"
+
+
+class _StringPool:
+    def __init__(self):
+        self.data = bytearray()
+        self.refs: dict[str, tuple[int, int]] = {}
+
+    def add(self, value: Optional[str]) -> tuple[int, int]:
+        if not value:
+            return 0, 0
+
+        ref = self.refs.get(value)
+
+        if ref is None:
+            encoded = value.encode()
+            ref = (len(self.data), len(encoded))
+            self.data.extend(encoded)
+            self.refs[value] = ref
+
+        return ref
+
+    def table(self, values: Sequence[str]) -> array:
+        return array("I", (x for value in values for x in self.add(value)))
+
+
+def _postings(pool: _StringPool, postings: Mapping[str, Sequence[int]]) -> tuple[array, array, list[int]]:
+    # the keys are sorted, so they can be found with a binary search
+    keys = sorted(postings)
+    ranges = array("I")
+    values = []
+
+    for key in keys:
+        ranges.extend((len(values), len(postings[key])))
+        values.extend(postings[key])
+
+    return pool.table(keys), ranges, values
+
+
+def _search_sections(pool: _StringPool, natives: list[Native]) -> list[bytes]:
+    tables = NativeSearch(key for native in natives for key in (native.name, native.hash)).tables
+    # the keys are separated by line breaks, so the ones that contain a short query can be checked all at once
+    strings = "\n".join(tables.keys).encode()
+    keys = []
+    offset = 0
+
+    for key in tables.keys:
+        keys.append((offset, len(key.encode())))
+        offset += keys[-1][1] + 1
+
+    words = array("I")
+
+    # the words are the end of the keys, so they point inside of the string of the key
+    for word, number in zip(tables.words, tables.word_ids, strict=True):
+        offset, length = keys[number]
+        size = len(word.encode())
+        words.extend((offset + length - size, size))
+
+    ngram_keys, ngram_ranges, ngram_ids = _postings(pool, tables.ngrams)
+    return [strings, array("I", (x for key in keys for x in key)), pool.table(tables.display),
+            array("I", (x for number in tables.prefix_ids for x in keys[number])), array("I", tables.prefix_ids),
+            words, array("I", tables.word_ids), ngram_keys, ngram_ranges, array("I", ngram_ids)]
+
+
+def _text_sections(pool: _StringPool, natives: list[Native]) -> list[bytes]:
+    tables = NativeTextIndex(natives).tables
+    keys, ranges, documents = _postings(pool, tables.documents)
+    frequencies = [x for key in sorted(tables.frequencies) for x in tables.frequencies[key]]
+    return [keys, ranges, array("I", documents), array("H", frequencies), array("f", tables.norms)]
+
+
+def write_shared(path: Path, indexes: dict[str, Union[NativeIndex, "SharedNativeIndex"]]) -> None:
+    """
+    Writes the natives to a file that can be memory mapped. The file is replaced atomically, so the processes that
+    have the previous file mapped keep working with it.
+    :param path: The path of the file.
+    :param indexes: The index of every game.
+    """
+    pool = _StringPool()
+    data = bytearray()
+    games = []
+    start = HEADER.size + GAME.size * len(indexes)
+
+    for game, index in indexes.items():
+        records = bytearray()
+        params = bytearray()
+        keys: dict[str, dict[bytes, int]] = {"hash": {}, "name": {}, "lua": {}}
+        natives = []
+
+        for native in index:
+            if native.hash.upper().encode() in keys["hash"]:
+                continue
+
+            refs = [x for field in FIELDS for x in pool.add(getattr(native, field))]
+            records.extend(RECORD.pack(*refs, len(params) // PARAM.size, len(native.params)))
+
+            for param in native.params:
+                params.extend(PARAM.pack(*pool.add(param.type), *pool.add(param.name), *pool.add(param.description)))
+
+            # like in NativeIndex, the first native with a name is the one that is returned
+            for kind, numbers in keys.items():
+                numbers.setdefault(getattr(native, kind).upper().encode(), len(natives))
+
+            natives.append(native)
+
+        sections: list[bytes] = [records, params]
+
+        for numbers in keys.values():
+            sections.append(b"".join(KEY.pack(*pool.add(key.decode()), number)
+                                     for key, number in sorted(numbers.items())))
+
+        # the positions of the natives in the indexes are the same as the records, because they are unique by hash
+        sections.extend(_search_sections(pool, natives))
+        sections.extend(_text_sections(pool, natives))
+        directory = []
+
+        for section in sections:
+            # the arrays are copied as they are in memory, with the byte order of the host
+            raw = bytes(section)
+            data.extend(bytes(-(start + len(data)) % ALIGNMENT))
+            directory.extend((start + len(data), len(raw)))
+            data.extend(raw)
+
+        games.append(GAME.pack(*pool.add(game), *pool.add(index.digest), *directory))
+
+    temp = path.with_name(f"{path.name}.tmp")
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with temp.open("wb") as file:
+        file.write(HEADER.pack(MAGIC, SHARED_VERSION, LITTLE_ENDIAN, len(games), start + len(data)))
+        file.writelines(games)
+        file.write(data)
+        file.write(pool.data)
+
+    temp.replace(path)
+
+
+class _StringTable(Sequence[str]):
+    # the strings of a section referenced by a table of offsets and lengths
+    def __init__(self, buffer: mmap.mmap, base: int, refs: memoryview, joined: Optional[int] = None):
+        self.__buffer: mmap.mmap = buffer
+        self.__base: int = base
+        self.__refs: memoryview = refs
+        # the size of the section, if it only has the strings of the table separated by line breaks
+        self.__joined: Optional[int] = joined
+
+    def __iter__(self) -> Iterator[str]:
+        if self.__joined is None:
+            return super().__iter__()
+        if not self.__joined:
+            return iter(())
+        return iter(self.__buffer[self.__base:self.__base + self.__joined].decode().split("\n"))
+
+    def __len__(self) -> int:
+        return len(self.__refs) // 2
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[str, list[str]]:
+        if isinstance(index, slice):
+            return [self[x] for x in range(*index.indices(len(self)))]
+
+        start = self.__base + self.__refs[index * 2]
+        return self.__buffer[start:start + self.__refs[index * 2 + 1]].decode()
+
+
+class _Postings(Mapping[str, Sequence[int]]):
+    # the values of every key, as ranges of a table shared by all of the keys
+    def __init__(self, keys: _StringTable, ranges: memoryview, values: memoryview):
+        self.__keys: _StringTable = keys
+        self.__ranges: memoryview = ranges
+        self.__values: memoryview = values
+
+    def __getitem__(self, key: str) -> Sequence[int]:
+        number = bisect.bisect_left(self.__keys, key)
+
+        if number == len(self.__keys) or self.__keys[number] != key:
+            raise KeyError(key)
+
+        start = self.__ranges[number * 2]
+        return self.__values[start:start + self.__ranges[number * 2 + 1]]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__keys)
+
+    def __len__(self) -> int:
+        return len(self.__keys)
+
+
+class SharedNativeIndex:
+    """
+    The natives of a single game, read from a memory mapped file.
+
+    It has the same methods as NativeIndex, but the natives are decoded every time that they are requested and the
+    search indexes are read from the file.
+    """
+    def __init__(self, buffer: mmap.mmap, pool: int, entry: tuple):
+        """
+        Creates a new index over a game of the file.
+        :param buffer: The memory map of the file.
+        :param pool: The offset of the string pool.
+        :param entry: The values of the game in the table of games.
+        """
+        self.__buffer: mmap.mmap = buffer
+        self.__pool: int = pool
+        self.__digest: Optional[str] = self.__string(entry[2], entry[3]) or None
+        sections = dict(zip(SECTIONS, zip(entry[4::2], entry[5::2], strict=True), strict=True))
+        self.__count: int = sections["records"][1] // RECORD.size
+        self.__records: int = sections["records"][0]
+        self.__params: int = sections["params"][0]
+        # there is a key for every hash, but multiple natives can share the same name
+        self.__hashes: tuple[int, int] = (sections["hashes"][0], sections["hashes"][1] // KEY.size)
+        self.__names: tuple[int, int] = (sections["names"][0], sections["names"][1] // KEY.size)
+        self.__luas: tuple[int, int] = (sections["luas"][0], sections["luas"][1] // KEY.size)
+
+        view = memoryview(buffer)
+
+        def table(name: str, code: str = "I") -> memoryview:
+            offset, size = sections[name]
+            return view[offset:offset + size].cast(code)
+
+        def strings(name: str) -> _StringTable:
+            return _StringTable(buffer, pool, table(name))
+
+        def keys(name: str, joined: Optional[int] = None) -> _StringTable:
+            return _StringTable(buffer, sections["search_strings"][0], table(name), joined)
+
+        self.__search: NativeSearch = NativeSearch.from_tables(SearchTables(
+            keys("search_keys", sections["search_strings"][1]), strings("search_display"), keys("search_prefixes"),
+            table("search_prefix_ids"), keys("search_words"), table("search_word_ids"),
+            _Postings(strings("ngram_keys"), table("ngram_ranges"), table("ngram_ids"))
+        ))
+        self.__text: NativeTextIndex = NativeTextIndex.from_tables(TextTables(
+            _Postings(strings("text_keys"), table("text_ranges"), table("text_documents")),
+            _Postings(strings("text_keys"), table("text_ranges"), table("text_frequencies", "H")),
+            table("text_norms", "f")
+        ))
+
+    def __string(self, offset: int, length: int) -> str:
+        if not length:
+            return ""
+        start = self.__pool + offset
+        return self.__buffer[start:start + length].decode()
+
+    def __native(self, number: int) -> Native:
+        values = RECORD.unpack_from(self.__buffer, self.__records + number * RECORD.size)
+        fields = {field: self.__string(values[i * 2], values[i * 2 + 1]) for i, field in enumerate(FIELDS)}
+        params = []
+
+        for i in range(values[-1]):
+            param = PARAM.unpack_from(self.__buffer, self.__params + (values[-2] + i) * PARAM.size)
+            params.append(NativeParam.create(self.__string(param[0], param[1]), self.__string(param[2], param[3]),
+                                             self.__string(param[4], param[5])))
+
+        return Native(fields["namespace"], fields["hash"], fields["name"], tuple(params),
+                      return_type=fields["return_type"], build=fields["build"], comment=fields["comment"],
+                      lua=fields["lua"])
+
+    def __lookup(self, keys: tuple[int, int], key: str) -> Optional[Native]:
+        section, high = keys
+        target = key.upper().encode()
+        low = 0
+
+        while low < high:
+            middle = (low + high) // 2
+            offset, length, number = KEY.unpack_from(self.__buffer, section + middle * KEY.size)
+            start = self.__pool + offset
+            current = self.__buffer[start:start + length]
+
+            if current == target:
+                return self.__native(number)
+            if current < target:
+                low = middle + 1
+            else:
+                high = middle
+
+        return None
+
+    def __len__(self) -> int:
+        """
+        The number of natives in the index.
+        """
+        return self.__count
+
+    def __iter__(self) -> Iterator[Native]:
+        """
+        Iterates over the natives, decoding every one of them.
+        """
+        return (self.__native(i) for i in range(self.__count))
+
+    @property
+    def digest(self) -> Optional[str]:
+        """
+        The SHA-256 of the file where the natives were taken from, used to check if they changed.
+        """
+        return self.__digest
+
+    @property
+    def namespaces(self) -> dict[str, list[Native]]:
+        """
+        The natives grouped by namespace. Every native is decoded, so this is slow.
+        """
+        namespaces: dict[str, list[Native]] = {}
+
+        for native in self:
+            namespaces.setdefault(native.namespace, []).append(native)
+
+        return namespaces
+
+    @property
+    def text_index(self) -> NativeTextIndex:
+        """
+        The full text index of the natives.
+        """
+        return self.__text
+
+    def by_hash(self, n_hash: str) -> Optional[Native]:
+        """
+        Gets a native by its hash.
+        :param n_hash: The hash of the native, like 0x4F8644AF03D0E0D6.
+        :return: The native, or None if there is no native with that hash.
+        """
+        return self.__lookup(self.__hashes, n_hash)
+
+    def by_name(self, name: str) -> Optional[Native]:
+        """
+        Gets a native by its name.
+        :param name: The name of the native, like GET_PLAYER_PED.
+        :return: The native, or None if there is no native with that name.
+        """
+        return self.__lookup(self.__names, name)
+
+    def by_lua(self, name: str) -> Optional[Native]:
+        """
+        Gets a native by its Lua name.
+        :param name: The Lua name of the native, like GetPlayerPed.
+        :return: The native, or None if there is no native with that name.
+        """
+        return self.__lookup(self.__luas, name)
+
+    def find(self, key: str) -> Optional[Native]:
+        """
+        Finds a native by its hash, name or Lua name.
+        :param key: The hash, name or Lua name of the native.
+        :return: The native, or None if it was not found.
+        """
+        key = key.strip()
+        return self.by_hash(key) or self.by_name(key) or self.by_lua(key)
+
+    def search(self, query: str, limit: int = DEFAULT_LIMIT) -> list[str]:
+        """
+        Searches the names and hashes of the natives that match a partial query.
+        :param query: The partial name or hash.
+        :param limit: The maximum number of results.
+        :return: The names and hashes, with the exact and prefix matches first.
+        """
+        return self.__search.search(query, limit)
+
+    def search_text(self, query: str, offset: int = 0, limit: int = 10) -> tuple[int, list[Native]]:
+        """
+        Searches the natives by the words in their documentation.
+        :param query: The words to search.
+        :param offset: The number of results to skip.
+        :param limit: The maximum number of results.
+        :return: The total number of matches, and the natives ordered by relevance.
+        """
+        total, numbers = self.__text.search(query, offset, limit)
+        return total, [self.__native(x) for x in numbers]
+
+
+def open_shared(path: Path) -> dict[str, SharedNativeIndex]:
+    """
+    Opens a file of natives as a read-only memory map.
+    :param path: The path of the file.
+    :return: The index of every game in the file, or an empty dict if the file does not exists.
+    :raises InvalidSnapshotError: If the file is truncated or was written with a different version.
+    """
+    try:
+        with path.open("rb") as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        raise InvalidSnapshotError(path, "the file is empty") from e
+
+    if len(buffer) < HEADER.size:
+        raise InvalidSnapshotError(path, "the header is truncated")
+
+    magic, version, little_endian, count, pool = HEADER.unpack_from(buffer)
+
+    if magic != MAGIC:
+        raise InvalidSnapshotError(path, "is not a shared native file")
+    if version != SHARED_VERSION:
+        raise InvalidSnapshotError(path, f"uses format {version} instead of {SHARED_VERSION}")
+    if little_endian != LITTLE_ENDIAN:
+        raise InvalidSnapshotError(path, "was written with a different byte order")
+    if pool > len(buffer) or HEADER.size + GAME.size * count > pool:
+        raise InvalidSnapshotError(path, "the sections are truncated")
+
+    indexes = {}
+
+    for number in range(count):
+        entry = GAME.unpack_from(buffer, HEADER.size + number * GAME.size)
+        start = pool + entry[0]
+        indexes[buffer[start:start + entry[1]].decode()] = SharedNativeIndex(buffer, pool, entry)
+
+    return indexes
@@ -0,0 +1,73 @@
+"""
+The on-disk snapshot of the native indexes, used to serve the natives before they are downloaded.
+"""
+
+import pickle
+import struct
+from pathlib import Path
+
+from leek.exception import InvalidSnapshotError
+
+from .index import NativeIndex
+
+MAGIC = b"LEEKNATV"
+SNAPSHOT_VERSION = 3
+HEADER = struct.Struct(">8sHI")
+
+
+def save_snapshot(path: Path, indexes: dict[str, NativeIndex]) -> None:
+    """
+    Saves the indexes of the natives. The file is replaced atomically, so a crash never leaves a partial snapshot.
+    :param path: The path of the snapshot.
+    :param indexes: The index of every game.
+    """
+    payload = pickle.dumps(indexes, protocol=pickle.HIGHEST_PROTOCOL)
+    temp = path.with_name(f"{path.name}.tmp")
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with temp.open("wb") as file:
+        file.write(HEADER.pack(MAGIC, SNAPSHOT_VERSION, len(payload)))
+        file.write(payload)
+
+    temp.replace(path)
+
+
+def load_snapshot(path: Path) -> dict[str, NativeIndex]:
+    """
+    Loads the indexes of the natives.
+    :param path: The path of the snapshot.
+    :return: The index of every game, or an empty dict if there is no snapshot.
+    :raises InvalidSnapshotError: If the snapshot is truncated or was saved with a different version.
+    """
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return {}
+
+    if len(data) < HEADER.size:
+        raise InvalidSnapshotError(path, "the header is truncated")
+
+    magic, version, size = HEADER.unpack_from(data)
+
+    if magic != MAGIC:
+        raise InvalidSnapshotError(path, "is not a native snapshot")
+    if version != SNAPSHOT_VERSION:
+        raise InvalidSnapshotError(path, f"uses format {version} instead of {SNAPSHOT_VERSION}")
+    if len(data) - HEADER.size != size:
+        raise InvalidSnapshotError(path, f"expected {size} bytes of data but found {len(data) - HEADER.size}")
+
+    try:
+        # the snapshot is only written by the bot, into a directory owned by the bot
+        indexes = pickle.loads(data[HEADER.size:])  # noqa: S301
+    except (pickle.UnpicklingError, AttributeError, EOFError, ImportError, IndexError, KeyError, TypeError,
+            ValueError) as e:
+        # classes that were renamed, moved or changed their fields since the snapshot was saved fail in many ways
+        raise InvalidSnapshotError(path, f"{type(e).__name__}: {e}") from e
+
+    valid = isinstance(indexes, dict) and all(isinstance(k, str) and isinstance(v, NativeIndex)
+                                              for k, v in indexes.items())
+
+    if not valid:
+        raise InvalidSnapshotError(path, "does not contain native indexes")
+
+    return indexes
@@ -0,0 +1,189 @@
+"""
+The HTTP client session used by the Leek bot.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional, Union
+
+import aiohttp
+
+from .tracing import begin
+
+if TYPE_CHECKING:
+    from types import SimpleNamespace
+
+    from yarl import URL
+
+LOGGER = logging.getLogger("leek")
+USER_AGENT = "Leek/0.0.1"
+DEFAULT_HTTP_OPTIONS = {
+    "limit": 100,
+    "limit_per_host": 10,
+    "ttl_dns_cache": 300,
+    "keepalive_timeout": 30.0,
+    "timeout": 300.0,
+    "connect_timeout": 10.0,
+    "read_timeout": 30.0
+}
+
+
+@dataclass(frozen=True)
+class HostStatistics:
+    """
+    A snapshot of the requests made to a single host.
+    """
+    requests: int
+    errors: int
+    http_errors: int
+    time: float
+    time_max: float
+
+    @property
+    def time_average(self) -> float:
+        """
+        The average time in seconds until the response headers were received.
+        """
+        return self.time / self.requests if self.requests else 0.0
+
+
+class _HostCounters:
+    __slots__ = ("errors", "http_errors", "requests", "time", "time_max")
+
+    def __init__(self):
+        self.requests: int = 0
+        self.errors: int = 0
+        self.http_errors: int = 0
+        self.time: float = 0.0
+        self.time_max: float = 0.0
+
+
+class HttpStatistics:
+    """
+    Records the time and the errors of the requests made by a session, grouped by host.
+    """
+    def __init__(self):
+        """
+        Creates a new statistics recorder.
+        """
+        self.__hosts: dict[str, _HostCounters] = {}
+
+    def __counters(self, url: URL) -> _HostCounters:
+        host = url.host or ""
+        counters = self.__hosts.get(host)
+
+        if counters is None:
+            counters = _HostCounters()
+            self.__hosts[host] = counters
+
+        return counters
+
+    def record(self, url: URL, elapsed: float, status: Optional[int]) -> None:
+        """
+        Records a finished request.
+        :param url: The URL that was requested.
+        :param elapsed: The time in seconds that the request took.
+        :param status: The status code of the response, or None if the request failed.
+        """
+        counters = self.__counters(url)
+        counters.requests += 1
+        counters.time += elapsed
+        counters.time_max = max(counters.time_max, elapsed)
+
+        if status is None:
+            counters.errors += 1
+        elif status >= 400:
+            counters.http_errors += 1
+
+    def snapshot(self) -> dict[str, HostStatistics]:
+        """
+        Gets the current statistics of every host.
+        """
+        return {host: HostStatistics(requests=c.requests,
+                                     errors=c.errors,
+                                     http_errors=c.http_errors,
+                                     time=c.time,
+                                     time_max=c.time_max) for host, c in self.__hosts.items()}
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """
+        Creates the trace configuration that records the requests of a session in this object.
+        """
+        async def on_request_start(_: aiohttp.ClientSession, context: SimpleNamespace,
+                                   __: aiohttp.TraceRequestStartParams) -> None:
+            context.start = time.perf_counter()
+
+        async def on_request_end(_: aiohttp.ClientSession, context: SimpleNamespace,
+                                 params: aiohttp.TraceRequestEndParams) -> None:
+            self.record(params.url, time.perf_counter() - context.start, params.response.status)
+
+        async def on_request_exception(_: aiohttp.ClientSession, context: SimpleNamespace,
+                                       params: aiohttp.TraceRequestExceptionParams) -> None:
+            self.record(params.url, time.perf_counter() - context.start, None)
+
+        config = aiohttp.TraceConfig()
+        config.on_request_start.append(on_request_start)
+        config.on_request_end.append(on_request_end)
+        config.on_request_exception.append(on_request_exception)
+        return config
+
+
+def tracing_config() -> aiohttp.TraceConfig:
+    """
+    Creates the trace configuration that adds the requests as spans of the current trace, until the headers arrive.
+    """
+    async def on_request_start(_: aiohttp.ClientSession, context: SimpleNamespace,
+                               params: aiohttp.TraceRequestStartParams) -> None:
+        context.span = begin(f"http.{params.method.lower()}", host=params.url.host)
+
+    async def on_request_finish(_: aiohttp.ClientSession, context: SimpleNamespace, __: object) -> None:
+        if context.span is not None:
+            context.span.finish()
+
+    config = aiohttp.TraceConfig()
+    config.on_request_start.append(on_request_start)
+    config.on_request_end.append(on_request_finish)
+    config.on_request_exception.append(on_request_finish)
+    return config
+
+
+def make_timeout(timeout: Union[aiohttp.ClientTimeout, float, None]) -> Optional[aiohttp.ClientTimeout]:
+    """
+    Converts a timeout in seconds to the total timeout of a request.
+    :param timeout: The timeout in seconds, or an existing aiohttp timeout.
+    :return: The aiohttp timeout, or None to use the timeout of the session.
+    """
+    if timeout is None or isinstance(timeout, aiohttp.ClientTimeout):
+        return timeout
+    return aiohttp.ClientTimeout(total=timeout)
+
+
+def create_session(options: Optional[dict], statistics: HttpStatistics) -> aiohttp.ClientSession:
+    """
+    Creates a new HTTP client session.
+    :param options: The connector and timeout options, with the same keys as DEFAULT_HTTP_OPTIONS.
+    :param statistics: The object where the requests will be recorded.
+    :return: The new session.
+    """
+    options = {**DEFAULT_HTTP_OPTIONS, **(options or {})}
+    connector = aiohttp.TCPConnector(limit=options["limit"],
+                                     limit_per_host=options["limit_per_host"],
+                                     ttl_dns_cache=options["ttl_dns_cache"],
+                                     keepalive_timeout=options["keepalive_timeout"])
+    # the read timeout catches stalled sockets without limiting how long a big download can take
+    timeout = aiohttp.ClientTimeout(total=options["timeout"],
+                                    connect=options["connect_timeout"],
+                                    sock_read=options["read_timeout"])
+
+    LOGGER.info("Creating HTTP session (%s connections, %s per host, DNS cache for %ss)",
+                options["limit"], options["limit_per_host"], options["ttl_dns_cache"])
+
+    return aiohttp.ClientSession(connector=connector,
+                                 timeout=timeout,
+                                 trace_configs=[statistics.trace_config(), tracing_config()],
+                                 headers={
+                                     "User-Agent": USER_AGENT
+                                 })
@@ -0,0 +1,52 @@
+"""
+The timing report of the startup of the Leek bot.
+"""
+
+import sys
+import time
+
+
+class StartupReport:
+    """
+    Records how long each phase of the startup took.
+    """
+    def __init__(self):
+        """
+        Creates a new report, starting the clock.
+        """
+        self.__start: float = time.perf_counter()
+        self.__phases: list[tuple[str, float]] = []
+        self.__printed: bool = False
+
+    @property
+    def elapsed(self) -> float:
+        """
+        The seconds since the report was created.
+        """
+        return time.perf_counter() - self.__start
+
+    def add(self, name: str, seconds: float) -> None:
+        """
+        Adds the time of a phase.
+        :param name: The name of the phase.
+        :param seconds: The time that the phase took.
+        """
+        self.__phases.append((name, seconds))
+
+    def format(self) -> str:
+        """
+        Formats the phases as a table.
+        """
+        lines = ["Startup report:", f"  {'phase':<40} {'ms':>10}"]
+        lines.extend(f"  {name:<40} {seconds * 1000:>10.1f}" for name, seconds in self.__phases)
+        lines.append(f"  {'total':<40} {self.elapsed * 1000:>10.1f}")
+        return "\n".join(lines) + "\n"
+
+    def print_once(self) -> None:
+        """
+        Prints the report to the standard output, only the first time that is called.
+        """
+        if not self.__printed:
+            self.__printed = True
+            sys.stdout.write(self.format())
+            sys.stdout.flush()
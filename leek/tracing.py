@@ -0,0 +1,216 @@
+"""
+The tracing of the interactions handled by the Leek bot.
+
+When a trace is active, the instrumented helpers (database, HTTP and responses) add child spans to it, and the
+completed traces are written as JSON lines. Run ``python -m leek.tracing <file>`` to summarize them.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import itertools
+import json
+import logging
+import math
+import random
+import sys
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Optional, TextIO
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+LOGGER = logging.getLogger("leek")
+CURRENT_SPAN: ContextVar[Optional[Span]] = ContextVar("leek_current_span", default=None)
+
+
+class Span:
+    """
+    A timed operation inside of a trace.
+    """
+    __slots__ = ("attributes", "duration", "name", "parent", "spans", "start")
+
+    def __init__(self, name: str, parent: Optional[Span], attributes: dict[str, Any]):
+        """
+        Creates and starts a new span.
+        :param name: The name of the operation.
+        :param parent: The span that contains this one, or None if this is the root of the trace.
+        :param attributes: Additional information about the operation.
+        """
+        self.name: str = name
+        self.parent: Optional[Span] = parent
+        self.attributes: dict[str, Any] = attributes
+        self.start: float = time.perf_counter()
+        self.duration: Optional[float] = None
+        # the finished spans of the trace, shared by every span of it
+        self.spans: list[Span] = [] if parent is None else parent.spans
+
+    def finish(self) -> None:
+        """
+        Stops the span and adds it to the trace.
+        """
+        self.duration = time.perf_counter() - self.start
+        self.spans.append(self)
+
+
+def begin(name: str, **attributes: Any) -> Optional[Span]:  # noqa: ANN401
+    """
+    Starts a child span of the current span, without making it the current one.
+    :param name: The name of the operation.
+    :param attributes: Additional information about the operation.
+    :return: The span, or None if there is no trace active.
+    """
+    parent = CURRENT_SPAN.get()
+    return None if parent is None else Span(name, parent, attributes)
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:  # noqa: ANN401
+    """
+    Context manager that times the code inside of it as a child span of the current span.
+    :param name: The name of the operation.
+    :param attributes: Additional information about the operation.
+    """
+    child = begin(name, **attributes)
+
+    if child is None:
+        yield None
+        return
+
+    token = CURRENT_SPAN.set(child)
+
+    try:
+        yield child
+    finally:
+        CURRENT_SPAN.reset(token)
+        child.finish()
+
+
+class Tracer:
+    """
+    Starts the traces and writes the completed ones to a JSON lines file.
+    """
+    def __init__(self, path: Path, sample_rate: float = 1.0):
+        """
+        Creates a new tracer.
+        :param path: The file where the traces will be appended.
+        :param sample_rate: The fraction of traces to record, between 0 and 1.
+        """
+        self.__path: Path = path
+        self.__sample_rate: float = sample_rate
+        self.__file: Optional[TextIO] = None
+        self.__ids = itertools.count(1)
+
+    @contextlib.contextmanager
+    def trace(self, name: str, **attributes: Any) -> Iterator[Optional[Span]]:  # noqa: ANN401
+        """
+        Context manager that records a new trace, if it is sampled.
+        :param name: The name of the root operation.
+        :param attributes: Additional information about the operation.
+        """
+        if random.random() >= self.__sample_rate:  # noqa: S311
+            yield None
+            return
+
+        root = Span(name, None, attributes)
+        token = CURRENT_SPAN.set(root)
+
+        try:
+            yield root
+        finally:
+            CURRENT_SPAN.reset(token)
+            root.finish()
+            self.__write(root)
+
+    def __write(self, root: Span) -> None:
+        ids = {id(x): i for i, x in enumerate(root.spans)}
+        record = {
+            "id": next(self.__ids),
+            "name": root.name,
+            "time": time.time() - root.duration,
+            "duration": root.duration,
+            "attributes": root.attributes,
+            "spans": [
+                {
+                    "id": ids[id(x)],
+                    "parent": None if x.parent is None else ids[id(x.parent)],
+                    "name": x.name,
+                    "offset": x.start - root.start,
+                    "duration": x.duration,
+                    "attributes": x.attributes
+                } for x in root.spans
+            ]
+        }
+
+        try:
+            if self.__file is None:
+                self.__file = self.__path.open("a", encoding="utf-8")
+
+            self.__file.write(json.dumps(record, default=str) + "\n")
+            self.__file.flush()
+        except OSError:
+            LOGGER.exception("Unable to write trace to %s", self.__path)
+
+    def close(self) -> None:
+        """
+        Closes the file of the traces.
+        """
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """
+    Gets a percentile of a sorted list of values, using the nearest rank.
+    :param values: The sorted values.
+    :param fraction: The percentile as a fraction between 0 and 1.
+    :return: The value at the percentile.
+    """
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+def summarize(lines: Iterator[str]) -> dict[str, list[float]]:
+    """
+    Groups the durations of the spans in a set of traces by their name.
+    :param lines: The JSON lines of the traces.
+    :return: The sorted durations of every span name.
+    """
+    durations: dict[str, list[float]] = {}
+
+    for line in lines:
+        if not line.strip():
+            continue
+
+        for entry in json.loads(line)["spans"]:
+            durations.setdefault(entry["name"], []).append(entry["duration"])
+
+    for values in durations.values():
+        values.sort()
+
+    return durations
+
+
+def main() -> None:
+    """
+    Prints the p50 and p95 of every span name in a trace file.
+    """
+    parser = argparse.ArgumentParser(description="Summarizes the traces written by Leek")
+    parser.add_argument("file", type=Path, help="the JSON lines file with the traces")
+    args = parser.parse_args()
+
+    with args.file.open(encoding="utf-8") as file:
+        durations = summarize(file)
+
+    sys.stdout.write(f"{'span':<40} {'count':>8} {'p50 (ms)':>10} {'p95 (ms)':>10}\n")
+
+    for name, values in sorted(durations.items(), key=lambda x: -percentile(x[1], 0.95)):
+        sys.stdout.write(f"{name:<40} {len(values):>8} {percentile(values, 0.5) * 1000:>10.2f} "
+                         f"{percentile(values, 0.95) * 1000:>10.2f}\n")
+
+
+if __name__ == "__main__":
+    main()
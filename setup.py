@@ -1,4 +1,28 @@
+import importlib.util
+from pathlib import Path
+
 from setuptools import setup
+from setuptools.command.build_py import build_py
+
+
+class BuildWithCatalogs(build_py):
+    """
+    Builds the packages and compiles the localization catalogs next to the copied localization files.
+    """
+    def run(self) -> None:
+        """
+        Runs the build.
+        """
+        super().run()
+
+        # the catalog compiler only uses the standard library, so load it without importing the leek package
+        spec = importlib.util.spec_from_file_location("leek_catalog", Path(__file__).parent / "leek" / "catalog.py")
+        catalog = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(catalog)
+
+        for path in catalog.compile_catalogs(Path(self.build_lib) / "leek"):
+            self.announce(f"compiled localization catalog {path}", level=2)
+
 
 if __name__ == "__main__":
-    setup()
+    setup(cmdclass={"build_py": BuildWithCatalogs})
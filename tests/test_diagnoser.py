@@ -0,0 +1,57 @@
+"""
+Tests for the streaming diagnosis of the log files.
+"""
+
+import unittest
+
+from leek.cogs.diagnoser import CHUNK_SIZE, LogDiagnosis
+
+LINE = b"[00:00:00] [ERROR] Failed to load config: System.IO.FileNotFoundException\n"
+
+
+def _stream(body: bytes, max_bytes: int) -> LogDiagnosis:
+    diagnosis = LogDiagnosis(max_bytes)
+
+    for start in range(0, len(body), CHUNK_SIZE):
+        if not diagnosis.feed(body[start:start + CHUNK_SIZE]):
+            break
+
+    diagnosis.finish()
+    return diagnosis
+
+
+class TestLogDiagnosis(unittest.TestCase):
+    """
+    Tests for the byte limit of LogDiagnosis.
+    """
+    def test_limit_at_chunk_boundary(self) -> None:
+        """
+        A limit that is a multiple of the chunk size marks a bigger file as truncated.
+        """
+        diagnosis = _stream(b"x" * 98_000, CHUNK_SIZE)
+
+        self.assertTrue(diagnosis.truncated)
+        self.assertEqual(diagnosis.bytes_read, CHUNK_SIZE)
+
+    def test_file_as_big_as_limit(self) -> None:
+        """
+        A file that ends exactly at the limit is not truncated.
+        """
+        diagnosis = _stream(b"x" * CHUNK_SIZE * 2, CHUNK_SIZE * 2)
+
+        self.assertFalse(diagnosis.truncated)
+        self.assertEqual(diagnosis.bytes_read, CHUNK_SIZE * 2)
+
+    def test_limit_inside_chunk(self) -> None:
+        """
+        A limit in the middle of a chunk checks the lines before it.
+        """
+        body = LINE * 10
+        diagnosis = _stream(body, len(LINE) * 3 + 5)
+
+        self.assertTrue(diagnosis.truncated)
+        self.assertEqual(sum(diagnosis.lines_found.values()), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()